@@ -0,0 +1,14 @@
+-- CreateTable: дневные свечи, агрегированные из 5m (обновляются инкрементально из trade-model)
+CREATE TABLE IF NOT EXISTS "public"."btc_candles_daily" (
+    "symbol" TEXT NOT NULL,
+    "day" TIMESTAMP(3) NOT NULL,
+    "open" DOUBLE PRECISION NOT NULL,
+    "high" DOUBLE PRECISION NOT NULL,
+    "low" DOUBLE PRECISION NOT NULL,
+    "close" DOUBLE PRECISION NOT NULL,
+    "volume" DOUBLE PRECISION NOT NULL,
+    "bar_count" INTEGER NOT NULL,
+    "updated_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "btc_candles_daily_pkey" PRIMARY KEY ("symbol", "day")
+);
@@ -0,0 +1,2 @@
+-- AlterTable: время последней 5m свечи, вошедшей в дневную свечу (водяной знак обновления)
+ALTER TABLE "public"."btc_candles_daily" ADD COLUMN IF NOT EXISTS "last_open_time" TIMESTAMP(3);
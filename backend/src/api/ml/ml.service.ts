@@ -151,44 +151,27 @@ export class MLService {
     try {
       this.logger.log('Получение информации о модели...');
 
-      const { stdout, stderr } = await execAsync(
-        `"${this.pythonPath}" -c "import joblib; import os; model_path='models/etf_model_v1.pkl'; print(f'Model exists: {os.path.exists(model_path)}'); print(f'Model size: {os.path.getsize(model_path) if os.path.exists(model_path) else 0} bytes')"`,
-        {
-          cwd: this.mlScriptPath,
-          timeout: 10000,
-        },
-      );
-
-      if (stderr) {
-        this.logger.warn(`Предупреждения: ${stderr}`);
-      }
+      // Метаданные модели лежат в JSON рядом с booster - Python не запускается
+      const modelPath = path.join(this.mlScriptPath, 'models', 'etf_model_v1.ubj');
+      const metadataPath = path.join(this.mlScriptPath, 'models', 'etf_model_v1.json');
 
       const info = {
-        model_exists: stdout.includes('Model exists: True'),
+        model_exists: fs.existsSync(modelPath) && fs.existsSync(metadataPath),
         model_size: 0,
         last_trained: 'Unknown' as string,
         features_count: 25,
         model_type: 'XGBoost',
       };
 
-      // Парсим размер модели
-      const sizeMatch = stdout.match(/Model size: (\d+) bytes/);
-      if (sizeMatch) {
-        info.model_size = parseInt(sizeMatch[1]);
-      }
-
-      // Пытаемся получить дату обучения
-      try {
-        const { stdout: modelInfo } = await execAsync(
-          `"${this.pythonPath}" -c "import joblib; import os; from datetime import datetime; model_path='models/etf_model_v1.pkl'; data = joblib.load(model_path) if os.path.exists(model_path) else {}; print(data.get('trained_at', 'Unknown'))"`,
-          {
-            cwd: this.mlScriptPath,
-            timeout: 10000,
-          },
+      if (info.model_exists) {
+        const metadata = JSON.parse(fs.readFileSync(metadataPath, 'utf-8'));
+        info.model_size = Object.values<any>(metadata.boosters ?? {}).reduce(
+          (total, booster) => total + (booster.bytes ?? 0),
+          0,
         );
-        info.last_trained = modelInfo.trim();
-      } catch {
-        info.last_trained = 'Unknown';
+        info.last_trained = metadata.trained_at ?? 'Unknown';
+        info.features_count =
+          metadata.feature_columns?.length ?? info.features_count;
       }
 
       return info;
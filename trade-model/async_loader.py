@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Конкурентная загрузка свечей и притоков ETF через asyncio.
+
+Запросы свечей по нескольким символам и запросы к таблицам притоков
+(btc_flows, eth_flow, sol_flow) выполняются одновременно в одном
+asyncio.gather через асинхронный драйвер asyncpg. Число одновременных
+запросов ограничено размером пула подключений. Результаты выравниваются
+по общему индексу времени, для каждого запроса сохраняется время выполнения.
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import logging
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+
+# Local imports
+from db import CANDLE_BUCKETS, FLOW_TABLES, database_url, candles_query, flows_query, intraday_enabled
+from intraday import finalize_intraday
+from instrumentation import span
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Загрузка переменных окружения
+load_dotenv()
+
+# Имена колонок суммарного притока в выровненном результате
+FLOW_COLUMNS = {
+    'btc_flows': 'etf_flow',
+    'eth_flow': 'eth_etf_flow',
+    'sol_flow': 'sol_etf_flow',
+}
+
+
+class AsyncDataLoader:
+    """Асинхронный загрузчик с ограниченным пулом подключений asyncpg."""
+
+    def __init__(self, pool_size: Optional[int] = None, url: Optional[str] = None):
+        """
+        Инициализация загрузчика.
+
+        Args:
+            pool_size: Максимум одновременных подключений (по умолчанию DB_ASYNC_POOL_SIZE)
+            url: URL подключения (по умолчанию строится из переменных окружения)
+        """
+        # Импорт внутри, чтобы синхронный путь не требовал asyncpg
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        self.pool_size = pool_size or int(os.getenv('DB_ASYNC_POOL_SIZE', '4'))
+        self.engine = create_async_engine(
+            url or database_url('postgresql+asyncpg'),
+            pool_size=self.pool_size,
+            max_overflow=0,
+            pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+            pool_pre_ping=True
+        )
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _fetch(self, name: str, query, params: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Выполнение одного запроса с учетом времени ожидания подключения и выполнения.
+
+        Args:
+            name: Имя запроса для отчета о времени
+            query: Запрос SQLAlchemy text()
+            params: Параметры запроса
+
+        Returns:
+            DataFrame с результатом запроса
+        """
+        if self._semaphore is None:
+            # Семафор создается внутри работающего цикла событий
+            self._semaphore = asyncio.Semaphore(self.pool_size)
+
+        queued = time.perf_counter()
+        async with self._semaphore:
+            started = time.perf_counter()
+            with span(f"db.fetch_{name.split(':')[0]}") as stage:
+                async with self.engine.connect() as conn:
+                    result = await conn.execute(query, params)
+                    df = stage.record(pd.DataFrame(result.fetchall(), columns=list(result.keys())))
+            finished = time.perf_counter()
+
+        self.timings[name] = {
+            'seconds': finished - started,
+            'wait_seconds': started - queued,
+            'rows': len(df)
+        }
+        logger.info(f"{name}: {len(df)} строк за {finished - started:.3f} с")
+        return df
+
+    async def load_candles(self, symbol: str, lookback_days: int, bucket: str = '1d') -> Optional[pd.DataFrame]:
+        """
+        Загрузка свечей символа с агрегацией 5m свечей в PostgreSQL.
+
+        Args:
+            symbol: Символ торговой пары
+            lookback_days: Количество дней для загрузки данных
+            bucket: Размер агрегированной свечи ('1h', '4h' или '1d')
+
+        Returns:
+            DataFrame с колонками OHLCV или None, если данных нет
+        """
+        if bucket not in CANDLE_BUCKETS:
+            raise ValueError(f"Неизвестный размер свечи: {bucket}")
+
+        intraday = intraday_enabled()
+        df = await self._fetch(
+            f"candles:{symbol}",
+            candles_query(bucket, intraday),
+            {'symbol': symbol, 'lookback_days': int(lookback_days)}
+        )
+        if df.empty:
+            return None
+
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df = df.set_index('timestamp').astype(float)
+        return finalize_intraday(df) if intraday else df
+
+    async def load_flows(self, table: str, lookback_days: int) -> Optional[pd.DataFrame]:
+        """
+        Загрузка суммарных притоков ETF из таблицы притоков.
+
+        Args:
+            table: Таблица притоков (btc_flows, eth_flow, sol_flow)
+            lookback_days: Количество дней для загрузки данных
+
+        Returns:
+            DataFrame с одной колонкой притока или None, если данных нет
+        """
+        column = FLOW_COLUMNS.get(table, f"{table}_total")
+        df = await self._fetch(
+            f"flows:{table}",
+            flows_query(table, column),
+            {'lookback_days': int(lookback_days)}
+        )
+        if df.empty:
+            return None
+
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.set_index('date')
+        return df.astype(float)
+
+    async def load(self, symbols: Iterable[str] = ('BTCUSDT',),
+                   flow_tables: Iterable[str] = ('btc_flows',),
+                   lookback_days: int = 365, bucket: str = '1d') -> Dict[str, Any]:
+        """
+        Одновременная загрузка свечей по символам и притоков по таблицам.
+
+        Args:
+            symbols: Символы торговых пар
+            flow_tables: Таблицы притоков ETF
+            lookback_days: Количество дней для загрузки данных
+            bucket: Размер агрегированной свечи
+
+        Returns:
+            Словарь с выровненными свечами по символам (candles), притоками
+            в одном DataFrame (flows), временем запросов (timings), ошибками
+            (errors) и общим временем загрузки (total_seconds)
+        """
+        symbols = list(symbols)
+        flow_tables = list(flow_tables)
+        for table in flow_tables:
+            if table not in FLOW_TABLES:
+                raise ValueError(f"Неизвестная таблица притоков: {table}")
+
+        self.timings = {}
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.load_candles(symbol, lookback_days, bucket) for symbol in symbols),
+            *(self.load_flows(table, lookback_days) for table in flow_tables),
+            return_exceptions=True
+        )
+        total_seconds = time.perf_counter() - started
+
+        names = [f"candles:{s}" for s in symbols] + [f"flows:{t}" for t in flow_tables]
+        errors = {}
+        frames = {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Ошибка запроса {name}: {result}")
+                errors[name] = str(result)
+            elif result is None:
+                logger.warning(f"Нет данных: {name}")
+            else:
+                frames[name] = result
+
+        candles = {s: frames[f"candles:{s}"] for s in symbols if f"candles:{s}" in frames}
+        flows = {t: frames[f"flows:{t}"] for t in flow_tables if f"flows:{t}" in frames}
+        aligned_candles, aligned_flows = align_frames(candles, flows)
+
+        logger.info(f"Загружено {len(frames)} из {len(names)} наборов за {total_seconds:.3f} с")
+        return {
+            'candles': aligned_candles,
+            'flows': aligned_flows,
+            'timings': dict(self.timings),
+            'errors': errors,
+            'total_seconds': total_seconds
+        }
+
+    async def close(self) -> None:
+        """Закрытие пула подключений."""
+        await self.engine.dispose()
+
+
+def align_frames(candles: Dict[str, pd.DataFrame],
+                 flows: Dict[str, pd.DataFrame]) -> Tuple[Dict[str, pd.DataFrame], pd.DataFrame]:
+    """
+    Выравнивание свечей и притоков по общему индексу времени.
+
+    Общий индекс - объединение меток времени свечей всех символов. Свечи
+    переиндексируются на него (пропуски остаются NaN), притоки сводятся
+    в один DataFrame с колонкой на таблицу, пропуски заполняются нулями
+    (как в DatabaseManager.load_combined_data).
+
+    Args:
+        candles: Свечи по символам
+        flows: Притоки по таблицам
+
+    Returns:
+        Tuple с выровненными свечами по символам и DataFrame притоков
+    """
+    index = pd.DatetimeIndex([], name='timestamp')
+    for df in candles.values():
+        index = index.union(df.index)
+    index = index.sort_values()
+
+    aligned_candles = {symbol: df.reindex(index) for symbol, df in candles.items()}
+
+    aligned_flows = pd.DataFrame(index=index)
+    for table, df in flows.items():
+        aligned_flows = aligned_flows.join(df, how='left')
+    aligned_flows = aligned_flows.fillna(0)
+
+    return aligned_candles, aligned_flows
+
+
+def combine(loaded: Dict[str, Any], symbol: str) -> Optional[pd.DataFrame]:
+    """
+    Объединение свечей символа с притоками (формат load_combined_data).
+
+    Args:
+        loaded: Результат AsyncDataLoader.load
+        symbol: Символ торговой пары
+
+    Returns:
+        DataFrame со свечами и колонками притоков или None, если свечей нет
+    """
+    candles = loaded['candles'].get(symbol)
+    if candles is None:
+        return None
+    combined = candles.dropna(how='all').join(loaded['flows'], how='left')
+    return combined.fillna({column: 0 for column in loaded['flows'].columns})
+
+
+async def load_concurrently(symbols: Iterable[str] = ('BTCUSDT',),
+                            flow_tables: Iterable[str] = ('btc_flows',),
+                            lookback_days: int = 365, bucket: Optional[str] = None,
+                            pool_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Загрузка через временный AsyncDataLoader с закрытием пула по завершении.
+
+    Args:
+        symbols: Символы торговых пар
+        flow_tables: Таблицы притоков ETF
+        lookback_days: Количество дней для загрузки данных
+        bucket: Размер агрегированной свечи (по умолчанию CANDLE_BUCKET)
+        pool_size: Максимум одновременных подключений
+
+    Returns:
+        Результат AsyncDataLoader.load
+    """
+    loader = AsyncDataLoader(pool_size=pool_size)
+    try:
+        return await loader.load(
+            symbols,
+            flow_tables,
+            lookback_days,
+            bucket or os.getenv('CANDLE_BUCKET', '1d')
+        )
+    finally:
+        await loader.close()
+
+
+def load_combined_data_async(symbol: str = 'BTCUSDT', lookback_days: int = 365,
+                             loader: Optional[AsyncDataLoader] = None,
+                             loop: Optional[asyncio.AbstractEventLoop] = None) -> Optional[pd.DataFrame]:
+    """
+    Синхронная обертка: свечи символа и притоки btc_flows, загруженные одновременно.
+
+    Args:
+        symbol: Символ торговой пары
+        lookback_days: Количество дней для загрузки данных
+        loader: Долгоживущий загрузчик (DatabaseManager); без него создается временный
+        loop: Цикл событий, к которому привязан пул загрузчика
+
+    Returns:
+        Объединенный DataFrame или None в случае ошибки
+    """
+    if loader is not None:
+        bucket = os.getenv('CANDLE_BUCKET', '1d')
+        loaded = loop.run_until_complete(loader.load([symbol], ['btc_flows'], lookback_days, bucket))
+    else:
+        loaded = asyncio.run(load_concurrently([symbol], ['btc_flows'], lookback_days))
+    combined = combine(loaded, symbol)
+    if combined is None:
+        logger.error("Не удалось загрузить данные Биткоина")
+        return None
+
+    logger.info(f"Объединено {len(combined)} записей")
+    return combined
+
+
+def main():
+    """Загрузка нескольких символов и таблиц притоков с отчетом о времени запросов."""
+    parser = argparse.ArgumentParser(description="Конкурентная загрузка свечей и притоков ETF")
+    parser.add_argument('--symbols', nargs='+', default=[os.getenv('BTC_SYMBOL', 'BTCUSDT')])
+    parser.add_argument('--flows', nargs='+', default=list(FLOW_TABLES), choices=FLOW_TABLES)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--bucket', default=None, choices=sorted(CANDLE_BUCKETS))
+    parser.add_argument('--pool-size', type=int, default=None)
+    args = parser.parse_args()
+
+    loaded = asyncio.run(load_concurrently(args.symbols, args.flows, args.days, args.bucket, args.pool_size))
+
+    print("КОНКУРЕНТНАЯ ЗАГРУЗКА ДАННЫХ")
+    print("=" * 50)
+    for name, timing in sorted(loaded['timings'].items()):
+        print(f"{name:24} {timing['rows']:8} строк  {timing['seconds']:.3f} с "
+              f"(ожидание {timing['wait_seconds']:.3f} с)")
+    for name, error in loaded['errors'].items():
+        print(f"❌ {name}: {error}")
+    query_seconds = sum(timing['seconds'] for timing in loaded['timings'].values())
+    print("=" * 50)
+    print(f"Всего: {loaded['total_seconds']:.3f} с (сумма запросов {query_seconds:.3f} с)")
+    print(f"Общий индекс: {len(loaded['flows'])} меток, колонки притоков: {list(loaded['flows'].columns)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк этапов конвейера trade-model на синтетических данных (без базы данных).
+
+Для каждого сценария (от года дневных свечей до 10 лет 5m свечей) по очереди
+выполняются этапы: генерация данных (create_synthetic_data), агрегация в
+дневные свечи, create_features, prepare_data, обучение, сохранение и загрузка
+модели через joblib и в формате booster + JSON (model_artifact.py), предсказание. Время - медиана по повторам без
+трассировки памяти; пиковая память этапа - отдельный проход с tracemalloc
+(учитываются выделения Python и NumPy, но не внутренние буферы XGBoost).
+
+Результаты сравниваются с сохраненной базой (benchmarks/pipeline_baseline.json);
+при замедлении или росте памяти сверх допуска бенчмарк завершается с кодом 1.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import tempfile
+import statistics
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import joblib
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'pipeline_baseline.json')
+
+# Сценарии: длина истории в днях и частота исходных свечей
+SCENARIOS = {
+    '1y_1d': {'days': 365, 'freq': 'D'},
+    '10y_1d': {'days': 3650, 'freq': 'D'},
+    '1y_5m': {'days': 365, 'freq': '5min'},
+    '10y_5m': {'days': 3650, 'freq': '5min'},
+}
+
+STAGES = ['synthetic_data', 'resample', 'create_features', 'prepare_data',
+          'train', 'joblib_save', 'joblib_load', 'artifact_save', 'artifact_load', 'predict']
+
+# Этапы короче этого порога не считаются регрессией по времени (шум таймера)
+MIN_SECONDS = 0.05
+
+
+def run_pipeline(scenario: Dict[str, Any], workdir: str, trace: bool = False) -> Dict[str, Any]:
+    """
+    Однократный прогон всех этапов.
+
+    Args:
+        scenario: Параметры сценария (days, freq)
+        workdir: Каталог для файла модели
+        trace: Измерять пиковую память этапов через tracemalloc
+
+    Returns:
+        Словарь этап -> {'seconds': ..., 'peak_bytes': ...} и rows - число строк данных
+    """
+    from train_demo import create_synthetic_data
+    from candle_stream import aggregate_candles
+    from features import FeatureEngineer
+    from train import BitcoinPredictor as Trainer
+    from predict import BitcoinPredictor
+    from model_artifact import load_artifact
+
+    results: Dict[str, Any] = {}
+    state: Dict[str, Any] = {}
+    model_path = os.path.join(workdir, 'bench_model.pkl')
+    artifact_path = os.path.join(workdir, 'bench_model.ubj')
+
+    def stage(name: str, func: Callable[[], Any]) -> Any:
+        if trace:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        value = func()
+        seconds = time.perf_counter() - started
+        results[name] = {'seconds': seconds}
+        if trace:
+            _, peak = tracemalloc.get_traced_memory()
+            results[name]['peak_bytes'] = max(0, peak - baseline)
+        return value
+
+    if trace:
+        tracemalloc.start()
+    try:
+        data = stage('synthetic_data', lambda: create_synthetic_data(scenario['days'], scenario['freq']))
+        results['rows'] = len(data)
+        stage('resample', lambda: aggregate_candles(data, 'D'))
+        stage('create_features', lambda: FeatureEngineer().create_features(data))
+
+        trainer = Trainer()
+        X, y, feature_columns = stage('prepare_data', lambda: trainer.prepare_data(data))
+        trainer.feature_columns = feature_columns
+        stage('train', lambda: trainer.train(X, y))
+        stage('joblib_save', lambda: trainer.save_model(model_path))
+        stage('joblib_load', lambda: joblib.load(model_path))
+        stage('artifact_save', lambda: trainer.save_model(artifact_path))
+        stage('artifact_load', lambda: load_artifact(artifact_path))
+
+        state['predictor'] = BitcoinPredictor(model_path)
+        stage('predict', lambda: state['predictor'].predict(data))
+    finally:
+        if trace:
+            tracemalloc.stop()
+
+    return results
+
+
+def measure(name: str, repeats: int, memory: bool) -> Dict[str, Any]:
+    """Медианное время этапов сценария и пиковая память (отдельный проход)."""
+    scenario = SCENARIOS[name]
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = [run_pipeline(scenario, workdir) for _ in range(repeats)]
+        traced = run_pipeline(scenario, workdir, trace=True) if memory else None
+
+    stages = {}
+    rows = runs[0].pop('rows')
+    for stage in STAGES:
+        stages[stage] = {'seconds': statistics.median(run[stage]['seconds'] for run in runs)}
+        if traced is not None:
+            stages[stage]['peak_bytes'] = int(traced[stage]['peak_bytes'])
+    return {'days': scenario['days'], 'freq': scenario['freq'], 'rows': rows, 'stages': stages}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            time_tolerance: float, memory_tolerance: float) -> List[str]:
+    """
+    Сравнение результатов с базой.
+
+    Args:
+        results: Результаты по сценариям ({'scenarios': {name: measure(...)}})
+        baseline: Сохраненная база в том же формате
+        time_tolerance: Допустимое относительное замедление (0.5 = +50%)
+        memory_tolerance: Допустимый относительный рост пиковой памяти
+
+    Returns:
+        Список найденных регрессий
+    """
+    regressions = []
+    for name, result in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            continue
+        for stage, current in result['stages'].items():
+            reference = base['stages'].get(stage)
+            if reference is None:
+                continue
+            limit = reference['seconds'] * (1 + time_tolerance)
+            if current['seconds'] > max(limit, MIN_SECONDS):
+                regressions.append(
+                    f"{name}/{stage}: {current['seconds']:.3f} с > {limit:.3f} с "
+                    f"(база {reference['seconds']:.3f} с)"
+                )
+            if 'peak_bytes' in current and 'peak_bytes' in reference:
+                memory_limit = reference['peak_bytes'] * (1 + memory_tolerance)
+                if current['peak_bytes'] > memory_limit and current['peak_bytes'] - reference['peak_bytes'] > 1024 * 1024:
+                    regressions.append(
+                        f"{name}/{stage}: память {current['peak_bytes'] / 1024 ** 2:.1f} МБ > "
+                        f"{memory_limit / 1024 ** 2:.1f} МБ"
+                    )
+    return regressions
+
+
+def print_table(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    """Таблица этапов по сценариям с отношением к базе."""
+    for name, result in results['scenarios'].items():
+        base = (baseline or {}).get('scenarios', {}).get(name, {}).get('stages', {})
+        print(f"\n{name} ({result['rows']} строк, {result['freq']})")
+        print(f"  {'этап':16} {'время, с':>10} {'память, МБ':>11} {'к базе':>8}")
+        for stage, current in result['stages'].items():
+            memory = current.get('peak_bytes')
+            memory_text = f"{memory / 1024 ** 2:11.1f}" if memory is not None else f"{'-':>11}"
+            ratio = ''
+            if stage in base and base[stage]['seconds'] > 0:
+                ratio = f"{current['seconds'] / base[stage]['seconds']:7.2f}x"
+            print(f"  {stage:16} {current['seconds']:10.3f} {memory_text} {ratio:>8}")
+
+
+def main(argv=None) -> int:
+    """Основная функция бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк этапов конвейера trade-model")
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--no-memory', action='store_true', help="Не измерять пиковую память (быстрее)")
+    parser.add_argument('--output', help="Сохранить результаты в JSON")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Файл базовых результатов")
+    parser.add_argument('--record', action='store_true', help="Записать результаты как новую базу")
+    parser.add_argument('--time-tolerance', type=float, default=0.5,
+                        help="Допустимое замедление этапа (0.5 = +50%%)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.2,
+                        help="Допустимый рост пиковой памяти этапа (0.2 = +20%%)")
+    args = parser.parse_args(argv)
+
+    # Логи этапов на каждом повторе не нужны
+    logging.disable(logging.INFO)
+
+    results = {
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'scenarios': {
+            name: measure(name, args.repeats, not args.no_memory)
+            for name in args.scenarios
+        }
+    }
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.record:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print("БЕНЧМАРК КОНВЕЙЕРА")
+    print("=" * 50)
+    print_table(results, baseline)
+
+    for path in filter(None, [args.output, args.baseline if args.record else None]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"\nРезультаты сохранены в {path}")
+
+    print("=" * 50)
+    if args.record:
+        return 0
+    if baseline is None:
+        print(f"⚠️  База не найдена ({args.baseline}), запустите с --record")
+        return 0
+
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        for regression in regressions:
+            print(f"❌ {regression}")
+        return 1
+
+    print("✅ Регрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк холодного старта предсказания (predict.load_model).
+
+Запускает новый интерпретатор с `python -X importtime`, измеряет время импорта
+и загрузки модели и сравнивает результат с сохраненным бюджетом. Завершается
+с кодом 1, если бюджет превышен или при старте импортируются модули,
+которые нужны только для обучения или работы с базой данных.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List, Tuple
+
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'startup_budget.json')
+
+# Модули, которые не должны загружаться при старте предсказания.
+# sklearn здесь не указан: его подтягивает сам xgboost при распаковке XGBClassifier.
+FORBIDDEN_MODULES = ['train', 'db', 'sqlalchemy', 'psycopg2']
+
+STARTUP_SNIPPET = (
+    "import time, json\n"
+    "t0 = time.perf_counter()\n"
+    "import predict\n"
+    "t1 = time.perf_counter()\n"
+    "predict.load_model({model_path!r})\n"
+    "t2 = time.perf_counter()\n"
+    "print(json.dumps({{'import_predict': t1 - t0, 'load_model': t2 - t1}}))\n"
+)
+
+
+def parse_importtime(stderr: str) -> Tuple[List[Tuple[str, int, int]], List[str]]:
+    """
+    Разбор вывода `-X importtime`.
+
+    Returns:
+        Tuple со списком модулей верхнего уровня (имя, self мкс, cumulative мкс)
+        и списком всех импортированных модулей
+    """
+    top_level = []
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append(name.strip())
+        # Модули верхнего уровня идут без дополнительного отступа
+        if name[1:2] != ' ':
+            top_level.append((name.strip(), int(self_us), int(cumulative_us)))
+    return top_level, modules
+
+
+def run_once(model_path: str) -> Dict[str, Any]:
+    """Один холодный запуск интерпретатора."""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SNIPPET.format(model_path=model_path)],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    wall = time.perf_counter() - started
+
+    if completed.returncode != 0:
+        raise RuntimeError(f"Запуск завершился с ошибкой:\n{completed.stderr[-2000:]}")
+
+    stages = json.loads(completed.stdout.strip().splitlines()[-1])
+    top_level, modules = parse_importtime(completed.stderr)
+
+    return {
+        'cold_start_seconds': wall,
+        'import_seconds': sum(cumulative for _, _, cumulative in top_level) / 1e6,
+        'import_predict_seconds': stages['import_predict'],
+        'load_model_seconds': stages['load_model'],
+        'top_imports': sorted(top_level, key=lambda x: x[2], reverse=True)[:10],
+        'modules': modules
+    }
+
+
+def measure(model_path: str, runs: int) -> Dict[str, Any]:
+    """Медиана по нескольким холодным запускам."""
+    results = [run_once(model_path) for _ in range(runs)]
+    summary = {
+        key: statistics.median(r[key] for r in results)
+        for key in ('cold_start_seconds', 'import_seconds', 'import_predict_seconds', 'load_model_seconds')
+    }
+    summary['top_imports'] = results[-1]['top_imports']
+    summary['forbidden_loaded'] = sorted({
+        module for r in results for module in r['modules']
+        if any(module == f or module.startswith(f + '.') for f in FORBIDDEN_MODULES)
+    })
+    return summary
+
+
+def main(argv=None) -> int:
+    """Основная функция бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк холодного старта predict.load_model")
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'models/etf_model_v1.ubj'))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', default=BUDGET_PATH, help="Файл с бюджетом времени старта")
+    parser.add_argument('--record', action='store_true',
+                        help="Записать текущие измерения (с запасом) как новый бюджет")
+    parser.add_argument('--headroom', type=float, default=0.5,
+                        help="Запас при записи бюджета (0.5 = +50%%)")
+    args = parser.parse_args(argv)
+
+    summary = measure(args.model, args.runs)
+
+    print("ХОЛОДНЫЙ СТАРТ predict.load_model")
+    print("=" * 50)
+    print(f"Полный старт интерпретатора: {summary['cold_start_seconds']:.3f} с")
+    print(f"Суммарное время импортов:    {summary['import_seconds']:.3f} с")
+    print(f"  import predict:            {summary['import_predict_seconds']:.3f} с")
+    print(f"  load_model:                {summary['load_model_seconds']:.3f} с")
+    print("\nСАМЫЕ ДОЛГИЕ ИМПОРТЫ:")
+    for name, _, cumulative in summary['top_imports']:
+        print(f"  {name:30} {cumulative / 1e3:8.1f} мс")
+
+    if args.record:
+        budget = {
+            'cold_start_seconds': round(summary['cold_start_seconds'] * (1 + args.headroom), 3),
+            'import_seconds': round(summary['import_seconds'] * (1 + args.headroom), 3),
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0]
+        }
+        os.makedirs(os.path.dirname(args.budget), exist_ok=True)
+        with open(args.budget, 'w', encoding='utf-8') as f:
+            json.dump(budget, f, indent=2)
+            f.write('\n')
+        print(f"\nБюджет записан в {args.budget}")
+        return 0
+
+    failures = []
+    if summary['forbidden_loaded']:
+        failures.append(f"Загружены лишние модули: {', '.join(summary['forbidden_loaded'])}")
+
+    if os.path.exists(args.budget):
+        with open(args.budget, 'r', encoding='utf-8') as f:
+            budget = json.load(f)
+        for key in ('cold_start_seconds', 'import_seconds'):
+            if key in budget and summary[key] > budget[key]:
+                failures.append(f"{key}: {summary[key]:.3f} с > бюджет {budget[key]:.3f} с")
+    else:
+        print(f"\n⚠️  Бюджет не найден ({args.budget}), запустите с --record")
+
+    print("=" * 50)
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+
+    print("✅ Холодный старт в пределах бюджета")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Потоковая агрегация свечей по частям.
+
+Строки свечей (1m/5m) приходят частями, упорядоченными по времени, и сразу
+сворачиваются в свечи нужного размера. В памяти хранятся только готовые
+агрегаты и один незавершенный интервал, поэтому потребление памяти
+пропорционально результату, а не числу исходных строк. Внутридневные
+статистики (intraday.py) сворачиваются той же группировкой.
+"""
+
+import logging
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+# Local imports
+from intraday import INTRADAY_AGG, bar_statistics, finalize_intraday
+from instrumentation import span
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+OHLCV_AGG = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum'
+}
+
+# Объединение частичных агрегатов одного интервала из соседних частей
+MERGE_AGG = {**OHLCV_AGG, **INTRADAY_AGG}
+
+
+def aggregate_candles(df: pd.DataFrame, rule: str, intraday: bool = False) -> pd.DataFrame:
+    """
+    Агрегация исходных свечей в свечи нужного размера за один проход.
+
+    Args:
+        df: Исходные свечи с DatetimeIndex и колонками OHLCV
+        rule: Размер свечи в нотации pandas
+        intraday: Добавить внутридневные статистики (intraday.INTRADAY_FEATURES)
+
+    Returns:
+        DataFrame с OHLCV (и внутридневными признаками)
+    """
+    with span('resample', rows=len(df)):
+        if not intraday:
+            return df.resample(rule).agg(OHLCV_AGG).dropna()
+
+        frame = pd.concat([df[list(OHLCV_AGG)], bar_statistics(df, df.index)], axis=1)
+        aggregated = frame.groupby(df.index.floor(rule)).agg(MERGE_AGG)
+        aggregated.index.name = df.index.name
+        return finalize_intraday(aggregated.dropna(subset=list(OHLCV_AGG)))
+
+
+class CandleAggregator:
+    """Накопительная агрегация OHLCV по частям, упорядоченным по времени."""
+
+    def __init__(self, rule: str, time_column: str = 'timestamp', intraday: bool = False):
+        """
+        Инициализация агрегатора.
+
+        Args:
+            rule: Размер свечи в нотации pandas ('1h', '4h', 'D')
+            time_column: Колонка с временем открытия исходной свечи
+            intraday: Собирать внутридневные статистики (intraday.py)
+        """
+        self.rule = rule
+        self.time_column = time_column
+        self.intraday = intraday
+        self._agg = dict(MERGE_AGG) if intraday else dict(OHLCV_AGG)
+        self.rows_seen = 0
+        self.chunks_seen = 0
+        self._done: List[pd.DataFrame] = []
+        self._pending: Optional[pd.DataFrame] = None
+        self._last_time: Optional[pd.Timestamp] = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Добавление очередной части исходных свечей.
+
+        Args:
+            chunk: DataFrame с колонкой времени и колонками OHLCV
+        """
+        if chunk.empty:
+            return
+
+        times = pd.to_datetime(chunk[self.time_column])
+        if not times.is_monotonic_increasing or (
+                self._last_time is not None and times.iloc[0] < self._last_time):
+            raise ValueError("Части свечей должны быть упорядочены по времени")
+
+        frame = chunk[list(OHLCV_AGG)]
+        if self.intraday:
+            frame = pd.concat([frame, bar_statistics(frame, times)], axis=1)
+        partial = frame.groupby(times.dt.floor(self.rule).values, sort=False).agg(self._agg)
+        self._last_time = times.iloc[-1]
+        self.rows_seen += len(chunk)
+        self.chunks_seen += 1
+
+        if self._pending is not None:
+            if self._pending.index[0] == partial.index[0]:
+                # Интервал начался в предыдущей части: сливаем частичные агрегаты
+                # (first/last/max/min/sum объединяются теми же функциями)
+                merged = pd.concat([self._pending, partial.iloc[:1]]).groupby(level=0).agg(self._agg)
+                partial = pd.concat([merged, partial.iloc[1:]])
+            else:
+                self._done.append(self._pending)
+
+        # Все интервалы, кроме последнего, завершены: следующая часть начинается позже
+        if len(partial) > 1:
+            self._done.append(partial.iloc[:-1])
+        self._pending = partial.iloc[-1:]
+
+    def result(self) -> pd.DataFrame:
+        """
+        Агрегированные свечи (последний интервал может быть неполным).
+
+        Returns:
+            DataFrame с OHLCV и индексом timestamp
+        """
+        frames = self._done + ([self._pending] if self._pending is not None else [])
+        if not frames:
+            return pd.DataFrame(columns=list(OHLCV_AGG), index=pd.DatetimeIndex([], name='timestamp'))
+
+        df = pd.concat(frames)
+        df.index = pd.DatetimeIndex(df.index, name='timestamp')
+        df = df.dropna(subset=list(OHLCV_AGG))
+        return finalize_intraday(df) if self.intraday else df
+
+
+def aggregate_candle_chunks(chunks: Iterable[pd.DataFrame], rule: str,
+                            time_column: str = 'timestamp', intraday: bool = False) -> pd.DataFrame:
+    """
+    Свертка итератора частей исходных свечей в свечи нужного размера.
+
+    Args:
+        chunks: Части исходных свечей, упорядоченные по времени
+        rule: Размер свечи в нотации pandas
+        time_column: Колонка с временем открытия исходной свечи
+        intraday: Добавить внутридневные статистики (intraday.INTRADAY_FEATURES)
+
+    Returns:
+        DataFrame с агрегированными OHLCV (и внутридневными признаками)
+    """
+    aggregator = CandleAggregator(rule, time_column, intraday)
+    for chunk in chunks:
+        aggregator.update(chunk)
+
+    logger.info(
+        f"Свернуто {aggregator.rows_seen} строк в {aggregator.chunks_seen} частях "
+        f"({rule})"
+    )
+    return aggregator.result()
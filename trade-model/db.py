@@ -3,12 +3,20 @@ Database connection and data loading utilities for ETF Bitcoin prediction model.
 """
 
 import os
+import time
+import threading
 import pandas as pd
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
 from dotenv import load_dotenv
 import logging
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional
+
+# Local imports
+from candle_stream import aggregate_candles, aggregate_candle_chunks
+from intraday import SESSIONS, finalize_intraday
+from dtype_policy import DtypePolicy
+from instrumentation import span
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +25,178 @@ logger = logging.getLogger(__name__)
 # Загрузка переменных окружения
 load_dotenv()
 
+# Размеры агрегированных свечей: правило resample для pandas и выражение группировки для SQL
+CANDLE_BUCKETS = {
+    '1h': {
+        'rule': '1h',
+        'sql': "DATE_TRUNC('hour', open_time)"
+    },
+    '4h': {
+        'rule': '4h',
+        'sql': "DATE_TRUNC('day', open_time) + FLOOR(EXTRACT(HOUR FROM open_time) / 4) * INTERVAL '4 hours'"
+    },
+    '1d': {
+        'rule': 'D',
+        'sql': "DATE_TRUNC('day', open_time)"
+    },
+}
+
+# Таблицы с притоками ETF по активам
+FLOW_TABLES = ('btc_flows', 'eth_flow', 'sol_flow')
+
+# Колонки притоков по эмитентам (схема backend/prisma/schema.prisma) и суммарный приток
+FLOW_ISSUERS = {
+    'btc_flows': ('blackrock', 'fidelity', 'bitwise', 'twentyOneShares', 'vanEck', 'invesco',
+                  'franklin', 'grayscale', 'grayscaleBtc', 'valkyrie', 'wisdomTree', 'total'),
+    'eth_flow': ('blackrock', 'fidelity', 'bitwise', 'twentyOneShares', 'vanEck', 'invesco',
+                 'franklin', 'grayscale', 'grayscaleEth', 'total'),
+    'sol_flow': ('bitwise', 'vanEck', 'fidelity', 'twentyOneShares', 'grayscale', 'total'),
+}
+
+
+def database_url(driver: str = 'postgresql') -> str:
+    """
+    Строка подключения к PostgreSQL из переменных окружения.
+    
+    Args:
+        driver: Диалект и драйвер SQLAlchemy ('postgresql' или 'postgresql+asyncpg')
+        
+    Returns:
+        URL подключения
+    """
+    db_host = os.getenv('DB_HOST', 'localhost')
+    db_port = os.getenv('DB_PORT', '5432')
+    db_name = os.getenv('DB_NAME', 'etf_tracker')
+    db_user = os.getenv('DB_USER', 'postgres')
+    db_password = os.getenv('DB_PASSWORD', '')
+    
+    return f"{driver}://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+
+def intraday_enabled() -> bool:
+    """Собирать ли внутридневные статистики при агрегации свечей (CANDLE_INTRADAY)."""
+    return os.getenv('CANDLE_INTRADAY', 'false').lower() in ('1', 'true', 'yes')
+
+
+def intraday_sql() -> str:
+    """
+    Слагаемые внутридневных статистик (intraday.INTRADAY_AGG) в виде агрегатов SQL.
+    
+    Результат дописывается к списку SELECT запроса агрегации и превращается
+    в признаки функцией intraday.finalize_intraday.
+    """
+    columns = [
+        "SUM(POWER(LN(close / NULLIF(open, 0)), 2)) AS sum_sq_return",
+        "MAX(ABS(LN(close / NULLIF(open, 0)))) AS max_abs_return",
+        "SUM((high + low + close) / 3 * volume) AS sum_price_volume",
+        "COALESCE(SUM(volume) FILTER (WHERE close > open), 0) AS up_volume",
+        "COALESCE(SUM(volume) FILTER (WHERE close < open), 0) AS down_volume",
+    ]
+    # Час берется так же, как в границах 4h свечей (CANDLE_BUCKETS)
+    hour = "EXTRACT(HOUR FROM open_time)"
+    for session, start, end in SESSIONS:
+        condition = f"{hour} >= {start} AND {hour} < {end}"
+        columns.append(f"MAX(high) FILTER (WHERE {condition}) AS {session}_high")
+        columns.append(f"MIN(low) FILTER (WHERE {condition}) AS {session}_low")
+    return ''.join(f",\n            {column}" for column in columns)
+
+
+def candles_query(bucket: str, intraday: bool = False):
+    """
+    Запрос агрегации 5m свечей на стороне PostgreSQL.
+    
+    open/close берутся по первой/последней свече в интервале (first/last по open_time),
+    выборка идет по индексу idx_btc_candles_symbol_interval_time.
+    При intraday=True в том же проходе считаются слагаемые внутридневных статистик.
+    Параметры запроса: symbol, lookback_days.
+    """
+    return text(f"""
+        SELECT
+            {CANDLE_BUCKETS[bucket]['sql']} AS timestamp,
+            (ARRAY_AGG(open ORDER BY open_time ASC))[1] AS open,
+            MAX(high) AS high,
+            MIN(low) AS low,
+            (ARRAY_AGG(close ORDER BY open_time DESC))[1] AS close,
+            SUM(volume) AS volume{intraday_sql() if intraday else ''}
+        FROM btc_candles
+        WHERE symbol = :symbol
+        AND interval = '5m'
+        AND open_time >= NOW() - MAKE_INTERVAL(days => :lookback_days)
+        GROUP BY 1
+        ORDER BY 1 ASC
+    """)
+
+
+def panel_candles_query(bucket: str, intraday: bool = False):
+    """
+    Запрос агрегации 5m свечей сразу для нескольких символов.
+    
+    Один проход по btc_candles с группировкой по символу и интервалу вместо
+    отдельного запроса на каждый символ. Параметры запроса: symbols (список),
+    lookback_days.
+    """
+    return text(f"""
+        SELECT
+            symbol,
+            {CANDLE_BUCKETS[bucket]['sql']} AS timestamp,
+            (ARRAY_AGG(open ORDER BY open_time ASC))[1] AS open,
+            MAX(high) AS high,
+            MIN(low) AS low,
+            (ARRAY_AGG(close ORDER BY open_time DESC))[1] AS close,
+            SUM(volume) AS volume{intraday_sql() if intraday else ''}
+        FROM btc_candles
+        WHERE symbol = ANY(:symbols)
+        AND interval = '5m'
+        AND open_time >= NOW() - MAKE_INTERVAL(days => :lookback_days)
+        GROUP BY 1, 2
+        ORDER BY 1, 2 ASC
+    """)
+
+
+def flow_issuers_query(table: str):
+    """
+    Запрос всех колонок притоков таблицы: по эмитентам и суммарного.
+    
+    Args:
+        table: Таблица притоков (btc_flows, eth_flow, sol_flow)
+        
+    Параметр запроса: lookback_days.
+    """
+    if table not in FLOW_ISSUERS:
+        raise ValueError(f"Неизвестная таблица притоков: {table}")
+    # Колонки Prisma в camelCase - идентификаторы в кавычках
+    columns = ', '.join(f'"{column}"' for column in FLOW_ISSUERS[table])
+    return text(f"""
+        SELECT 
+            date,
+            {columns}
+        FROM {table} 
+        WHERE date >= NOW() - MAKE_INTERVAL(days => :lookback_days)
+        ORDER BY date ASC
+    """)
+
+
+def flows_query(table: str, column: str = 'etf_flow'):
+    """
+    Запрос суммарных притоков ETF из таблицы притоков.
+    
+    Args:
+        table: Таблица притоков (btc_flows, eth_flow, sol_flow)
+        column: Имя колонки с суммарным притоком в результате
+        
+    Параметр запроса: lookback_days.
+    """
+    if table not in FLOW_TABLES:
+        raise ValueError(f"Неизвестная таблица притоков: {table}")
+    return text(f"""
+        SELECT 
+            date,
+            total as {column}
+        FROM {table} 
+        WHERE date >= NOW() - MAKE_INTERVAL(days => :lookback_days)
+        ORDER BY date ASC
+    """)
+
 
 class DatabaseManager:
     """Менеджер для работы с базой данных PostgreSQL."""
@@ -24,23 +204,32 @@ class DatabaseManager:
     def __init__(self):
         """Инициализация подключения к базе данных."""
         self.engine = None
+        self.local_cache = None
+        # Асинхронный загрузчик (DB_ASYNC_LOAD) и его цикл событий: создаются один раз,
+        # пул asyncpg привязан к циклу и переиспользуется между загрузками
+        self.async_loader = None
+        self.async_loop = None
+        self._async_lock = threading.Lock()
+        # Типы колонок загруженных данных (DTYPE_POLICY)
+        self.dtype_policy = DtypePolicy.from_env()
+        # Время последней попытки подключения (для ограничения частоты повторов)
+        self.last_connect_attempt = 0.0
         self._connect()
     
     def _connect(self) -> None:
         """Создание подключения к базе данных."""
+        self.last_connect_attempt = time.monotonic()
         try:
-            db_host = os.getenv('DB_HOST', 'localhost')
-            db_port = os.getenv('DB_PORT', '5432')
-            db_name = os.getenv('DB_NAME', 'etf_tracker')
-            db_user = os.getenv('DB_USER', 'postgres')
-            db_password = os.getenv('DB_PASSWORD', '')
-            
-            connection_string = (
-                f"postgresql://{db_user}:{db_password}@"
-                f"{db_host}:{db_port}/{db_name}"
-            )
+            connection_string = database_url()
             
-            self.engine = create_engine(connection_string)
+            # Пул подключений переиспользуется между запросами (важно для serve.py)
+            self.engine = create_engine(
+                connection_string,
+                pool_size=int(os.getenv('DB_POOL_SIZE', '5')),
+                max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '5')),
+                pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+                pool_pre_ping=True
+            )
             
             # Проверка подключения
             with self.engine.connect() as conn:
@@ -50,102 +239,353 @@ class DatabaseManager:
             
         except SQLAlchemyError as e:
             logger.error(f"Ошибка подключения к базе данных: {e}")
+            if self.engine is not None:
+                self.engine.dispose()
             self.engine = None
     
     def is_connected(self) -> bool:
         """Проверка состояния подключения."""
         return self.engine is not None
     
-    def load_bitcoin_data(self, symbol: str = 'BTCUSDT', lookback_days: int = 365) -> Optional[pd.DataFrame]:
+    def reconnect(self) -> bool:
+        """
+        Повторное подключение, если база была недоступна.
+        
+        Попытки выполняются не чаще DB_RECONNECT_INTERVAL секунд (по умолчанию 5),
+        чтобы запросы к серверу при недоступной базе не ждали таймаута подключения
+        каждый раз.
+        
+        Returns:
+            True, если подключение есть
+        """
+        if self.is_connected():
+            return True
+        interval = float(os.getenv('DB_RECONNECT_INTERVAL', '5'))
+        if time.monotonic() - self.last_connect_attempt < interval:
+            return False
+        logger.info("Повторное подключение к базе данных...")
+        self._connect()
+        if self.local_cache is not None:
+            self.local_cache.engine = self.engine
+        return self.is_connected()
+    
+    def use_local_cache(self) -> bool:
+        """Читать ли данные из локального колоночного кэша (DATA_SOURCE=local)."""
+        return os.getenv('DATA_SOURCE', 'db').lower() == 'local'
+    
+    def get_local_cache(self):
+        """Локальный кэш таблиц (создается при первом обращении, требует pyarrow)."""
+        if self.local_cache is None:
+            from local_cache import LocalDataCache
+            self.local_cache = LocalDataCache(self.engine)
+        return self.local_cache
+    
+    def load_bitcoin_data(self, symbol: str = 'BTCUSDT', lookback_days: int = 365,
+                          aggregation: Optional[str] = None, bucket: Optional[str] = None) -> Optional[pd.DataFrame]:
         """
         Загрузка данных о цене Биткоина из базы данных.
         
         Args:
             symbol: Символ торговой пары (по умолчанию BTCUSDT)
             lookback_days: Количество дней для загрузки данных
+            aggregation: Где агрегировать 5m свечи (по умолчанию CANDLE_AGGREGATION,
+                а при DATA_SOURCE=local - 'local'):
+                'sql' - на стороне PostgreSQL, 'pandas' - загрузка всех 5m строк
+                и resample в pandas, 'materialized' - из таблицы btc_candles_daily
+                с инкрементальным обновлением (только '1d'), 'local' - из локального
+                Parquet-снимка, дополняемого только новыми строками, 'stream' -
+                чтение исходных свечей (CANDLE_SOURCE_INTERVAL) частями через
+                серверный курсор со сверткой в агрегаты по мере поступления
+            bucket: Размер свечи: '1h', '4h' или '1d' (по умолчанию CANDLE_BUCKET)
+            
+        При CANDLE_INTRADAY=true в том же проходе агрегации добавляются внутридневные
+        статистики (intraday.INTRADAY_FEATURES) во всех режимах, кроме 'materialized'.
             
         Returns:
             DataFrame с данными OHLCV или None в случае ошибки
         """
-        if not self.is_connected():
+        if aggregation is None:
+            aggregation = 'local' if self.use_local_cache() else os.getenv('CANDLE_AGGREGATION', 'sql')
+        
+        # Локальный снимок можно читать и без подключения к базе данных
+        if not self.is_connected() and aggregation != 'local':
             logger.error("Нет подключения к базе данных")
             return None
         
+        bucket = bucket or os.getenv('CANDLE_BUCKET', '1d')
+        
+        if bucket not in CANDLE_BUCKETS:
+            raise ValueError(f"Неизвестный размер свечи: {bucket}")
+        
         try:
-            query = text("""
-                SELECT 
-                    open_time as timestamp,
-                    open,
-                    high,
-                    low,
-                    close,
-                    volume
-                FROM btc_candles 
-                WHERE symbol = :symbol 
-                AND interval = '5m'
-                AND open_time >= NOW() - INTERVAL ':lookback_days days'
-                ORDER BY open_time ASC
-            """)
+            with span('db.load_candles') as stage:
+                if aggregation == 'sql':
+                    df = self._load_candles_sql(symbol, lookback_days, bucket)
+                elif aggregation == 'pandas':
+                    df = self._load_candles_pandas(symbol, lookback_days, bucket)
+                elif aggregation == 'local':
+                    df = self._load_candles_local(symbol, lookback_days, bucket)
+                elif aggregation == 'stream':
+                    df = self._load_candles_stream(symbol, lookback_days, bucket)
+                elif aggregation == 'materialized':
+                    if bucket != '1d':
+                        raise ValueError("Материализованная таблица содержит только дневные свечи")
+                    if intraday_enabled():
+                        logger.warning("Таблица btc_candles_daily не содержит внутридневных статистик")
+                    # Чтение пишет в таблицу, только если в btc_candles появились новые свечи
+                    if self.daily_candles_stale(symbol):
+                        self.refresh_daily_candles(symbol)
+                    df = self._load_candles_materialized(symbol, lookback_days)
+                else:
+                    raise ValueError(f"Неизвестный режим агрегации: {aggregation}")
+                stage.record(df)
             
-            df = pd.read_sql(
-                query, 
-                self.engine, 
-                params={'symbol': symbol, 'lookback_days': lookback_days}
-            )
-            
-            if df.empty:
+            if df is None or df.empty:
                 logger.warning(f"Нет данных для символа {symbol}")
                 return None
             
-            # Конвертация timestamp в datetime
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df.set_index('timestamp', inplace=True)
-            
-            # Агрегация в дневные данные
-            df_daily = df.resample('D').agg({
-                'open': 'first',
-                'high': 'max',
-                'low': 'min',
-                'close': 'last',
-                'volume': 'sum'
-            }).dropna()
-            
-            logger.info(f"Загружено {len(df_daily)} дневных записей для {symbol}")
-            return df_daily
+            logger.info(f"Загружено {len(df)} записей ({bucket}, {aggregation}) для {symbol}")
+            return self.dtype_policy.apply(df)
             
         except SQLAlchemyError as e:
             logger.error(f"Ошибка загрузки данных Биткоина: {e}")
             return None
     
+    def _load_candles_pandas(self, symbol: str, lookback_days: int, bucket: str) -> Optional[pd.DataFrame]:
+        """Загрузка всех 5m свечей и агрегация в pandas."""
+        query = text("""
+            SELECT 
+                open_time as timestamp,
+                open,
+                high,
+                low,
+                close,
+                volume
+            FROM btc_candles 
+            WHERE symbol = :symbol 
+            AND interval = '5m'
+            AND open_time >= NOW() - MAKE_INTERVAL(days => :lookback_days)
+            ORDER BY open_time ASC
+        """)
+        
+        df = pd.read_sql(
+            query, 
+            self.engine, 
+            params={'symbol': symbol, 'lookback_days': int(lookback_days)}
+        )
+        
+        if df.empty:
+            return None
+        
+        # Конвертация timestamp в datetime
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df.set_index('timestamp', inplace=True)
+        
+        # Агрегация в свечи нужного размера
+        return aggregate_candles(df, CANDLE_BUCKETS[bucket]['rule'], intraday_enabled())
+    
+    def _load_candles_sql(self, symbol: str, lookback_days: int, bucket: str) -> Optional[pd.DataFrame]:
+        """
+        Агрегация 5m свечей на стороне PostgreSQL.
+        
+        open/close берутся по первой/последней свече в интервале (first/last по open_time),
+        выборка идет по индексу idx_btc_candles_symbol_interval_time.
+        """
+        intraday = intraday_enabled()
+        query = candles_query(bucket, intraday)
+        
+        df = pd.read_sql(
+            query,
+            self.engine,
+            params={'symbol': symbol, 'lookback_days': int(lookback_days)},
+            parse_dates=['timestamp'],
+            index_col='timestamp'
+        )
+        
+        if df.empty:
+            return None
+        return finalize_intraday(df.astype(float)) if intraday else df
+    
+    def _load_candles_stream(self, symbol: str, lookback_days: int, bucket: str) -> Optional[pd.DataFrame]:
+        """
+        Потоковая загрузка исходных свечей с агрегацией по частям.
+        
+        Строки читаются через серверный курсор частями по CANDLE_STREAM_CHUNKSIZE
+        и сразу сворачиваются в свечи размера bucket, поэтому пиковая память
+        определяется размером результата, а не длиной истории. Интервал исходных
+        свечей задается CANDLE_SOURCE_INTERVAL (например, '1m' для многолетней
+        минутной истории).
+        """
+        source_interval = os.getenv('CANDLE_SOURCE_INTERVAL', '5m')
+        chunksize = int(os.getenv('CANDLE_STREAM_CHUNKSIZE', '50000'))
+        
+        query = text("""
+            SELECT 
+                open_time as timestamp,
+                open,
+                high,
+                low,
+                close,
+                volume
+            FROM btc_candles 
+            WHERE symbol = :symbol 
+            AND interval = :interval
+            AND open_time >= NOW() - MAKE_INTERVAL(days => :lookback_days)
+            ORDER BY open_time ASC
+        """)
+        
+        with self.engine.connect() as conn:
+            # stream_results включает именованный (серверный) курсор psycopg2
+            conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+            chunks = pd.read_sql(
+                query,
+                conn,
+                params={'symbol': symbol, 'interval': source_interval, 'lookback_days': int(lookback_days)},
+                chunksize=chunksize
+            )
+            df = aggregate_candle_chunks(chunks, CANDLE_BUCKETS[bucket]['rule'], intraday=intraday_enabled())
+        
+        return None if df.empty else df
+    
+    def _load_candles_local(self, symbol: str, lookback_days: int, bucket: str) -> Optional[pd.DataFrame]:
+        """Агрегация 5m свечей из локального снимка (в базу уходит только запрос новых строк)."""
+        df = self.get_local_cache().sync_candles(symbol, '5m')
+        if df.empty:
+            return None
+        
+        df = df[df['open_time'] >= _lookback_start(lookback_days)].set_index('open_time')
+        df.index.name = 'timestamp'
+        
+        return aggregate_candles(df, CANDLE_BUCKETS[bucket]['rule'], intraday_enabled())
+    
+    def refresh_daily_candles(self, symbol: str = 'BTCUSDT') -> int:
+        """
+        Инкрементальное обновление таблицы btc_candles_daily.
+        
+        Пересчитываются только дни начиная с последнего сохраненного (он мог быть
+        неполным), остальные строки таблицы не затрагиваются.
+        
+        Args:
+            symbol: Символ торговой пары
+            
+        Returns:
+            Количество вставленных или обновленных дней
+        """
+        query = text(f"""
+            INSERT INTO btc_candles_daily (symbol, day, open, high, low, close, volume, bar_count,
+                                           last_open_time, updated_at)
+            SELECT
+                symbol,
+                {CANDLE_BUCKETS['1d']['sql']} AS day,
+                (ARRAY_AGG(open ORDER BY open_time ASC))[1],
+                MAX(high),
+                MIN(low),
+                (ARRAY_AGG(close ORDER BY open_time DESC))[1],
+                SUM(volume),
+                COUNT(*),
+                MAX(open_time),
+                NOW()
+            FROM btc_candles
+            WHERE symbol = :symbol
+            AND interval = '5m'
+            AND open_time >= COALESCE(
+                (SELECT MAX(day) FROM btc_candles_daily WHERE symbol = :symbol),
+                '-infinity'::timestamp
+            )
+            GROUP BY symbol, 2
+            ON CONFLICT (symbol, day) DO UPDATE SET
+                open = EXCLUDED.open,
+                high = EXCLUDED.high,
+                low = EXCLUDED.low,
+                close = EXCLUDED.close,
+                volume = EXCLUDED.volume,
+                bar_count = EXCLUDED.bar_count,
+                last_open_time = EXCLUDED.last_open_time,
+                updated_at = EXCLUDED.updated_at
+        """)
+        
+        with self.engine.begin() as conn:
+            updated = conn.execute(query, {'symbol': symbol}).rowcount
+        
+        logger.info(f"Обновлено {updated} дневных свечей в btc_candles_daily для {symbol}")
+        return updated
+    
+    def daily_candles_stale(self, symbol: str = 'BTCUSDT') -> bool:
+        """
+        Есть ли в btc_candles 5m свечи новее водяного знака btc_candles_daily.
+        
+        Запрос только читает: оба MAX обслуживаются индексами (MAX(last_open_time)
+        берется по строкам одного символа в дневной таблице).
+        
+        Args:
+            symbol: Символ торговой пары
+            
+        Returns:
+            True, если таблицу нужно обновить (refresh_daily_candles)
+        """
+        query = text("""
+            SELECT
+                (SELECT MAX(open_time) FROM btc_candles
+                 WHERE symbol = :symbol AND interval = '5m') AS source_max_open_time,
+                (SELECT MAX(last_open_time) FROM btc_candles_daily
+                 WHERE symbol = :symbol) AS daily_max_open_time
+        """)
+        
+        with self.engine.connect() as conn:
+            row = conn.execute(query, {'symbol': symbol}).mappings().one()
+        
+        source, daily = row['source_max_open_time'], row['daily_max_open_time']
+        return source is not None and (daily is None or source > daily)
+    
+    def _load_candles_materialized(self, symbol: str, lookback_days: int) -> Optional[pd.DataFrame]:
+        """Чтение дневных свечей из таблицы btc_candles_daily."""
+        query = text("""
+            SELECT day AS timestamp, open, high, low, close, volume
+            FROM btc_candles_daily
+            WHERE symbol = :symbol
+            AND day >= DATE_TRUNC('day', NOW() - MAKE_INTERVAL(days => :lookback_days))
+            ORDER BY day ASC
+        """)
+        
+        df = pd.read_sql(
+            query,
+            self.engine,
+            params={'symbol': symbol, 'lookback_days': int(lookback_days)},
+            parse_dates=['timestamp'],
+            index_col='timestamp'
+        )
+        
+        return None if df.empty else df
+    
     def load_etf_flow_data(self, lookback_days: int = 365) -> Optional[pd.DataFrame]:
         """
         Загрузка данных о притоках ETF из базы данных.
         
+        При DATA_SOURCE=local данные читаются из локального снимка btc_flows.
+        
         Args:
             lookback_days: Количество дней для загрузки данных
             
         Returns:
             DataFrame с данными о притоках ETF или None в случае ошибки
         """
+        if self.use_local_cache():
+            with span('db.load_flows') as stage:
+                return stage.record(self._load_etf_flow_local(lookback_days))
+        
         if not self.is_connected():
             logger.error("Нет подключения к базе данных")
             return None
         
         try:
-            query = text("""
-                SELECT 
-                    date,
-                    total as etf_flow
-                FROM btc_flows 
-                WHERE date >= NOW() - INTERVAL ':lookback_days days'
-                ORDER BY date ASC
-            """)
+            query = flows_query('btc_flows')
             
-            df = pd.read_sql(
-                query, 
-                self.engine, 
-                params={'lookback_days': lookback_days}
-            )
+            with span('db.load_flows') as stage:
+                df = stage.record(pd.read_sql(
+                    query, 
+                    self.engine, 
+                    params={'lookback_days': int(lookback_days)}
+                ))
             
             if df.empty:
                 logger.warning("Нет данных о притоках ETF")
@@ -156,12 +596,30 @@ class DatabaseManager:
             df.set_index('date', inplace=True)
             
             logger.info(f"Загружено {len(df)} записей о притоках ETF")
-            return df
+            return self.dtype_policy.apply(df)
             
         except SQLAlchemyError as e:
             logger.error(f"Ошибка загрузки данных ETF: {e}")
             return None
     
+    def _load_etf_flow_local(self, lookback_days: int) -> Optional[pd.DataFrame]:
+        """Загрузка притоков ETF из локального снимка btc_flows."""
+        try:
+            flows = self.get_local_cache().sync_flows('btc_flows')
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка загрузки данных ETF: {e}")
+            return None
+        
+        if flows.empty:
+            logger.warning("Нет данных о притоках ETF")
+            return None
+        
+        flows = flows[flows['date'] >= _lookback_start(lookback_days)]
+        df = flows[['date', 'total']].rename(columns={'total': 'etf_flow'}).set_index('date')
+        
+        logger.info(f"Загружено {len(df)} записей о притоках ETF (локальный кэш)")
+        return self.dtype_policy.apply(df)
+    
     def load_combined_data(self, symbol: str = 'BTCUSDT', lookback_days: int = 365) -> Optional[pd.DataFrame]:
         """
         Загрузка и объединение данных о Биткоине и притоках ETF.
@@ -173,6 +631,15 @@ class DatabaseManager:
         Returns:
             Объединенный DataFrame или None в случае ошибки
         """
+        if os.getenv('DB_ASYNC_LOAD', 'false').lower() == 'true' and not self.use_local_cache():
+            aggregation = os.getenv('CANDLE_AGGREGATION', 'sql')
+            if aggregation == 'sql':
+                # Свечи и притоки запрашиваются одновременно через asyncpg (async_loader.py)
+                return self.dtype_policy.apply(self._load_combined_async(symbol, lookback_days))
+            # Асинхронный загрузчик агрегирует свечи только в SQL: режим не подменяется
+            logger.warning(f"DB_ASYNC_LOAD=true поддерживает только CANDLE_AGGREGATION=sql, "
+                           f"для режима '{aggregation}' используется последовательная загрузка")
+        
         # Загрузка данных
         btc_data = self.load_bitcoin_data(symbol, lookback_days)
         etf_data = self.load_etf_flow_data(lookback_days)
@@ -186,34 +653,112 @@ class DatabaseManager:
             return btc_data
         
         # Объединение данных по дате
-        combined_data = pd.merge(
-            btc_data, 
-            etf_data, 
-            left_index=True, 
-            right_index=True, 
-            how='left'
-        )
-        
-        # Заполнение пропущенных значений ETF потока нулями
-        combined_data['etf_flow'] = combined_data['etf_flow'].fillna(0)
+        with span('db.merge') as stage:
+            combined_data = pd.merge(
+                btc_data, 
+                etf_data, 
+                left_index=True, 
+                right_index=True, 
+                how='left'
+            )
+            
+            # Заполнение пропущенных значений ETF потока нулями
+            combined_data['etf_flow'] = combined_data['etf_flow'].fillna(0)
+            stage.record(combined_data)
         
         logger.info(f"Объединено {len(combined_data)} записей")
         return combined_data
     
+    def _load_combined_async(self, symbol: str, lookback_days: int) -> Optional[pd.DataFrame]:
+        """Загрузка через общий AsyncDataLoader (пул подключений создается один раз)."""
+        import asyncio
+        from async_loader import AsyncDataLoader, load_combined_data_async
+        
+        # Цикл событий один на менеджер: загрузки из разных потоков (serve.py) идут по очереди
+        with self._async_lock:
+            if self.async_loader is None:
+                self.async_loop = asyncio.new_event_loop()
+                self.async_loader = AsyncDataLoader()
+            return load_combined_data_async(symbol, lookback_days, loader=self.async_loader, loop=self.async_loop)
+    
+    def get_data_watermark(self, symbol: str = 'BTCUSDT') -> Optional[Dict[str, Any]]:
+        """
+        Дешевый запрос "состояния данных": время последней свечи и последней записи ETF.
+        
+        Новые входные данные появляются только с новой 5m свечой или новой/обновленной
+        строкой в btc_flows, поэтому водяной знак используется как ключ кэша прогнозов.
+        MAX(open_time) обслуживается индексом idx_btc_candles_symbol_interval_time.
+        
+        Args:
+            symbol: Символ торговой пары
+            
+        Returns:
+            Словарь с водяными знаками или None в случае ошибки
+        """
+        if not self.is_connected():
+            logger.error("Нет подключения к базе данных")
+            return None
+        
+        try:
+            query = text("""
+                SELECT
+                    (SELECT MAX(open_time) FROM btc_candles
+                     WHERE symbol = :symbol AND interval = '5m') AS candles_max_open_time,
+                    (SELECT MAX(date) FROM btc_flows) AS flows_max_date,
+                    (SELECT MAX("updatedAt") FROM btc_flows) AS flows_updated_at
+            """)
+            
+            with self.engine.connect() as conn:
+                row = conn.execute(query, {'symbol': symbol}).mappings().one()
+            
+            return {key: (value.isoformat() if value is not None else None) for key, value in row.items()}
+            
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка получения водяного знака данных: {e}")
+            return None
+    
     def close_connection(self) -> None:
         """Закрытие подключения к базе данных."""
+        with self._async_lock:
+            if self.async_loader is not None:
+                self.async_loop.run_until_complete(self.async_loader.close())
+                self.async_loop.close()
+                self.async_loader = None
+                self.async_loop = None
         if self.engine:
             self.engine.dispose()
             logger.info("Подключение к базе данных закрыто")
 
 
-# Глобальный экземпляр менеджера базы данных
-db_manager = DatabaseManager()
+def _lookback_start(lookback_days: int) -> pd.Timestamp:
+    """Начало периода загрузки в UTC (аналог NOW() - INTERVAL для локальных данных)."""
+    return pd.Timestamp.now(tz='UTC').tz_localize(None) - pd.Timedelta(days=lookback_days)
+
+
+# Глобальный экземпляр менеджера базы данных (создается при первом обращении,
+# чтобы импорт модуля не открывал подключение к базе данных)
+_db_manager: Optional[DatabaseManager] = None
 
 
 def get_database_manager() -> DatabaseManager:
-    """Получение экземпляра менеджера базы данных."""
-    return db_manager
+    """
+    Получение экземпляра менеджера базы данных.
+    
+    Если предыдущее подключение не удалось (база была недоступна при старте
+    serve.py), выполняется повторная попытка (DatabaseManager.reconnect).
+    """
+    global _db_manager
+    if _db_manager is None:
+        _db_manager = DatabaseManager()
+    elif not _db_manager.is_connected() and not _db_manager.use_local_cache():
+        _db_manager.reconnect()
+    return _db_manager
+
+
+def close_database_manager() -> None:
+    """Закрытие подключения глобального менеджера, если он был создан."""
+    if _db_manager is not None:
+        _db_manager.close_connection()
 
 
 def load_training_data(symbol: str = 'BTCUSDT', lookback_days: int = 365) -> Optional[pd.DataFrame]:
@@ -227,7 +772,7 @@ def load_training_data(symbol: str = 'BTCUSDT', lookback_days: int = 365) -> Opt
     Returns:
         DataFrame с данными для обучения или None в случае ошибки
     """
-    return db_manager.load_combined_data(symbol, lookback_days)
+    return get_database_manager().load_combined_data(symbol, lookback_days)
 
 
 if __name__ == "__main__":
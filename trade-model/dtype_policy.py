@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Политика типов данных для загруженных данных и матриц признаков.
+
+По умолчанию (DTYPE_POLICY=compact) числовые колонки хранятся как float32,
+колонки времени - как int64 (миллисекунды от эпохи), строковые колонки
+(symbol, interval) - как category. XGBoost все равно работает с float32,
+поэтому сжатие матрицы признаков не меняет предсказаний. Политика wide
+сохраняет прежнее поведение (float64/object).
+
+Запуск как скрипта печатает отчет о памяти по этапам для обеих политик.
+"""
+
+import os
+import argparse
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Загрузка переменных окружения
+load_dotenv()
+
+# Готовые политики: DTYPE_POLICY=compact | wide
+POLICY_PRESETS = {
+    'compact': {'float_dtype': 'float32', 'epoch_timestamps': True, 'categorical': True},
+    'wide': {'float_dtype': 'float64', 'epoch_timestamps': False, 'categorical': False},
+}
+
+
+class DtypePolicy:
+    """Правила приведения типов колонок."""
+
+    def __init__(self, float_dtype: str = 'float32', epoch_timestamps: bool = True,
+                 categorical: bool = True, epoch_unit: str = 'ms'):
+        """
+        Инициализация политики.
+
+        Args:
+            float_dtype: Тип для числовых колонок и признаков ('float32' или 'float64')
+            epoch_timestamps: Хранить колонки времени как int64 от эпохи
+            categorical: Хранить строковые колонки (symbol, interval) как category
+            epoch_unit: Единица времени для int64 ('s', 'ms', 'us', 'ns')
+        """
+        if float_dtype not in ('float32', 'float64'):
+            raise ValueError(f"Неподдерживаемый тип: {float_dtype}")
+        self.float_dtype = float_dtype
+        self.epoch_timestamps = epoch_timestamps
+        self.categorical = categorical
+        self.epoch_unit = epoch_unit
+
+    @classmethod
+    def from_env(cls, name: Optional[str] = None) -> 'DtypePolicy':
+        """
+        Политика по имени или из переменных окружения.
+
+        Args:
+            name: Имя готовой политики (по умолчанию DTYPE_POLICY)
+
+        Returns:
+            Экземпляр политики (DTYPE_FLOAT переопределяет тип признаков)
+        """
+        name = name or os.getenv('DTYPE_POLICY', 'compact')
+        if name not in POLICY_PRESETS:
+            raise ValueError(f"Неизвестная политика типов: {name}")
+        params = dict(POLICY_PRESETS[name])
+        params['float_dtype'] = os.getenv('DTYPE_FLOAT', params['float_dtype'])
+        return cls(**params)
+
+    def config(self) -> Dict[str, Any]:
+        """Параметры политики (для ключей кэша и метаданных модели)."""
+        return {
+            'float_dtype': self.float_dtype,
+            'epoch_timestamps': self.epoch_timestamps,
+            'categorical': self.categorical,
+            'epoch_unit': self.epoch_unit
+        }
+
+    def apply(self, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """
+        Приведение загруженного DataFrame к политике.
+
+        Индекс не меняется: DatetimeIndex уже хранится как int64 и нужен
+        для resample и объединения по дате.
+
+        Args:
+            df: Загруженные данные
+
+        Returns:
+            DataFrame с приведенными типами
+        """
+        if df is None or df.empty:
+            return df
+
+        converted = {}
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                if self.epoch_timestamps:
+                    converted[column] = to_epoch(series, self.epoch_unit)
+            elif pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+                continue
+            elif pd.api.types.is_float_dtype(series):
+                if series.dtype != self.float_dtype:
+                    converted[column] = series.astype(self.float_dtype)
+            elif pd.api.types.is_integer_dtype(series):
+                continue
+            elif self.categorical and _is_text(series):
+                converted[column] = series.astype('category')
+            else:
+                # Decimal из numeric-колонок PostgreSQL приходят как object
+                numeric = pd.to_numeric(series, errors='coerce')
+                if numeric.notna().sum() == series.notna().sum():
+                    converted[column] = numeric.astype(self.float_dtype)
+
+        if not converted:
+            return df
+        return df.assign(**converted)
+
+    def cast_features(self, features: pd.DataFrame) -> pd.DataFrame:
+        """Приведение матрицы признаков к float_dtype."""
+        return features.astype(self.float_dtype)
+
+
+def _is_text(series: pd.Series) -> bool:
+    """Строковая колонка (object из str или string dtype)."""
+    if pd.api.types.is_string_dtype(series):
+        sample = series.dropna().head(100)
+        return all(isinstance(value, str) for value in sample)
+    return False
+
+
+def to_epoch(series: pd.Series, unit: str = 'ms') -> pd.Series:
+    """
+    Перевод колонки времени в int64 от эпохи (UTC для колонок с часовым поясом).
+
+    Args:
+        series: Колонка datetime64
+        unit: Единица времени
+
+    Returns:
+        Series типа int64
+    """
+    if series.dt.tz is not None:
+        series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+    return series.astype(f'datetime64[{unit}]').astype('int64')
+
+
+def frame_bytes(obj: Any) -> int:
+    """Размер DataFrame/Series (с индексом и содержимым object-колонок) или ndarray в байтах."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True, index=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    return 0
+
+
+class MemoryReport:
+    """Отчет о памяти, занимаемой данными на этапах конвейера."""
+
+    def __init__(self):
+        self.stages: 'OrderedDict[str, Dict[str, int]]' = OrderedDict()
+
+    def record(self, stage: str, obj: Any) -> int:
+        """
+        Запись размера объекта на этапе.
+
+        Args:
+            stage: Название этапа
+            obj: DataFrame, Series или ndarray
+
+        Returns:
+            Размер в байтах
+        """
+        size = frame_bytes(obj)
+        shape = getattr(obj, 'shape', ())
+        self.stages[stage] = {
+            'bytes': size,
+            'rows': int(shape[0]) if len(shape) > 0 else 0,
+            'columns': int(shape[1]) if len(shape) > 1 else 1
+        }
+        return size
+
+    def log(self, title: str = "Память по этапам") -> None:
+        """Вывод отчета в лог."""
+        logger.info(title)
+        for stage, info in self.stages.items():
+            logger.info(f"  {stage:12} {format_bytes(info['bytes']):>10}  ({info['rows']} x {info['columns']})")
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        return dict(self.stages)
+
+
+def format_bytes(size: float) -> str:
+    """Размер в удобных единицах."""
+    for unit in ('Б', 'КБ', 'МБ'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
+
+
+def pipeline_memory(data: pd.DataFrame, policy: DtypePolicy) -> MemoryReport:
+    """
+    Прогон загрузки и создания признаков с заданной политикой и замер памяти.
+
+    Args:
+        data: Исходные данные (как после загрузки из базы)
+        policy: Политика типов
+
+    Returns:
+        Отчет о памяти по этапам loaded, features, X
+    """
+    # Импорт внутри, чтобы модуль можно было использовать в db.py без train.py
+    from train import BitcoinPredictor
+
+    report = MemoryReport()
+    loaded = policy.apply(data)
+    report.record('loaded', loaded)
+
+    predictor = BitcoinPredictor()
+    predictor.feature_engineer.dtype_policy = policy
+    report.record('features', predictor.feature_engineer.create_features(loaded))
+
+    X, y, _ = predictor.prepare_data(loaded)
+    report.record('X', X)
+    report.record('y', y)
+    return report
+
+
+def main():
+    """Отчет о памяти по этапам для политик wide и compact на синтетических данных."""
+    parser = argparse.ArgumentParser(description="Отчет о памяти для политик типов данных")
+    parser.add_argument('--days', type=int, default=3650, help="Длина синтетической истории")
+    args = parser.parse_args()
+
+    from train_demo import create_synthetic_data
+
+    data = create_synthetic_data(args.days)
+
+    reports = {name: pipeline_memory(data, DtypePolicy.from_env(name)) for name in ('wide', 'compact')}
+
+    print("ПАМЯТЬ ПО ЭТАПАМ")
+    print("=" * 50)
+    print(f"{'этап':12} {'wide':>12} {'compact':>12} {'экономия':>10}")
+    for stage, info in reports['wide'].stages.items():
+        wide = info['bytes']
+        compact = reports['compact'].stages[stage]['bytes']
+        saved = 1 - compact / wide if wide else 0.0
+        print(f"{stage:12} {format_bytes(wide):>12} {format_bytes(compact):>12} {saved:>9.0%}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ import numpy as np
 from datetime import datetime, timedelta
 import json
 
+# Local imports
+from synthetic_data import SyntheticMarket
+
 
 def create_sample_data() -> pd.DataFrame:
     """
@@ -17,46 +20,11 @@ def create_sample_data() -> pd.DataFrame:
     """
     print("📊 Создание примерных данных...")
     
-    # Создание временного ряда на 100 дней
-    dates = pd.date_range(start='2024-01-01', periods=100, freq='D')
-    
-    # Генерация реалистичных данных о цене Биткоина
-    np.random.seed(42)
-    base_price = 45000
-    
-    # Создание случайного блуждания с трендом
-    returns = np.random.normal(0.001, 0.02, len(dates))  # Средний рост 0.1% в день
-    prices = [base_price]
-    
-    for ret in returns[1:]:
-        new_price = prices[-1] * (1 + ret)
-        prices.append(new_price)
-    
-    # Создание OHLCV данных
-    data = []
-    for i, (date, close) in enumerate(zip(dates, prices)):
-        # Генерация реалистичных OHLC на основе close
-        volatility = np.random.uniform(0.01, 0.03)
-        high = close * (1 + np.random.uniform(0, volatility))
-        low = close * (1 - np.random.uniform(0, volatility))
-        open_price = close * (1 + np.random.uniform(-volatility/2, volatility/2))
-        volume = np.random.uniform(1000, 10000)
-        
-        # ETF потоки (могут быть отрицательными)
-        etf_flow = np.random.normal(1000000, 500000)  # Средний поток $1M
-        
-        data.append({
-            'timestamp': date,
-            'open': round(open_price, 2),
-            'high': round(high, 2),
-            'low': round(low, 2),
-            'close': round(close, 2),
-            'volume': round(volume, 0),
-            'etf_flow': round(etf_flow, 2)
-        })
-    
-    df = pd.DataFrame(data)
-    df.set_index('timestamp', inplace=True)
+    # Случайное блуждание на 100 дней со средним ростом 0.1% в день
+    market = SyntheticMarket(seed=42, start='2024-01-01', trend=0.001, volatility=0.02,
+                             regimes=None, base_volume=5500, flow_correlation=0.0)
+    df = market.generate(100)
+    dates = df.index
     
     print(f"✅ Создано {len(df)} записей с {datetime.strftime(dates[0], '%Y-%m-%d')} по {datetime.strftime(dates[-1], '%Y-%m-%d')}")
     return df
@@ -160,7 +128,7 @@ def demonstrate_prediction():
                 print(f"   {key}: {values}")
         
         print("\n💡 В реальном использовании:")
-        print("   1. Загрузите обученную модель: predictor = BitcoinPredictor('models/etf_model_v1.pkl')")
+        print("   1. Загрузите обученную модель: predictor = BitcoinPredictor('models/etf_model_v1.ubj')")
         print("   2. Выполните предсказание: result = predictor.predict_from_json(sample_json)")
         print("   3. Получите результат: вероятность роста, направление, уверенность")
         
@@ -199,7 +167,7 @@ def show_usage_instructions():
    from predict import load_model
    
    # Загрузка модели
-   predictor = load_model('models/etf_model_v1.pkl')
+   predictor = load_model('models/etf_model_v1.ubj')
    
    # Прогноз с данными из БД
    result = predictor.predict_from_database()
@@ -0,0 +1,292 @@
+"""
+Декларативный реестр признаков с графом зависимостей.
+
+Каждый признак регистрируется с явными зависимостями (входные колонки или
+другие признаки) и окном - числом строк, которое он добавляет к истории своих
+зависимостей. По списку нужных модели колонок реестр выбирает подграф,
+упорядочивает его топологически и считает каждую вершину один раз, так что
+промежуточные ряды (скользящие средние, EMA) разделяются между признаками.
+
+Формулы совпадают с прежним расчетом FeatureEngineer на pandas: полный набор
+признаков реестра - это FeatureEngineer.feature_names().
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Входные колонки данных (вершины графа без зависимостей)
+RAW_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'etf_flow')
+
+# Параметры технических индикаторов
+RSI_PERIOD = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+
+# Периоды доходности (return_prev, return_3d, return_7d) и лаговых признаков
+RETURN_PERIODS = (1, 3, 7)
+LAGS = (1, 2, 3)
+
+
+class FeatureSpec:
+    """Описание признака: зависимости, окно и функция расчета."""
+
+    def __init__(self, name: str, depends: Tuple[str, ...], compute: Callable,
+                 window: Union[int, str] = 1, default: Optional[float] = None,
+                 ema: bool = False, output: bool = True):
+        """
+        Args:
+            name: Название признака
+            depends: Зависимости (входные колонки или другие признаки)
+            compute: Функция (ряды зависимостей, FeatureEngineer) -> Series
+            window: Число строк окна (1 - только текущая строка) или название
+                атрибута FeatureEngineer с длиной окна
+            default: Значение признака, если входной колонки нет в данных
+                (None - признак не создается)
+            ema: Признак зависит от EMA и требует прогрева (MACD_WARMUP_BARS)
+            output: Признак выдается моделям (False - только промежуточный ряд)
+        """
+        self.name = name
+        self.depends = depends
+        self.compute = compute
+        self.window = window
+        self.default = default
+        self.ema = ema
+        self.output = output
+
+    def window_rows(self, engineer) -> int:
+        """Длина окна с учетом параметров FeatureEngineer."""
+        if isinstance(self.window, str):
+            return int(getattr(engineer, self.window))
+        return self.window
+
+
+REGISTRY: Dict[str, FeatureSpec] = {}
+
+
+def register(name: str, depends: Iterable[str], window: Union[int, str] = 1,
+             default: Optional[float] = None, ema: bool = False, output: bool = True) -> Callable:
+    """Декоратор регистрации функции расчета признака."""
+    def decorator(compute: Callable) -> Callable:
+        REGISTRY[name] = FeatureSpec(name, tuple(depends), compute, window, default, ema, output)
+        return compute
+    return decorator
+
+
+def _safe(series: pd.Series) -> pd.Series:
+    """Знаменатель без нулей (.replace(0, 1))."""
+    return series.replace(0, 1)
+
+
+# 1. Returns (доходность)
+for _period, _name in zip(RETURN_PERIODS, ('return_prev', 'return_3d', 'return_7d')):
+    register(_name, ('close',), window=_period + 1)(
+        lambda v, e, period=_period: v['close'].pct_change(period)
+    )
+
+
+# 2. Volatility (волатильность)
+@register('volatility', ('return_prev',), window='volatility_window')
+def _volatility(v, e):
+    return v['return_prev'].rolling(window=e.volatility_window).std()
+
+
+# 3. Moving Averages (скользящие средние)
+@register('ma_7', ('close',), window='ma_short_window')
+def _ma_short(v, e):
+    return v['close'].rolling(window=e.ma_short_window).mean()
+
+
+@register('ma_30', ('close',), window='ma_long_window')
+def _ma_long(v, e):
+    return v['close'].rolling(window=e.ma_long_window).mean()
+
+
+# 4. Price relative to moving averages
+@register('price_to_ma7', ('close', 'ma_7'))
+def _price_to_ma_short(v, e):
+    return v['close'] / _safe(v['ma_7'])
+
+
+@register('price_to_ma30', ('close', 'ma_30'))
+def _price_to_ma_long(v, e):
+    return v['close'] / _safe(v['ma_30'])
+
+
+@register('ma7_to_ma30', ('ma_7', 'ma_30'))
+def _ma_ratio(v, e):
+    return v['ma_7'] / _safe(v['ma_30'])
+
+
+# 5. High-Low spread
+@register('hl_spread', ('high', 'low', 'close'))
+def _hl_spread(v, e):
+    return (v['high'] - v['low']) / v['close']
+
+
+# 6. Volume features
+@register('volume_ma7', ('volume',), window='ma_short_window')
+def _volume_ma(v, e):
+    return v['volume'].rolling(window=e.ma_short_window).mean()
+
+
+@register('volume_ratio', ('volume', 'volume_ma7'))
+def _volume_ratio(v, e):
+    return v['volume'] / _safe(v['volume_ma7'])
+
+
+# 7. ETF Flow features (без данных ETF заполняются нулями)
+@register('etf_flow_change', ('etf_flow',), window=2, default=0.0)
+def _etf_flow_change(v, e):
+    return v['etf_flow'].pct_change(1)
+
+
+@register('etf_flow_ma7', ('etf_flow',), window='ma_short_window', default=0.0)
+def _etf_flow_ma(v, e):
+    return v['etf_flow'].rolling(window=e.ma_short_window).mean()
+
+
+@register('etf_flow_ratio', ('etf_flow', 'etf_flow_ma7'), default=0.0)
+def _etf_flow_ratio(v, e):
+    return v['etf_flow'] / _safe(v['etf_flow_ma7'])
+
+
+# 8. Lag features (лаговые признаки)
+for _lag in LAGS:
+    for _name, _source in (('return_lag', 'return_prev'), ('volume_lag', 'volume'), ('etf_flow_lag', 'etf_flow')):
+        register(f'{_name}_{_lag}', (_source,), window=_lag + 1)(
+            lambda v, e, source=_source, lag=_lag: v[source].shift(lag)
+        )
+
+
+# 9. Technical indicators
+@register('rsi', ('close',), window=RSI_PERIOD + 1)
+def _rsi(v, e):
+    delta = v['close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=RSI_PERIOD).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=RSI_PERIOD).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+@register('ema_fast', ('close',), ema=True, output=False)
+def _ema_fast(v, e):
+    return v['close'].ewm(span=MACD_FAST).mean()
+
+
+@register('ema_slow', ('close',), ema=True, output=False)
+def _ema_slow(v, e):
+    return v['close'].ewm(span=MACD_SLOW).mean()
+
+
+@register('macd', ('ema_fast', 'ema_slow'), ema=True)
+def _macd(v, e):
+    return v['ema_fast'] - v['ema_slow']
+
+
+@register('macd_signal', ('macd',), ema=True)
+def _macd_signal(v, e):
+    return v['macd'].ewm(span=MACD_SIGNAL).mean()
+
+
+def resolve(names: Iterable[str], available: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Подграф, нужный для расчета признаков, в порядке зависимостей.
+
+    Args:
+        names: Нужные признаки
+        available: Колонки входных данных
+
+    Returns:
+        Tuple из вершин в топологическом порядке (входные колонки не включаются)
+        и признаков, которые нельзя посчитать (нет в реестре или нет входных данных
+        при default=None)
+    """
+    available = set(available)
+    order: List[str] = []
+    state: Dict[str, str] = {}
+
+    def visit(name: str) -> bool:
+        """Обход в глубину; возвращает, доступен ли ряд вершины."""
+        if name in RAW_COLUMNS:
+            return name in available
+        if state.get(name) == 'done':
+            return name in order
+        if state.get(name) == 'visiting':
+            raise ValueError(f"Циклическая зависимость признаков: {name}")
+        spec = REGISTRY.get(name)
+        if spec is None:
+            state[name] = 'done'
+            return False
+        state[name] = 'visiting'
+        ready = all([visit(dependency) for dependency in spec.depends])
+        state[name] = 'done'
+        if ready or spec.default is not None:
+            order.append(name)
+            return True
+        return False
+
+    missing = [name for name in names if not visit(name)]
+    return order, missing
+
+
+def history(names: Iterable[str], engineer) -> Tuple[int, bool]:
+    """
+    Минимальная длина истории для признаков последней строки.
+
+    История вершины - максимум историй зависимостей плюс окно вершины минус один
+    (у входной колонки история 1).
+
+    Args:
+        names: Признаки
+        engineer: FeatureEngineer с параметрами окон
+
+    Returns:
+        Tuple из числа строк и признака того, что нужен прогрев EMA
+    """
+    rows: Dict[str, int] = {}
+    ema: Dict[str, bool] = {}
+
+    def visit(name: str) -> Tuple[int, bool]:
+        if name in RAW_COLUMNS or name not in REGISTRY:
+            return 1, False
+        if name not in rows:
+            spec = REGISTRY[name]
+            visited = [visit(dependency) for dependency in spec.depends]
+            rows[name] = max(r for r, _ in visited) + spec.window_rows(engineer) - 1
+            ema[name] = spec.ema or any(e for _, e in visited)
+        return rows[name], ema[name]
+
+    results = [visit(name) for name in names]
+    return max((r for r, _ in results), default=1), any(e for _, e in results)
+
+
+def compute(df: pd.DataFrame, engineer, names: List[str]) -> pd.DataFrame:
+    """
+    Расчет признаков только по нужному подграфу.
+
+    Args:
+        df: DataFrame с данными OHLCV и (необязательно) etf_flow
+        engineer: FeatureEngineer с параметрами окон
+        names: Нужные признаки (посчитать нельзя - пропускаются)
+
+    Returns:
+        DataFrame с признаками в порядке names в float64, бесконечности заменены на NaN
+    """
+    order, missing = resolve(names, df.columns)
+    # Признаки считаются в float64 (в том числе из float32-колонок политики compact)
+    values: Dict[str, Any] = {
+        column: df[column].astype('float64')
+        for column in RAW_COLUMNS if column in df.columns
+    }
+    for name in order:
+        spec = REGISTRY[name]
+        if all(dependency in values for dependency in spec.depends):
+            values[name] = spec.compute(values, engineer)
+        else:
+            values[name] = spec.default
+
+    features = {name: values[name] for name in names if name not in missing}
+    return pd.DataFrame(features, index=df.index).replace([np.inf, -np.inf], np.nan)
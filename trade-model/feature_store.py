@@ -0,0 +1,303 @@
+"""
+Персистентное хранилище матриц признаков.
+
+Запись хранилища - набор Parquet-файлов (local_cache.ParquetDataset) с входными
+колонками и признаками FeatureEngineer.feature_names одного символа. Ключ записи
+строится из символа, набора входных колонок и FeatureEngineer.config() (версия
+признаков, окна VOLATILITY_WINDOW, MA_SHORT_WINDOW, MA_LONG_WINDOW, тип и движок),
+но не из начала истории: train.py и predict.py загружают скользящее окно
+"последние N дней", начало которого сдвигается при каждом запуске.
+
+При обращении новые данные выравниваются с сохраненной историей по индексу:
+строки до начала окна отбрасываются, для пересечения признаки читаются с диска
+(после сверки входных колонок), а для строк после конца сохраненной истории
+считаются по хвосту с прогревом EMA и дописываются отдельным файлом. Входные
+данные, расходящиеся с сохраненными (пересчитанная история) или начинающиеся
+раньше записи, приводят к полной перестройке. Записи вытесняются по LRU, когда
+общий размер превышает лимит.
+
+Признаки строк пересечения посчитаны по всей сохраненной истории, поэтому
+совпадают с engineer.create_features по истории, начиная с первой строки записи
+(в начале окна нет строк прогрева с NaN).
+
+Обучение (train.BitcoinPredictor.prepare_data) и предсказание
+(predict.BitcoinPredictor.prepare_features) читают одну и ту же запись.
+"""
+
+import os
+import json
+import shutil
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Local imports (local_cache тянет sqlalchemy и импортируется при первом обращении к записи)
+from prediction_cache import PredictionCache
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Загрузка переменных окружения
+load_dotenv()
+
+# Входные колонки, от которых зависят признаки
+INPUT_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'etf_flow')
+
+# Колонка с индексом строки в Parquet-файлах записи
+INDEX_COLUMN = '_index'
+
+# Метаданные записи (границы истории и параметры признаков)
+ENTRY_FILE = '_entry.json'
+
+
+def feature_store_from_env() -> Optional['FeatureStore']:
+    """Хранилище признаков, если оно включено переменной FEATURE_STORE (по умолчанию включено)."""
+    if os.getenv('FEATURE_STORE', 'true').lower() in ('1', 'true', 'yes'):
+        return FeatureStore()
+    return None
+
+
+class FeatureStore:
+    """Дисковое хранилище матриц признаков с дозаписью новых строк и LRU по размеру."""
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None,
+                 warmup: Optional[int] = None, compact_threshold: Optional[int] = None):
+        """
+        Инициализация хранилища.
+
+        Args:
+            root: Каталог хранилища
+            max_bytes: Предельный общий размер записей на диске
+            warmup: Число предшествующих строк, по которым пересчитывается хвост
+                при дозаписи (прогрев EMA в MACD)
+            compact_threshold: Число файлов записи, после которого они сливаются в один
+        """
+        self.root = root or os.getenv('FEATURE_STORE_DIR', 'data/cache/features')
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv('FEATURE_STORE_MAX_BYTES', str(512 * 1024 * 1024)))
+        # Вес отброшенной истории в EMA(26) после 1000 строк ~1e-34: дописанные строки
+        # совпадают с полным пересчетом до округления
+        self.warmup = warmup if warmup is not None else int(os.getenv('FEATURE_STORE_WARMUP', '1000'))
+        self.compact_threshold = compact_threshold or int(os.getenv('FEATURE_STORE_COMPACT_PARTS', '20'))
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'appends': 0,
+            'misses': 0,
+            'rebuilds': 0,
+            'bypassed': 0,
+            'evictions': 0
+        }
+
+    def entry_key(self, df: pd.DataFrame, engineer, symbol: Optional[str] = None) -> str:
+        """
+        Ключ записи для данных и параметров признаков.
+
+        Args:
+            df: DataFrame с данными
+            engineer: FeatureEngineer
+            symbol: Символ торговой пары
+
+        Returns:
+            Хеш ключа (имя каталога записи)
+        """
+        return PredictionCache.make_key(
+            symbol=symbol or 'default',
+            columns=[column for column in INPUT_COLUMNS if column in df.columns],
+            features=engineer.config()
+        )
+
+    def get_features(self, df: pd.DataFrame, engineer, symbol: Optional[str] = None) -> pd.DataFrame:
+        """
+        Признаки для данных: из хранилища, с дозаписью новых строк или с полным расчетом.
+
+        Для истории, начинающейся с первой строки записи, результат совпадает с
+        engineer.create_features(df); в сдвинутом окне признаки первых строк
+        посчитаны по более длинной сохраненной истории.
+
+        Args:
+            df: DataFrame с данными OHLCV и ETF потоками (DatetimeIndex по возрастанию)
+            engineer: FeatureEngineer
+            symbol: Символ торговой пары
+
+        Returns:
+            DataFrame с исходными колонками и признаками
+        """
+        if (df.empty or not isinstance(df.index, pd.DatetimeIndex)
+                or not df.index.is_monotonic_increasing or not df.index.is_unique):
+            with self._lock:
+                self._stats['bypassed'] += 1
+            return engineer.create_features(df)
+
+        names = engineer.feature_names('etf_flow' in df.columns)
+        key = self.entry_key(df, engineer, symbol)
+        path = os.path.join(self.root, key)
+
+        with self._lock:
+            try:
+                features = self._load_or_update(df, engineer, names, path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Хранилище признаков недоступно ({path}): {e}")
+                return engineer.create_features(df)
+            self._evict(keep=key)
+
+        return pd.concat([df.drop(columns=names, errors='ignore'), features], axis=1)
+
+    def _load_or_update(self, df: pd.DataFrame, engineer, names: List[str], path: str) -> pd.DataFrame:
+        """Чтение записи, дозапись новых строк или перестройка (вызывается под блокировкой)."""
+        from local_cache import ParquetDataset
+
+        dataset = ParquetDataset(path, key=INDEX_COLUMN, watermark_column=INDEX_COLUMN)
+        inputs = [column for column in INPUT_COLUMNS if column in df.columns]
+        entry = self._read_entry(path)
+        stored = dataset.read().set_index(INDEX_COLUMN) if entry else None
+
+        if stored is not None and len(stored) and self._overlap_matches(df, stored, inputs):
+            last_stored = stored.index[-1]
+            # Окно выравнивается по сохраненной истории: пересечение читается с диска
+            overlap = df.index[df.index <= last_stored]
+            features = stored.loc[overlap, names]
+            new_count = len(df) - len(overlap)
+            if new_count == 0:
+                self._stats['hits'] += 1
+                self._touch(path)
+                return features
+
+            # История выросла: пересчет хвоста с прогревом, в запись - только новые строки
+            context_rows = max(self.warmup, engineer.tail_window()) + new_count
+            if context_rows <= len(df):
+                context = df.iloc[-context_rows:]
+            else:
+                # Прогрев берется из сохраненных строк до начала окна
+                before = stored.loc[stored.index < df.index[0], inputs]
+                context = pd.concat([before.iloc[-(context_rows - len(df)):], df[inputs]])
+            tail = engineer.create_features(context)[names].iloc[-new_count:]
+            dataset.append(self._to_frame(df[inputs].iloc[-new_count:], tail))
+            if len(dataset.manifest()['parts']) > self.compact_threshold:
+                dataset.compact()
+            self._write_entry(path, stored.index[0], df.index[-1], len(stored) + new_count, engineer)
+            self._stats['appends'] += 1
+            logger.info(f"Хранилище признаков: дописано {new_count} строк к {len(stored)}")
+            return pd.concat([features, tail])
+
+        if entry:
+            logger.info("Хранилище признаков: история изменилась, запись перестраивается")
+            self._stats['rebuilds'] += 1
+        else:
+            self._stats['misses'] += 1
+
+        features = engineer.create_features(df)[names]
+        dataset.clear()
+        dataset.append(self._to_frame(df[inputs], features))
+        self._write_entry(path, df.index[0], df.index[-1], len(df), engineer)
+        return features
+
+    @staticmethod
+    def _overlap_matches(df: pd.DataFrame, stored: pd.DataFrame, inputs: List[str]) -> bool:
+        """Окно начинается внутри записи, и входные колонки пересечения совпадают с сохраненными."""
+        if df.index[0] < stored.index[0] or df.index[0] > stored.index[-1]:
+            return False
+        overlap = df.index[df.index <= stored.index[-1]]
+        if not overlap.isin(stored.index).all():
+            return False
+        current = df.loc[overlap, inputs].to_numpy(dtype='float64', na_value=np.nan)
+        saved = stored.loc[overlap, inputs].to_numpy(dtype='float64', na_value=np.nan)
+        return np.array_equal(current, saved, equal_nan=True)
+
+    @staticmethod
+    def _to_frame(inputs: pd.DataFrame, features: pd.DataFrame) -> pd.DataFrame:
+        """Входные колонки и признаки с индексом в отдельной колонке для записи в Parquet."""
+        frame = pd.concat([inputs, features], axis=1).reset_index(drop=True)
+        frame.insert(0, INDEX_COLUMN, features.index)
+        return frame
+
+    @staticmethod
+    def _read_entry(path: str) -> Optional[Dict[str, Any]]:
+        entry_path = os.path.join(path, ENTRY_FILE)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Поврежденные метаданные записи {entry_path}: {e}")
+            return None
+
+    @staticmethod
+    def _write_entry(path: str, first_index: pd.Timestamp, last_index: pd.Timestamp,
+                     rows: int, engineer) -> None:
+        entry = {
+            'rows': rows,
+            'first_index': first_index.isoformat(),
+            'last_index': last_index.isoformat(),
+            'features': engineer.config(),
+            'updated_at': datetime.now().isoformat()
+        }
+        entry_path = os.path.join(path, ENTRY_FILE)
+        tmp_path = f"{entry_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, indent=2, default=str)
+        os.replace(tmp_path, entry_path)
+
+    @staticmethod
+    def _touch(path: str) -> None:
+        """Обновление времени доступа записи для вытеснения по LRU."""
+        try:
+            os.utime(os.path.join(path, ENTRY_FILE))
+        except OSError:
+            pass
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Записи хранилища с размером и временем последнего доступа."""
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+            entry_path = os.path.join(entry.path, ENTRY_FILE)
+            used_at = os.stat(entry_path).st_mtime if os.path.exists(entry_path) else 0.0
+            entries.append({'key': entry.name, 'path': entry.path, 'bytes': size, 'used_at': used_at})
+        return entries
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Удаление давно использованных записей сверх лимита размера (вызывается под блокировкой)."""
+        entries = self.entries()
+        total = sum(entry['bytes'] for entry in entries)
+        if total <= self.max_bytes:
+            return
+
+        for entry in sorted(entries, key=lambda e: e['used_at']):
+            if total <= self.max_bytes:
+                break
+            if entry['key'] == keep:
+                continue
+            shutil.rmtree(entry['path'], ignore_errors=True)
+            total -= entry['bytes']
+            self._stats['evictions'] += 1
+            logger.info(f"Хранилище признаков: вытеснена запись {entry['key'][:12]} ({entry['bytes']} байт)")
+
+    def clear(self) -> None:
+        """Удаление всех записей."""
+        with self._lock:
+            for entry in self.entries():
+                shutil.rmtree(entry['path'], ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики обращений и текущий размер хранилища."""
+        with self._lock:
+            stats = dict(self._stats)
+        entries = self.entries()
+        stats['entries'] = len(entries)
+        stats['bytes'] = sum(entry['bytes'] for entry in entries)
+        return stats
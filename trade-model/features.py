@@ -0,0 +1,161 @@
+"""
+Создание признаков для модели предсказания Биткоина.
+
+Модуль не зависит от библиотек обучения (sklearn, xgboost) и базы данных,
+поэтому используется как при обучении, так и при быстром старте предсказания.
+"""
+
+import os
+import pandas as pd
+import logging
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+# Local imports
+import feature_registry
+from dtype_policy import DtypePolicy
+from features_numpy import compute_features
+from feature_registry import RSI_PERIOD, MACD_FAST, MACD_SLOW, MACD_SIGNAL, RETURN_PERIODS, LAGS
+from instrumentation import span
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Загрузка переменных окружения
+load_dotenv()
+
+# Версия набора признаков: увеличивается при изменении формул в feature_registry
+FEATURE_VERSION = 1
+
+
+class FeatureEngineer:
+    """Класс для создания признаков из сырых данных."""
+    
+    def __init__(self):
+        """Инициализация параметров для создания признаков."""
+        self.volatility_window = int(os.getenv('VOLATILITY_WINDOW', '7'))
+        self.ma_short_window = int(os.getenv('MA_SHORT_WINDOW', '7'))
+        self.ma_long_window = int(os.getenv('MA_LONG_WINDOW', '30'))
+        # Число строк для прогрева EMA в MACD при расчете только по хвосту истории
+        self.macd_warmup = int(os.getenv('MACD_WARMUP_BARS', '200'))
+        # Тип матрицы признаков (float32 по умолчанию, XGBoost работает с float32)
+        self.dtype_policy = DtypePolicy.from_env()
+        # Движок расчета: pandas (по колонкам) или numpy (один массив, features_numpy.py)
+        self.engine = os.getenv('FEATURE_ENGINE', 'pandas')
+    
+    def config(self) -> Dict[str, Any]:
+        """Параметры, от которых зависят значения признаков (для ключей кэша)."""
+        return {
+            'version': FEATURE_VERSION,
+            'volatility_window': self.volatility_window,
+            'ma_short_window': self.ma_short_window,
+            'ma_long_window': self.ma_long_window,
+            'macd_warmup': self.macd_warmup,
+            'float_dtype': self.dtype_policy.float_dtype,
+            'engine': self.engine
+        }
+    
+    def min_history(self, columns: Optional[List[str]] = None) -> int:
+        """
+        Минимальное число строк, после которого все оконные признаки последней
+        строки определены (без учета прогрева EMA в MACD).
+        
+        Args:
+            columns: Признаки модели (по умолчанию все признаки)
+            
+        Returns:
+            Количество строк истории
+        """
+        if columns is None:
+            columns = self.feature_names()
+        rows, _ = feature_registry.history(columns, self)
+        return rows
+    
+    def tail_window(self, macd_warmup: Optional[int] = None, columns: Optional[List[str]] = None) -> int:
+        """
+        Длина хвоста истории, достаточная для расчета признаков последней строки.
+        
+        Оконные признаки по хвосту совпадают с расчетом по всей истории точно,
+        MACD - с точностью до веса отброшенной истории в EMA: (1 - 2 / (26 + 1)) ** warmup.
+        
+        Args:
+            macd_warmup: Число строк прогрева EMA (по умолчанию MACD_WARMUP_BARS)
+            columns: Признаки модели (по умолчанию все признаки); прогрев
+                учитывается, только если среди них есть зависящие от EMA
+            
+        Returns:
+            Количество последних строк для расчета признаков
+        """
+        if macd_warmup is None:
+            macd_warmup = self.macd_warmup
+        if columns is None:
+            columns = self.feature_names()
+        rows, needs_warmup = feature_registry.history(columns, self)
+        return max(rows, macd_warmup) if needs_warmup else rows
+    
+    def feature_names(self, has_etf_flow: bool = True) -> List[str]:
+        """
+        Колонки, которые добавляет create_features, в порядке их создания.
+        
+        Args:
+            has_etf_flow: Есть ли во входных данных колонка etf_flow
+            
+        Returns:
+            Список названий признаков
+        """
+        names = [
+            'return_prev', 'return_3d', 'return_7d',
+            'volatility', 'ma_7', 'ma_30',
+            'price_to_ma7', 'price_to_ma30', 'ma7_to_ma30',
+            'hl_spread', 'volume_ma7', 'volume_ratio',
+            'etf_flow_change', 'etf_flow_ma7', 'etf_flow_ratio'
+        ]
+        for lag in LAGS:
+            names += [f'return_lag_{lag}', f'volume_lag_{lag}']
+            if has_etf_flow:
+                names.append(f'etf_flow_lag_{lag}')
+        return names + ['rsi', 'macd', 'macd_signal']
+    
+    def create_features(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Создание признаков для модели машинного обучения.
+        
+        Args:
+            df: DataFrame с данными OHLCV и ETF потоками
+            columns: Нужные модели признаки; считается только их подграф
+                зависимостей (по умолчанию все признаки)
+            
+        Returns:
+            DataFrame с созданными признаками
+        """
+        logger.info("Создание признаков...")
+        
+        names = self.feature_names('etf_flow' in df.columns)
+        with span('create_features', rows=len(df)) as stage:
+            if self.engine == 'numpy':
+                # Движок numpy заполняет все признаки одним проходом, нужные выбираются после
+                values = compute_features(df, self, names, dtype=self.dtype_policy.float_dtype)
+                features = pd.DataFrame(values, index=df.index, columns=names, copy=False)
+                if columns is not None:
+                    features = features[[name for name in columns if name in features.columns]]
+            elif self.engine == 'pandas':
+                features = self._create_features_pandas(df, names if columns is None else list(columns))
+            else:
+                raise ValueError(f"Неизвестный движок признаков: {self.engine}")
+            stage.record(nbytes=features.memory_usage(index=False).sum())
+        
+        features_df = pd.concat([df.drop(columns=features.columns, errors='ignore'), features], axis=1)
+        
+        logger.info(f"Создано {len(features_df.columns)} признаков")
+        return features_df
+    
+    def _create_features_pandas(self, df: pd.DataFrame, names: List[str]) -> pd.DataFrame:
+        """Расчет признаков на pandas по графу зависимостей (feature_registry.py)."""
+        # Ряды собираются в отдельный DataFrame и приводятся к типу политики одним шагом
+        # вместо копии всего DataFrame и вставки колонок по одной
+        features = feature_registry.compute(df, self, names)
+        return self.dtype_policy.cast_features(features)
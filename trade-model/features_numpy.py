@@ -0,0 +1,280 @@
+"""
+Векторизованный расчет признаков на NumPy (FEATURE_ENGINE=numpy).
+
+Тот же набор признаков, что и в реестре feature_registry, записывается
+в один заранее выделенный двумерный массив: скользящие окна считаются через
+блочные кумулятивные суммы, лаги - сдвигом срезов, EMA - блочным сканированием
+без поэлементного цикла Python.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Local imports
+from feature_registry import RSI_PERIOD, MACD_FAST, MACD_SLOW, MACD_SIGNAL, LAGS
+
+# Длина блока при сканировании EMA: множитель (1 - alpha) ** -EMA_BLOCK
+# остается далеко от переполнения для всех периодов MACD
+EMA_BLOCK = 256
+
+# Длина блока, внутри которого накапливаются кумулятивные суммы скользящих окон
+CUMSUM_BLOCK = 1024
+
+
+def shift(x: np.ndarray, periods: int) -> np.ndarray:
+    """Аналог Series.shift(periods) для periods > 0."""
+    out = np.full(len(x), np.nan)
+    if periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+
+def pct_change(x: np.ndarray, periods: int) -> np.ndarray:
+    """Аналог Series.pct_change(periods) (x / x.shift(periods) - 1)."""
+    out = np.full(len(x), np.nan)
+    if periods < len(x):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[periods:] = x[periods:] / x[:len(x) - periods] - 1
+    return out
+
+
+def _window_sums(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Суммы по скользящим окнам через кумулятивные суммы внутри блоков.
+
+    Кумулятивная сумма перезапускается каждые CUMSUM_BLOCK строк, поэтому
+    ошибка округления ограничена суммой одного блока, а не всей истории
+    (важно для рядов с большими значениями, например притоков ~1e8,
+    на миллионах строк). Окно, пересекающее границу блока, дополняется
+    суммой хвоста предыдущего блока.
+
+    Returns:
+        Суммы для окон, заканчивающихся на позициях window-1..n-1
+    """
+    n = len(x)
+    if window >= CUMSUM_BLOCK:
+        cumulative = np.concatenate(([0.0], np.cumsum(x)))
+        return cumulative[window:] - cumulative[:-window]
+
+    blocks = -(-n // CUMSUM_BLOCK)
+    local = np.zeros(blocks * CUMSUM_BLOCK)
+    local[:n] = x
+    local = np.cumsum(local.reshape(blocks, CUMSUM_BLOCK), axis=1)
+    block_ends = local[:, -1]
+    local = local.ravel()
+
+    sums = local[window - 1:n].copy()
+    sums[1:] -= local[:n - window]
+
+    if blocks > 1:
+        # Окна, которые начинаются в предыдущем блоке: t = b * CUMSUM_BLOCK + r, r < window
+        ends = (np.arange(1, blocks)[:, None] * CUMSUM_BLOCK + np.arange(window)[None, :]).ravel()
+        ends = ends[ends < n]
+        sums[ends - (window - 1)] += block_ends[ends // CUMSUM_BLOCK - 1]
+    return sums
+
+
+def _rolling_masked(x: np.ndarray, window: int, stat: str) -> np.ndarray:
+    """Скользящая статистика для ряда с пропусками (окна с пропуском дают NaN)."""
+    invalid = ~np.isfinite(x)
+    out = np.full(len(x), np.nan)
+    if invalid.all():
+        return out
+    start = int(np.argmax(~invalid))
+    if not invalid[start:].any():
+        # Пропуски только в начале ряда (например, первая доходность)
+        out[start:] = rolling_std(x[start:], window) if stat == 'std' else rolling_mean(x[start:], window)
+        return out
+    filled = np.where(invalid, x[~invalid][0], x)
+    values = rolling_std(filled, window) if stat == 'std' else rolling_mean(filled, window)
+    invalid_count = np.concatenate(([0], np.cumsum(invalid)))
+    complete = (invalid_count[window:] - invalid_count[:-window]) == 0
+    out[window - 1:] = np.where(complete, values[window - 1:], np.nan)
+    return out
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """Аналог Series.rolling(window).mean() (min_periods=window)."""
+    out = np.empty(len(x))
+    if window > len(x):
+        out[:] = np.nan
+        return out
+    if not np.isfinite(x).all():
+        return _rolling_masked(x, window, 'mean')
+
+    center = float(x[0])
+    out[:window - 1] = np.nan
+    out[window - 1:] = _window_sums(x - center, window)
+    out[window - 1:] *= 1.0 / window
+    out[window - 1:] += center
+    return out
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Аналог Series.rolling(window).std() (ddof=1, min_periods=window)."""
+    out = np.empty(len(x))
+    if window > len(x) or window < 2:
+        out[:] = np.nan
+        return out
+    if not np.isfinite(x).all():
+        return _rolling_masked(x, window, 'std')
+
+    # Смещение на первое значение снижает потерю точности в S2 - S1^2 / w
+    centered = x - float(x[0])
+    sums = _window_sums(centered, window)
+    np.multiply(centered, centered, out=centered)
+    variance = _window_sums(centered, window)
+    # (S2 - S1^2 / w) / (w - 1)
+    np.multiply(sums, sums, out=sums)
+    sums *= 1.0 / window
+    variance -= sums
+    variance *= 1.0 / (window - 1)
+    np.maximum(variance, 0.0, out=variance)
+    out[:window - 1] = np.nan
+    np.sqrt(variance, out=out[window - 1:])
+    return out
+
+
+def ewm_mean(x: np.ndarray, span: int) -> np.ndarray:
+    """
+    Аналог Series.ewm(span=span).mean() (adjust=True) для ряда без пропусков.
+
+    Числитель EMA N_t = d * N_{t-1} + x_t (d = 1 - alpha) внутри блока считается
+    кумулятивной суммой x_i * d^-i, перенос между блоками - короткой рекурсией
+    по концам блоков. Знаменатель adjust=True равен (1 - d^(t+1)) / (1 - d).
+    """
+    n = len(x)
+    if n == 0:
+        return np.array([], dtype=float)
+    if not np.isfinite(x).all():
+        # Пропуски меняют веса EMA (ignore_na=False) - используем pandas
+        return pd.Series(x).ewm(span=span).mean().to_numpy()
+
+    decay = 1.0 - 2.0 / (span + 1.0)
+    blocks = -(-n // EMA_BLOCK)
+    padded = np.zeros(blocks * EMA_BLOCK)
+    padded[:n] = x
+    padded = padded.reshape(blocks, EMA_BLOCK)
+
+    k = np.arange(EMA_BLOCK)
+    # Числитель внутри каждого блока без учета предыдущих блоков
+    padded *= decay ** -k
+    local = np.cumsum(padded, axis=1)
+    local *= decay ** k
+
+    # Числитель на конце каждого блока с учетом всех предыдущих
+    block_decay = decay ** EMA_BLOCK
+    carry = np.empty(blocks)
+    previous = 0.0
+    for b, block_end in enumerate(local[:, -1]):
+        previous = previous * block_decay + block_end
+        carry[b] = previous
+
+    carry_in = np.concatenate(([0.0], carry[:-1]))
+    local += carry_in[:, None] * decay ** (k + 1)
+    numerator = local.ravel()[:n]
+
+    # Знаменатель: d^(t+1) становится пренебрежимо мал уже через несколько сотен строк,
+    # поэтому степень считается только для начала ряда
+    head = min(n, int(np.ceil(np.log(np.finfo(float).eps) / np.log(decay))) + 1)
+    numerator[:head] /= (1.0 - decay ** (np.arange(head) + 1.0)) / (1.0 - decay)
+    numerator[head:] *= 1.0 - decay
+    return numerator
+
+
+def rsi(close: np.ndarray, period: int) -> np.ndarray:
+    """Аналог признака rsi из feature_registry."""
+    delta = np.full(len(close), np.nan)
+    delta[1:] = np.diff(close)
+    # Series.where(delta > 0, 0) заменяет и NaN первой разности на 0
+    gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+    loss = rolling_mean(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def _safe_denominator(x: np.ndarray) -> np.ndarray:
+    """Аналог .replace(0, 1) для знаменателей."""
+    return np.where(x == 0, 1.0, x)
+
+
+def compute_features(df: pd.DataFrame, engineer, names: List[str],
+                     dtype: str = 'float64') -> np.ndarray:
+    """
+    Расчет признаков в один заранее выделенный массив.
+
+    Args:
+        df: DataFrame с данными OHLCV и (необязательно) etf_flow
+        engineer: FeatureEngineer с параметрами окон
+        names: Порядок колонок результата (FeatureEngineer.feature_names)
+        dtype: Тип массива признаков
+
+    Returns:
+        Массив формы (len(df), len(names)) в порядке Fortran (колонка непрерывна)
+    """
+    n = len(df)
+    out = np.empty((n, len(names)), dtype=dtype, order='F')
+    position: Dict[str, int] = {name: i for i, name in enumerate(names)}
+
+    def put(name: str, values) -> None:
+        out[:, position[name]] = values
+
+    def put_lag(name: str, values: np.ndarray, lag: int) -> None:
+        # Лаг пишется срезом прямо в колонку результата, без промежуточного массива
+        column = out[:, position[name]]
+        column[:lag] = np.nan
+        column[lag:] = values[:n - lag]
+
+    close = df['close'].to_numpy(dtype='float64')
+    volume = df['volume'].to_numpy(dtype='float64')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return_prev = pct_change(close, 1)
+        put('return_prev', return_prev)
+        put('return_3d', pct_change(close, 3))
+        put('return_7d', pct_change(close, 7))
+
+        put('volatility', rolling_std(return_prev, engineer.volatility_window))
+
+        ma_short = rolling_mean(close, engineer.ma_short_window)
+        ma_long = rolling_mean(close, engineer.ma_long_window)
+        put('ma_7', ma_short)
+        put('ma_30', ma_long)
+        put('price_to_ma7', close / _safe_denominator(ma_short))
+        put('price_to_ma30', close / _safe_denominator(ma_long))
+        put('ma7_to_ma30', ma_short / _safe_denominator(ma_long))
+
+        put('hl_spread', (df['high'].to_numpy(dtype='float64') - df['low'].to_numpy(dtype='float64')) / close)
+
+        volume_ma = rolling_mean(volume, engineer.ma_short_window)
+        put('volume_ma7', volume_ma)
+        put('volume_ratio', volume / _safe_denominator(volume_ma))
+
+        etf_flow: Optional[np.ndarray] = None
+        if 'etf_flow' in df.columns:
+            etf_flow = df['etf_flow'].to_numpy(dtype='float64')
+            etf_flow_ma = rolling_mean(etf_flow, engineer.ma_short_window)
+            put('etf_flow_change', pct_change(etf_flow, 1))
+            put('etf_flow_ma7', etf_flow_ma)
+            put('etf_flow_ratio', etf_flow / _safe_denominator(etf_flow_ma))
+        else:
+            put('etf_flow_change', 0.0)
+            put('etf_flow_ma7', 0.0)
+            put('etf_flow_ratio', 0.0)
+
+        for lag in LAGS:
+            put_lag(f'return_lag_{lag}', return_prev, lag)
+            put_lag(f'volume_lag_{lag}', volume, lag)
+            if etf_flow is not None:
+                put_lag(f'etf_flow_lag_{lag}', etf_flow, lag)
+
+        put('rsi', rsi(close, RSI_PERIOD))
+        macd = ewm_mean(close, MACD_FAST) - ewm_mean(close, MACD_SLOW)
+        put('macd', macd)
+        put('macd_signal', ewm_mean(macd, MACD_SIGNAL))
+
+    # Бесконечные значения заменяются на NaN только в массиве признаков
+    out[~np.isfinite(out)] = np.nan
+    return out
@@ -0,0 +1,426 @@
+"""
+Потоковый (инкрементальный) расчет признаков по одному бару.
+
+OnlineFeatureEngineer хранит кольцевые буферы, скользящие суммы и состояния
+EMA, поэтому каждый новый бар обрабатывается за O(1) независимо от длины
+истории. Результат совпадает со строкой FeatureEngineer.create_features для
+того же бара. Состояние сериализуется в JSON: перезапущенный сервис
+продолжает расчет без повторного прохода по истории.
+"""
+
+import os
+import json
+import math
+import logging
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+# Local imports
+from features import FeatureEngineer, RSI_PERIOD, MACD_FAST, MACD_SLOW, MACD_SIGNAL, RETURN_PERIODS, LAGS
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Версия формата сохраненного состояния
+STATE_VERSION = 1
+
+# Через сколько добавлений суммы окна пересчитываются заново (ограничение накопления ошибки)
+RECOMPUTE_EVERY = 1024
+
+NAN = float('nan')
+
+
+def _finite(value: float) -> bool:
+    return value is not None and math.isfinite(value)
+
+
+def _clean(value: float) -> float:
+    """Бесконечности и None заменяются на NaN (как replace([inf, -inf], nan))."""
+    return value if _finite(value) else NAN
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    """Деление с заменой нулевого знаменателя на 1 (как .replace(0, 1))."""
+    if denominator == 0:
+        denominator = 1.0
+    return numerator / denominator
+
+
+def _pct_change(current: float, previous: float) -> float:
+    """Аналог pct_change для пары значений (x / 0 - бесконечность или NaN)."""
+    if math.isnan(current) or math.isnan(previous):
+        return NAN
+    if previous == 0:
+        return NAN if current == 0 else math.copysign(math.inf, current)
+    return current / previous - 1
+
+
+class RollingWindow:
+    """Скользящее окно фиксированной длины с суммой и суммой квадратов."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque(maxlen=window)
+        self.invalid = 0
+        self.pushes = 0
+        # Значения хранятся со смещением center, чтобы S2 - S1^2 / w не теряло точность
+        self.center: Optional[float] = None
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value: float) -> None:
+        """Добавление значения с вытеснением самого старого."""
+        if len(self.values) == self.window:
+            self._remove(self.values[0])
+        self.values.append(value)
+        if _finite(value):
+            if self.center is None:
+                self.center = value
+            shifted = value - self.center
+            self.total += shifted
+            self.total_sq += shifted * shifted
+        else:
+            self.invalid += 1
+
+        self.pushes += 1
+        if self.pushes % RECOMPUTE_EVERY == 0:
+            self._recompute()
+
+    def _remove(self, value: float) -> None:
+        if _finite(value):
+            shifted = value - self.center
+            self.total -= shifted
+            self.total_sq -= shifted * shifted
+        else:
+            self.invalid -= 1
+
+    def _recompute(self) -> None:
+        """Точный пересчет сумм по буферу (O(window) раз в RECOMPUTE_EVERY добавлений)."""
+        finite = [v for v in self.values if _finite(v)]
+        self.center = finite[-1] if finite else None
+        shifted = [v - self.center for v in finite]
+        self.total = math.fsum(shifted)
+        self.total_sq = math.fsum(s * s for s in shifted)
+        self.invalid = len(self.values) - len(finite)
+
+    def ready(self) -> bool:
+        return len(self.values) == self.window and self.invalid == 0
+
+    def mean(self) -> float:
+        """Аналог rolling(window).mean() (NaN, пока окно не заполнено без пропусков)."""
+        if not self.ready():
+            return NAN
+        return self.total / self.window + self.center
+
+    def std(self) -> float:
+        """Аналог rolling(window).std() (ddof=1)."""
+        if not self.ready() or self.window < 2:
+            return NAN
+        variance = (self.total_sq - self.total * self.total / self.window) / (self.window - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            'values': [_encode(v) for v in self.values],
+            'pushes': self.pushes
+        }
+
+    def load(self, state: Dict[str, Any]) -> None:
+        self.values = deque((_decode(v) for v in state['values']), maxlen=self.window)
+        self.pushes = state['pushes']
+        self._recompute()
+
+
+class EWMState:
+    """EMA с adjust=True (как Series.ewm(span).mean()) за O(1) на значение."""
+
+    def __init__(self, span: int):
+        self.decay = 1.0 - 2.0 / (span + 1.0)
+        self.numerator = 0.0
+        self.denominator = 0.0
+
+    def update(self, value: float) -> float:
+        """
+        Добавление значения. Пропуск (ignore_na=False) уменьшает веса прошлых
+        наблюдений, но не меняет текущее среднее.
+        """
+        self.numerator *= self.decay
+        self.denominator *= self.decay
+        if _finite(value):
+            self.numerator += value
+            self.denominator += 1.0
+        return self.value()
+
+    def value(self) -> float:
+        return self.numerator / self.denominator if self.denominator > 0 else NAN
+
+    def state(self) -> Dict[str, float]:
+        return {'numerator': self.numerator, 'denominator': self.denominator}
+
+    def load(self, state: Dict[str, float]) -> None:
+        self.numerator = state['numerator']
+        self.denominator = state['denominator']
+
+
+def _encode(value: float) -> Optional[float]:
+    """NaN и бесконечности не представимы в JSON - сохраняются как строки."""
+    if value is None or math.isnan(value):
+        return None
+    if math.isinf(value):
+        return 'inf' if value > 0 else '-inf'
+    return value
+
+
+def _decode(value: Any) -> float:
+    if value is None:
+        return NAN
+    return float(value)
+
+
+class OnlineFeatureEngineer:
+    """Инкрементальный расчет признаков FeatureEngineer по одному бару."""
+
+    def __init__(self, engineer: Optional[FeatureEngineer] = None, has_etf_flow: bool = True):
+        """
+        Инициализация пустого состояния.
+
+        Args:
+            engineer: FeatureEngineer с параметрами окон (по умолчанию из переменных окружения)
+            has_etf_flow: Есть ли в барах поле etf_flow
+        """
+        self.engineer = engineer or FeatureEngineer()
+        self.has_etf_flow = has_etf_flow
+        self.feature_names: List[str] = self.engineer.feature_names(has_etf_flow)
+        self.bars_seen = 0
+        self.last_timestamp: Optional[str] = None
+
+        history = max(max(RETURN_PERIODS), max(LAGS)) + 1
+        self.closes: deque = deque(maxlen=history)
+        self.volumes: deque = deque(maxlen=max(LAGS) + 1)
+        self.etf_flows: deque = deque(maxlen=max(LAGS) + 1)
+        self.returns: deque = deque(maxlen=max(LAGS) + 1)
+
+        self.volatility = RollingWindow(self.engineer.volatility_window)
+        self.ma_short = RollingWindow(self.engineer.ma_short_window)
+        self.ma_long = RollingWindow(self.engineer.ma_long_window)
+        self.volume_ma = RollingWindow(self.engineer.ma_short_window)
+        self.etf_flow_ma = RollingWindow(self.engineer.ma_short_window)
+        self.gain = RollingWindow(RSI_PERIOD)
+        self.loss = RollingWindow(RSI_PERIOD)
+
+        self.ema_fast = EWMState(MACD_FAST)
+        self.ema_slow = EWMState(MACD_SLOW)
+        self.ema_signal = EWMState(MACD_SIGNAL)
+
+    def update(self, bar: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Обработка нового бара.
+
+        Args:
+            bar: Словарь с полями open, high, low, close, volume и (если has_etf_flow)
+                etf_flow; необязательное поле timestamp сохраняется в состоянии
+
+        Returns:
+            Словарь признаков нового бара в порядке FeatureEngineer.feature_names
+        """
+        close = float(bar['close'])
+        volume = float(bar['volume'])
+        f: Dict[str, float] = {}
+
+        previous_close = self.closes[-1] if self.closes else NAN
+        self.closes.append(close)
+        self.volumes.append(volume)
+
+        # 1. Returns
+        for period, name in zip(RETURN_PERIODS, ('return_prev', 'return_3d', 'return_7d')):
+            f[name] = _pct_change(close, self.closes[-1 - period]) if len(self.closes) > period else NAN
+        return_prev = f['return_prev']
+        self.returns.append(return_prev)
+
+        # 2. Volatility
+        self.volatility.push(return_prev)
+        f['volatility'] = self.volatility.std()
+
+        # 3-4. Moving averages
+        self.ma_short.push(close)
+        self.ma_long.push(close)
+        ma_short = self.ma_short.mean()
+        ma_long = self.ma_long.mean()
+        f['ma_7'] = ma_short
+        f['ma_30'] = ma_long
+        f['price_to_ma7'] = _ratio(close, ma_short)
+        f['price_to_ma30'] = _ratio(close, ma_long)
+        f['ma7_to_ma30'] = _ratio(ma_short, ma_long)
+
+        # 5. High-Low spread
+        spread = float(bar['high']) - float(bar['low'])
+        f['hl_spread'] = spread / close if close != 0 else NAN
+
+        # 6. Volume
+        self.volume_ma.push(volume)
+        volume_ma = self.volume_ma.mean()
+        f['volume_ma7'] = volume_ma
+        f['volume_ratio'] = _ratio(volume, volume_ma)
+
+        # 7. ETF flow
+        if self.has_etf_flow:
+            etf_flow = float(bar['etf_flow']) if bar.get('etf_flow') is not None else NAN
+            previous_flow = self.etf_flows[-1] if self.etf_flows else NAN
+            self.etf_flows.append(etf_flow)
+            self.etf_flow_ma.push(etf_flow)
+            etf_flow_ma = self.etf_flow_ma.mean()
+            f['etf_flow_change'] = _pct_change(etf_flow, previous_flow)
+            f['etf_flow_ma7'] = etf_flow_ma
+            f['etf_flow_ratio'] = _ratio(etf_flow, etf_flow_ma)
+        else:
+            f['etf_flow_change'] = 0.0
+            f['etf_flow_ma7'] = 0.0
+            f['etf_flow_ratio'] = 0.0
+
+        # 8. Lags
+        for lag in LAGS:
+            f[f'return_lag_{lag}'] = self.returns[-1 - lag] if len(self.returns) > lag else NAN
+            f[f'volume_lag_{lag}'] = self.volumes[-1 - lag] if len(self.volumes) > lag else NAN
+            if self.has_etf_flow:
+                f[f'etf_flow_lag_{lag}'] = self.etf_flows[-1 - lag] if len(self.etf_flows) > lag else NAN
+
+        # 9. RSI и MACD
+        delta = close - previous_close
+        # Series.where(delta > 0, 0) заменяет NaN на 0
+        self.gain.push(delta if delta > 0 else 0.0)
+        self.loss.push(-delta if delta < 0 else 0.0)
+        gain = self.gain.mean()
+        loss = self.loss.mean()
+        f['rsi'] = self._rsi(gain, loss)
+
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        f['macd'] = macd
+        f['macd_signal'] = self.ema_signal.update(macd)
+
+        self.bars_seen += 1
+        if bar.get('timestamp') is not None:
+            self.last_timestamp = str(bar['timestamp'])
+
+        return {name: _clean(f[name]) for name in self.feature_names}
+
+    @staticmethod
+    def _rsi(gain: float, loss: float) -> float:
+        """RSI = 100 - 100 / (1 + gain / loss) с семантикой деления pandas."""
+        if math.isnan(gain) or math.isnan(loss):
+            return NAN
+        if loss == 0:
+            return NAN if gain == 0 else 100.0
+        return 100 - 100 / (1 + gain / loss)
+
+    def update_many(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Последовательная обработка строк DataFrame (прогрев состояния по истории).
+
+        Args:
+            data: DataFrame с колонками OHLCV (и etf_flow)
+
+        Returns:
+            DataFrame признаков для каждой строки
+        """
+        rows = []
+        for timestamp, bar in zip(data.index, data.to_dict('records')):
+            bar['timestamp'] = timestamp
+            rows.append(self.update(bar))
+        return pd.DataFrame(rows, index=data.index, columns=self.feature_names)
+
+    def state_dict(self) -> Dict[str, Any]:
+        """Состояние в JSON-сериализуемом виде."""
+        return {
+            'version': STATE_VERSION,
+            'config': self.engineer.config(),
+            'has_etf_flow': self.has_etf_flow,
+            'bars_seen': self.bars_seen,
+            'last_timestamp': self.last_timestamp,
+            'buffers': {
+                name: [_encode(v) for v in getattr(self, name)]
+                for name in ('closes', 'volumes', 'etf_flows', 'returns')
+            },
+            'windows': {
+                name: getattr(self, name).state()
+                for name in ('volatility', 'ma_short', 'ma_long', 'volume_ma', 'etf_flow_ma', 'gain', 'loss')
+            },
+            'ema': {
+                name: getattr(self, name).state()
+                for name in ('ema_fast', 'ema_slow', 'ema_signal')
+            }
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], engineer: Optional[FeatureEngineer] = None) -> 'OnlineFeatureEngineer':
+        """
+        Восстановление из сохраненного состояния.
+
+        Args:
+            state: Результат state_dict
+            engineer: FeatureEngineer с параметрами окон
+
+        Returns:
+            Экземпляр с восстановленным состоянием
+
+        Raises:
+            ValueError: Если версия состояния или параметры признаков не совпадают
+        """
+        if state.get('version') != STATE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия состояния: {state.get('version')}")
+
+        online = cls(engineer, has_etf_flow=state['has_etf_flow'])
+        if state['config'] != online.engineer.config():
+            raise ValueError("Параметры признаков отличаются от сохраненного состояния")
+
+        online.bars_seen = state['bars_seen']
+        online.last_timestamp = state['last_timestamp']
+        for name, values in state['buffers'].items():
+            buffer = getattr(online, name)
+            buffer.extend(_decode(v) for v in values)
+        for name, window_state in state['windows'].items():
+            getattr(online, name).load(window_state)
+        for name, ema_state in state['ema'].items():
+            getattr(online, name).load(ema_state)
+        return online
+
+    def save(self, path: str) -> None:
+        """Атомарная запись состояния в JSON-файл."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state_dict(), f)
+        os.replace(tmp_path, path)
+        logger.info(f"Состояние признаков сохранено в {path} ({self.bars_seen} баров)")
+
+    @classmethod
+    def load(cls, path: str, engineer: Optional[FeatureEngineer] = None) -> 'OnlineFeatureEngineer':
+        """Загрузка состояния из JSON-файла."""
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        online = cls.from_state(state, engineer)
+        logger.info(f"Состояние признаков загружено из {path} ({online.bars_seen} баров)")
+        return online
+
+
+def replay(data: pd.DataFrame, engineer: Optional[FeatureEngineer] = None) -> OnlineFeatureEngineer:
+    """
+    Создание состояния по истории (однократно, далее - только update).
+
+    Args:
+        data: История с колонками OHLCV (и etf_flow)
+        engineer: FeatureEngineer с параметрами окон
+
+    Returns:
+        OnlineFeatureEngineer, прогретый по всей истории
+    """
+    online = OnlineFeatureEngineer(engineer, has_etf_flow='etf_flow' in data.columns)
+    online.update_many(data)
+    return online
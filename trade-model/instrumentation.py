@@ -0,0 +1,289 @@
+"""
+Время и счетчики этапов конвейера с экспортом в Prometheus и StatsD.
+
+span(stage) оборачивает этап (запрос к базе, resample, create_features, загрузка
+модели, predict_proba, обучение) и записывает время, число строк и байт:
+- в сборщик активного запроса (collect()), из которого формируется блок
+  'timings' в словаре результата;
+- в общий реестр процесса, который выводится в текстовом формате Prometheus
+  (GET /metrics в serve.py, файл METRICS_TEXTFILE для пакетных запусков);
+- в StatsD по UDP, если задан STATSD_HOST.
+
+Сборщик хранится в contextvars, поэтому запросы в разных потоках сервера и
+задачах asyncio не смешиваются. Модуль использует только стандартную
+библиотеку: его импортирует predict при старте.
+"""
+
+import os
+import time
+import socket
+import logging
+import functools
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Сборщик времени этапов текущего запроса
+_current: contextvars.ContextVar = contextvars.ContextVar('timings', default=None)
+
+
+def object_bytes(obj: Any) -> Optional[int]:
+    """Размер DataFrame/Series (без содержимого object-колонок) или ndarray в байтах."""
+    if obj is None:
+        return None
+    if hasattr(obj, 'memory_usage'):
+        usage = obj.memory_usage(index=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if hasattr(obj, 'nbytes'):
+        return int(obj.nbytes)
+    return None
+
+
+class Span:
+    """Измеряемый этап: число строк и байт можно указать после выполнения тела."""
+
+    __slots__ = ('stage', 'rows', 'bytes')
+
+    def __init__(self, stage: str, rows: Optional[int] = None, nbytes: Optional[int] = None):
+        self.stage = stage
+        self.rows = rows
+        self.bytes = nbytes
+
+    def record(self, obj: Any = None, rows: Optional[int] = None, nbytes: Optional[int] = None) -> Any:
+        """
+        Запись объема данных этапа.
+
+        Args:
+            obj: Результат этапа (DataFrame, ndarray); строки и байты берутся из него
+            rows: Число строк (если obj не задан)
+            nbytes: Число байт (если obj не задан)
+
+        Returns:
+            obj без изменений
+        """
+        if obj is not None:
+            rows = len(obj) if rows is None else rows
+            nbytes = object_bytes(obj) if nbytes is None else nbytes
+        if rows is not None:
+            self.rows = int(rows)
+        if nbytes is not None:
+            self.bytes = int(nbytes)
+        return obj
+
+
+class Timings:
+    """Время этапов одного запроса (предсказания или обучения)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+
+    def add(self, stage: str, seconds: float, rows: Optional[int] = None, nbytes: Optional[int] = None) -> None:
+        info = self.stages.setdefault(stage, {'seconds': 0.0, 'calls': 0})
+        info['seconds'] += seconds
+        info['calls'] += 1
+        if rows is not None:
+            info['rows'] = info.get('rows', 0) + rows
+        if nbytes is not None:
+            info['bytes'] = info.get('bytes', 0) + nbytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Блок 'timings' результата: общее время и этапы (вложенные этапы пересекаются)."""
+        return {
+            'total_seconds': round(time.perf_counter() - self.started, 6),
+            'stages': {
+                stage: {key: round(value, 6) if isinstance(value, float) else value
+                        for key, value in info.items()}
+                for stage, info in self.stages.items()
+            }
+        }
+
+    def log(self, title: str = "Время по этапам") -> None:
+        """Вывод времени этапов в лог."""
+        logger.info(title)
+        for stage, info in self.stages.items():
+            rows = f", {info['rows']} строк" if 'rows' in info else ''
+            logger.info(f"  {stage:18} {info['seconds']:9.3f} с  ({info['calls']} вызовов{rows})")
+
+
+class MetricsRegistry:
+    """Накопительные счетчики этапов процесса."""
+
+    # Счетчик Prometheus: поле, имя метрики, описание
+    COUNTERS = (
+        ('calls', 'stage_calls_total', 'Число выполнений этапа'),
+        ('errors', 'stage_errors_total', 'Число выполнений этапа с ошибкой'),
+        ('seconds', 'stage_seconds_total', 'Суммарное время этапа в секундах'),
+        ('rows', 'rows_processed_total', 'Число обработанных строк'),
+        ('bytes', 'bytes_loaded_total', 'Объем данных этапа в байтах'),
+    )
+
+    def __init__(self, prefix: str = 'trade_model'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def observe(self, stage: str, seconds: float, rows: Optional[int] = None,
+                nbytes: Optional[int] = None, error: bool = False) -> None:
+        with self._lock:
+            info = self._stages.setdefault(stage, {'calls': 0, 'errors': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0})
+            info['calls'] += 1
+            info['errors'] += int(error)
+            info['seconds'] += seconds
+            info['rows'] += rows or 0
+            info['bytes'] += nbytes or 0
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {stage: dict(info) for stage, info in self._stages.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def prometheus_text(self) -> str:
+        """Счетчики в текстовом формате Prometheus (exposition format 0.0.4)."""
+        stages = self.snapshot()
+        lines = []
+        for field, name, description in self.COUNTERS:
+            metric = f'{self.prefix}_{name}'
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} counter')
+            for stage in sorted(stages):
+                value = stages[stage][field]
+                text = repr(float(value)) if field == 'seconds' else str(int(value))
+                lines.append(f'{metric}{{stage="{stage}"}} {text}')
+        return '\n'.join(lines) + '\n'
+
+
+class StatsdClient:
+    """Отправка времени и счетчиков этапа в StatsD по UDP (ошибки сети игнорируются)."""
+
+    def __init__(self, host: str, port: int = 8125, prefix: str = 'trade_model'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, stage: str, seconds: float, rows: Optional[int] = None,
+             nbytes: Optional[int] = None, error: bool = False) -> None:
+        name = f'{self.prefix}.{stage}'
+        lines = [f'{name}.time:{seconds * 1000:.3f}|ms']
+        if rows is not None:
+            lines.append(f'{name}.rows:{rows}|c')
+        if nbytes is not None:
+            lines.append(f'{name}.bytes:{nbytes}|c')
+        if error:
+            lines.append(f'{name}.errors:1|c')
+        try:
+            self._socket.sendto('\n'.join(lines).encode('ascii'), self.address)
+        except OSError as e:
+            logger.debug(f"Не удалось отправить метрики в StatsD: {e}")
+
+
+REGISTRY = MetricsRegistry(os.getenv('METRICS_PREFIX', 'trade_model'))
+
+_statsd: Optional[StatsdClient] = None
+_statsd_configured = False
+
+
+def statsd_client() -> Optional[StatsdClient]:
+    """Клиент StatsD из STATSD_HOST / STATSD_PORT / STATSD_PREFIX (None, если не задан)."""
+    global _statsd, _statsd_configured
+    if not _statsd_configured:
+        host = os.getenv('STATSD_HOST')
+        if host:
+            _statsd = StatsdClient(host, int(os.getenv('STATSD_PORT', '8125')),
+                                   os.getenv('STATSD_PREFIX', REGISTRY.prefix))
+        _statsd_configured = True
+    return _statsd
+
+
+@contextmanager
+def collect() -> Iterator[Timings]:
+    """
+    Сборщик времени этапов запроса.
+
+    Вложенный вызов (например, predict внутри predict_from_database) использует
+    уже активный сборщик, поэтому этапы попадают в результат внешнего вызова.
+    """
+    current = _current.get()
+    if current is not None:
+        yield current
+        return
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(stage: str, rows: Optional[int] = None, nbytes: Optional[int] = None) -> Iterator[Span]:
+    """
+    Измерение этапа.
+
+    Args:
+        stage: Название этапа (например, 'db.load_candles', 'create_features')
+        rows: Число строк, если известно заранее
+        nbytes: Число байт, если известно заранее
+
+    Yields:
+        Span, через record() которого можно указать объем результата
+    """
+    current = Span(stage, rows, nbytes)
+    error = False
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        error = True
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        timings = _current.get()
+        if timings is not None:
+            timings.add(stage, seconds, current.rows, current.bytes)
+        REGISTRY.observe(stage, seconds, current.rows, current.bytes, error)
+        client = statsd_client()
+        if client is not None:
+            client.send(stage, seconds, current.rows, current.bytes, error)
+
+
+def with_timings(func: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+    """Декоратор: добавляет в словарь результата блок 'timings' внешнего сборщика."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with collect() as timings:
+            result = func(*args, **kwargs)
+            if isinstance(result, dict):
+                result['timings'] = timings.to_dict()
+        return result
+    return wrapper
+
+
+def write_textfile(path: Optional[str] = None) -> Optional[str]:
+    """
+    Запись счетчиков в файл для textfile collector node_exporter.
+
+    Args:
+        path: Путь к файлу (по умолчанию METRICS_TEXTFILE; если не задан - ничего не пишется)
+
+    Returns:
+        Путь к записанному файлу или None
+    """
+    path = path or os.getenv('METRICS_TEXTFILE')
+    if not path:
+        return None
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # Запись через временный файл, чтобы сборщик не прочитал неполный файл
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(REGISTRY.prometheus_text())
+    os.replace(temp_path, path)
+    return path
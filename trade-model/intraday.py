@@ -0,0 +1,101 @@
+"""
+Внутридневные статистики, собираемые при агрегации 5m свечей.
+
+Для каждой исходной свечи векторно считаются слагаемые (квадрат доходности
+свечи, объем по направлению, цена на объем, максимумы и минимумы по торговым
+сессиям), которые сворачиваются той же группировкой, что и OHLCV. Все
+слагаемые объединяются суммой, максимумом или минимумом, поэтому частичные
+агрегаты из разных частей потока сливаются без повторного прохода по
+исходным строкам. После свертки finalize_intraday превращает суммы в признаки.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Торговые сессии по часу open_time (UTC, как в btc_candles): название, начало, конец
+SESSIONS = (('asia', 0, 8), ('europe', 8, 16), ('us', 16, 24))
+
+# Слагаемые внутридневных статистик и способ их объединения
+INTRADAY_AGG: Dict[str, str] = {
+    'sum_sq_return': 'sum',
+    'max_abs_return': 'max',
+    'sum_price_volume': 'sum',
+    'up_volume': 'sum',
+    'down_volume': 'sum',
+}
+for _session, _, _ in SESSIONS:
+    INTRADAY_AGG[f'{_session}_high'] = 'max'
+    INTRADAY_AGG[f'{_session}_low'] = 'min'
+
+# Внутридневные признаки свечи после finalize_intraday
+INTRADAY_FEATURES: List[str] = [
+    'realized_variance', 'max_abs_return_5m', 'vwap_deviation', 'up_volume_share'
+] + [f'range_{session}' for session, _, _ in SESSIONS]
+
+
+def bar_statistics(df: pd.DataFrame, times: pd.Series) -> pd.DataFrame:
+    """
+    Слагаемые внутридневных статистик для каждой исходной свечи.
+
+    Доходность свечи - log(close / open), поэтому расчет не зависит от
+    соседних строк и частей потока.
+
+    Args:
+        df: Исходные свечи с колонками OHLCV
+        times: Время открытия свечей (той же длины, что и df)
+
+    Returns:
+        DataFrame с колонками INTRADAY_AGG и индексом df
+    """
+    open_ = df['open'].to_numpy(dtype='float64')
+    high = df['high'].to_numpy(dtype='float64')
+    low = df['low'].to_numpy(dtype='float64')
+    close = df['close'].to_numpy(dtype='float64')
+    volume = df['volume'].to_numpy(dtype='float64')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.log(close / open_)
+
+    stats = {
+        'sum_sq_return': returns * returns,
+        'max_abs_return': np.abs(returns),
+        'sum_price_volume': (high + low + close) / 3 * volume,
+        'up_volume': np.where(close > open_, volume, 0.0),
+        'down_volume': np.where(close < open_, volume, 0.0),
+    }
+    hours = pd.DatetimeIndex(times).hour
+    for session, start, end in SESSIONS:
+        in_session = (hours >= start) & (hours < end)
+        stats[f'{session}_high'] = np.where(in_session, high, np.nan)
+        stats[f'{session}_low'] = np.where(in_session, low, np.nan)
+    return pd.DataFrame(stats, index=df.index)
+
+
+def finalize_intraday(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Замена слагаемых внутридневных статистик признаками.
+
+    Args:
+        df: Агрегированные свечи с OHLCV и колонками INTRADAY_AGG
+
+    Returns:
+        DataFrame с OHLCV, vwap и INTRADAY_FEATURES
+    """
+    volume = df['volume'].astype('float64')
+    directional = (df['up_volume'] + df['down_volume']).astype('float64')
+    vwap = df['sum_price_volume'] / volume.where(volume > 0)
+
+    result = df.drop(columns=list(INTRADAY_AGG))
+    result['vwap'] = vwap
+    result['realized_variance'] = df['sum_sq_return']
+    result['max_abs_return_5m'] = df['max_abs_return']
+    result['vwap_deviation'] = df['close'] / vwap - 1
+    result['up_volume_share'] = (df['up_volume'] / directional.where(directional > 0)).fillna(0.5)
+    for session, _, _ in SESSIONS:
+        # Сессия без свечей в интервале (часовые свечи, неполный день) - нулевой диапазон
+        session_range = (df[f'{session}_high'] - df[f'{session}_low']) / df['open']
+        result[f'range_{session}'] = session_range.fillna(0.0)
+    return result
+
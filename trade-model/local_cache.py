@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Локальный колоночный кэш таблиц btc_candles и *_flow(s).
+
+Для каждой пары (symbol, interval) и для каждой таблицы притоков ETF хранится
+снимок в формате Parquet. При каждом запуске из базы загружаются только строки
+новее сохраненного водяного знака и дописываются отдельным файлом; при
+накоплении файлов они сливаются в один (компакция). Поддерживаются проверка
+целостности (дубликаты ключа, пропуски свечей) и принудительная полная перезагрузка.
+"""
+
+import os
+import json
+import glob
+import argparse
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+# Local imports (список таблиц притоков - общий с db.py, async_loader.py и panel_loader.py)
+from db import FLOW_TABLES
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Загрузка переменных окружения
+load_dotenv()
+
+# Длительность свечей для проверки пропусков
+INTERVAL_DURATIONS = {
+    '1m': pd.Timedelta(minutes=1),
+    '5m': pd.Timedelta(minutes=5),
+    '1h': pd.Timedelta(hours=1),
+    '1d': pd.Timedelta(days=1),
+}
+
+
+class ParquetDataset:
+    """Набор Parquet-файлов с манифестом: базовый снимок плюс дописанные части."""
+
+    def __init__(self, path: str, key: str, watermark_column: str):
+        """
+        Args:
+            path: Каталог набора данных
+            key: Колонка-ключ (уникальна в снимке, по ней сортировка)
+            watermark_column: Колонка, по которой определяются новые строки
+        """
+        self.path = path
+        self.key = key
+        self.watermark_column = watermark_column
+        self.manifest_path = os.path.join(path, '_manifest.json')
+
+    def manifest(self) -> Dict[str, Any]:
+        """Чтение манифеста (пустой, если набор еще не создан)."""
+        if not os.path.exists(self.manifest_path):
+            return {'parts': [], 'watermark': None, 'rows': 0}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(tmp_path, self.manifest_path)
+
+    def read(self) -> pd.DataFrame:
+        """Чтение снимка с удалением дубликатов ключа (побеждает последняя запись)."""
+        parts = [os.path.join(self.path, part) for part in self.manifest()['parts']]
+        if not parts:
+            return pd.DataFrame()
+        df = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+        return self._normalize(df)
+
+    def _normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        return (
+            df.drop_duplicates(subset=[self.key], keep='last')
+            .sort_values(self.key)
+            .reset_index(drop=True)
+        )
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Дописывание новых строк отдельным файлом."""
+        if df.empty:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        manifest = self.manifest()
+
+        part_name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}.parquet"
+        df.to_parquet(os.path.join(self.path, part_name), index=False)
+
+        watermark = df[self.watermark_column].max()
+        if manifest['watermark'] is not None:
+            watermark = max(watermark, pd.Timestamp(manifest['watermark']))
+
+        manifest['parts'].append(part_name)
+        manifest['watermark'] = pd.Timestamp(watermark).isoformat()
+        manifest['rows'] += len(df)
+        manifest['updated_at'] = datetime.now().isoformat()
+        self._write_manifest(manifest)
+
+    def compact(self) -> int:
+        """
+        Слияние всех частей в один файл без дубликатов.
+
+        Returns:
+            Количество строк после компакции
+        """
+        manifest = self.manifest()
+        if len(manifest['parts']) <= 1:
+            return manifest['rows']
+
+        df = self.read()
+        old_parts = manifest['parts']
+
+        part_name = f"base-{datetime.now().strftime('%Y%m%d%H%M%S%f')}.parquet"
+        df.to_parquet(os.path.join(self.path, part_name), index=False)
+
+        manifest['parts'] = [part_name]
+        manifest['rows'] = len(df)
+        manifest['compacted_at'] = datetime.now().isoformat()
+        self._write_manifest(manifest)
+
+        for part in old_parts:
+            try:
+                os.remove(os.path.join(self.path, part))
+            except OSError:
+                pass
+
+        logger.info(f"Компакция {self.path}: {len(old_parts)} файлов -> 1, {len(df)} строк")
+        return len(df)
+
+    def clear(self) -> None:
+        """Удаление всех файлов набора."""
+        for file_path in glob.glob(os.path.join(self.path, '*.parquet')):
+            os.remove(file_path)
+        if os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+
+
+class LocalDataCache:
+    """Инкрементально обновляемые локальные снимки таблиц базы данных."""
+
+    def __init__(self, engine, cache_dir: Optional[str] = None, compact_threshold: Optional[int] = None):
+        """
+        Args:
+            engine: SQLAlchemy engine для загрузки новых строк (None - только чтение снимков)
+            cache_dir: Каталог кэша (по умолчанию LOCAL_CACHE_DIR)
+            compact_threshold: Число файлов, после которого выполняется компакция
+        """
+        self.engine = engine
+        self.cache_dir = cache_dir or os.getenv('LOCAL_CACHE_DIR', 'data/cache/db')
+        self.compact_threshold = compact_threshold or int(os.getenv('LOCAL_CACHE_COMPACT_PARTS', '20'))
+
+    def candles_dataset(self, symbol: str, interval: str = '5m') -> ParquetDataset:
+        """Набор данных свечей для пары (symbol, interval)."""
+        return ParquetDataset(
+            os.path.join(self.cache_dir, 'btc_candles', f"{symbol}_{interval}"),
+            key='open_time',
+            watermark_column='open_time'
+        )
+
+    def flows_dataset(self, table: str = 'btc_flows') -> ParquetDataset:
+        """Набор данных притоков ETF для таблицы."""
+        if table not in FLOW_TABLES:
+            raise ValueError(f"Неизвестная таблица притоков: {table}")
+        return ParquetDataset(
+            os.path.join(self.cache_dir, table),
+            key='date',
+            watermark_column='updatedAt'
+        )
+
+    def sync_candles(self, symbol: str = 'BTCUSDT', interval: str = '5m',
+                     full_refresh: bool = False) -> pd.DataFrame:
+        """
+        Обновление снимка свечей и возврат всех сохраненных строк.
+
+        Загружаются строки с open_time >= водяного знака: последняя свеча
+        перезагружается, так как на момент прошлой выгрузки она могла быть незакрытой.
+
+        Args:
+            symbol: Символ торговой пары
+            interval: Интервал свечей
+            full_refresh: Удалить снимок и загрузить всю историю заново
+
+        Returns:
+            DataFrame со свечами, отсортированный по open_time
+        """
+        dataset = self.candles_dataset(symbol, interval)
+        if self.engine is None:
+            logger.warning(f"Нет подключения к базе данных, используется сохраненный снимок {symbol} {interval}")
+            return dataset.read()
+        if full_refresh:
+            dataset.clear()
+
+        watermark = dataset.manifest()['watermark']
+        query = text("""
+            SELECT open_time, open, high, low, close, volume,
+                   quote_volume, trades, taker_buy_base
+            FROM btc_candles
+            WHERE symbol = :symbol
+            AND interval = :interval
+            AND open_time >= :watermark
+            ORDER BY open_time ASC
+        """)
+        new_rows = pd.read_sql(
+            query,
+            self.engine,
+            params={
+                'symbol': symbol,
+                'interval': interval,
+                'watermark': pd.Timestamp(watermark).to_pydatetime() if watermark else datetime(1970, 1, 1)
+            },
+            parse_dates=['open_time']
+        )
+        logger.info(f"Локальный кэш {symbol} {interval}: загружено {len(new_rows)} новых строк")
+
+        return self._append_and_read(dataset, new_rows)
+
+    def sync_flows(self, table: str = 'btc_flows', full_refresh: bool = False) -> pd.DataFrame:
+        """
+        Обновление снимка таблицы притоков ETF и возврат всех сохраненных строк.
+
+        Загружаются строки, добавленные или исправленные после последней выгрузки
+        (по колонке updatedAt), поэтому пересмотренные значения тоже попадают в кэш.
+
+        Args:
+            table: Таблица притоков (btc_flows, eth_flow, sol_flow)
+            full_refresh: Удалить снимок и загрузить таблицу заново
+
+        Returns:
+            DataFrame с притоками, отсортированный по дате
+        """
+        dataset = self.flows_dataset(table)
+        if self.engine is None:
+            logger.warning(f"Нет подключения к базе данных, используется сохраненный снимок {table}")
+            return dataset.read()
+        if full_refresh:
+            dataset.clear()
+
+        watermark = dataset.manifest()['watermark']
+        query = text(f"""
+            SELECT *
+            FROM {table}
+            WHERE "updatedAt" > :watermark
+            ORDER BY date ASC
+        """)
+        new_rows = pd.read_sql(
+            query,
+            self.engine,
+            params={'watermark': pd.Timestamp(watermark).to_pydatetime() if watermark else datetime(1970, 1, 1)},
+            parse_dates=['date', 'updatedAt']
+        )
+        new_rows = new_rows.drop(columns=[c for c in ('id', 'createdAt') if c in new_rows.columns])
+        logger.info(f"Локальный кэш {table}: загружено {len(new_rows)} новых строк")
+
+        return self._append_and_read(dataset, new_rows)
+
+    def _append_and_read(self, dataset: ParquetDataset, new_rows: pd.DataFrame) -> pd.DataFrame:
+        current = dataset.read()
+        if new_rows.empty or self._already_stored(dataset, current, new_rows):
+            return current
+
+        dataset.append(new_rows)
+        if len(dataset.manifest()['parts']) > self.compact_threshold:
+            dataset.compact()
+        return dataset.read()
+
+    @staticmethod
+    def _already_stored(dataset: ParquetDataset, current: pd.DataFrame, new_rows: pd.DataFrame) -> bool:
+        """Все загруженные строки уже есть в снимке без изменений (например, повторно выгруженная последняя свеча)."""
+        if current.empty or list(current.columns) != list(new_rows.columns):
+            return False
+        known = current[current[dataset.key].isin(new_rows[dataset.key])]
+        if len(known) != len(new_rows):
+            return False
+        return (
+            known.sort_values(dataset.key).reset_index(drop=True).astype(str)
+            .equals(new_rows.sort_values(dataset.key).reset_index(drop=True).astype(str))
+        )
+
+    def check_candles(self, symbol: str = 'BTCUSDT', interval: str = '5m') -> Dict[str, Any]:
+        """
+        Проверка целостности снимка свечей.
+
+        Returns:
+            Словарь с количеством строк, дубликатов open_time и пропусков
+        """
+        dataset = self.candles_dataset(symbol, interval)
+        parts = [os.path.join(dataset.path, part) for part in dataset.manifest()['parts']]
+        if not parts:
+            return {'rows': 0, 'duplicates': 0, 'gaps': 0, 'missing_bars': 0, 'first_gaps': []}
+
+        raw = pd.concat([pd.read_parquet(part, columns=['open_time']) for part in parts], ignore_index=True)
+        times = raw['open_time'].drop_duplicates().sort_values()
+        # Дубликаты внутри одной выгрузки (перезапись последней свечи между выгрузками - норма)
+        duplicates = int(sum(
+            pd.read_parquet(part, columns=['open_time'])['open_time'].duplicated().sum()
+            for part in parts
+        ))
+
+        step = INTERVAL_DURATIONS.get(interval)
+        diffs = times.diff()
+        gap_mask = diffs > step if step is not None else pd.Series(False, index=times.index)
+        gaps = times[gap_mask]
+
+        return {
+            'rows': int(len(times)),
+            'duplicates': duplicates,
+            'gaps': int(gap_mask.sum()),
+            'missing_bars': int((diffs[gap_mask] / step - 1).sum()) if step is not None else 0,
+            'first_gaps': [
+                {'after': (t - d).isoformat(), 'before': t.isoformat()}
+                for t, d in zip(gaps.iloc[:10], diffs[gap_mask].iloc[:10])
+            ],
+            'first': times.iloc[0].isoformat(),
+            'last': times.iloc[-1].isoformat()
+        }
+
+    def check_flows(self, table: str = 'btc_flows') -> Dict[str, Any]:
+        """Проверка целостности снимка притоков (дубликаты дат внутри выгрузок)."""
+        dataset = self.flows_dataset(table)
+        parts = [os.path.join(dataset.path, part) for part in dataset.manifest()['parts']]
+        duplicates = int(sum(
+            pd.read_parquet(part, columns=['date'])['date'].duplicated().sum()
+            for part in parts
+        ))
+        df = dataset.read()
+        return {
+            'rows': int(len(df)),
+            'duplicates': duplicates,
+            'first': df['date'].min().isoformat() if not df.empty else None,
+            'last': df['date'].max().isoformat() if not df.empty else None
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    """Обслуживание локального кэша: обновление, компакция, проверка целостности."""
+    from db import get_database_manager, close_database_manager
+
+    parser = argparse.ArgumentParser(description="Локальный кэш btc_candles и таблиц притоков ETF")
+    parser.add_argument('--symbol', default=os.getenv('BTC_SYMBOL', 'BTCUSDT'))
+    parser.add_argument('--interval', default='5m')
+    parser.add_argument('--flows', nargs='*', default=['btc_flows'], choices=FLOW_TABLES)
+    parser.add_argument('--full-refresh', action='store_true', help="Загрузить все данные заново")
+    parser.add_argument('--compact', action='store_true', help="Слить части снимков в один файл")
+    parser.add_argument('--check', action='store_true', help="Проверить целостность снимков")
+    args = parser.parse_args(argv)
+
+    db_manager = get_database_manager()
+    if not db_manager.is_connected():
+        print("❌ Не удалось подключиться к базе данных")
+        return
+
+    cache = LocalDataCache(db_manager.engine)
+    try:
+        candles = cache.sync_candles(args.symbol, args.interval, full_refresh=args.full_refresh)
+        print(f"✅ {args.symbol} {args.interval}: {len(candles)} строк")
+        for table in args.flows:
+            flows = cache.sync_flows(table, full_refresh=args.full_refresh)
+            print(f"✅ {table}: {len(flows)} строк")
+
+        if args.compact:
+            cache.candles_dataset(args.symbol, args.interval).compact()
+            for table in args.flows:
+                cache.flows_dataset(table).compact()
+
+        if args.check:
+            print(json.dumps(cache.check_candles(args.symbol, args.interval), indent=2, ensure_ascii=False))
+            for table in args.flows:
+                print(json.dumps({table: cache.check_flows(table)}, indent=2, ensure_ascii=False))
+    finally:
+        close_database_manager()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Формат файлов модели: нативный booster XGBoost (UBJSON) и JSON-метаданные рядом с ним.
+
+Артефакт models/etf_model_v1.ubj состоит из файлов:
+- etf_model_v1.ubj - booster модели (XGBClassifier.save_model, UBJSON);
+- etf_model_v1.<h>d.ubj - booster остальных горизонтов многогоризонтной модели;
+- etf_model_v1.json - метаданные: версия формата, SHA-256 и размер каждого
+  booster, feature_columns, model_params, trained_at, параметры признаков,
+  отпечаток обучающих данных и прочие поля прежнего словаря модели.
+
+Метаданные читаются без загрузки модели (и без импорта xgboost/sklearn).
+Файл метаданных записывается последним, поэтому он ссылается только на
+полностью записанные booster. При загрузке контрольная сумма booster
+сверяется с метаданными.
+
+Прежний формат (словарь модели в joblib .pkl) по-прежнему читается, а
+`python model_artifact.py migrate models/etf_model_v1.pkl` переводит его
+в новый формат.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+import logging
+from typing import Any, Dict, Optional
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+LEGACY_SUFFIX = '.pkl'
+
+# Поля словаря модели с ключами-горизонтами (в JSON ключи становятся строками)
+HORIZON_KEYED = ('best_iterations', 'horizon_metrics')
+
+
+def is_legacy(path: str) -> bool:
+    """Модель в прежнем формате (joblib .pkl)."""
+    return path.endswith(LEGACY_SUFFIX)
+
+
+def sidecar_path(path: str) -> str:
+    """Путь к JSON-метаданным артефакта."""
+    return os.path.splitext(path)[0] + '.json'
+
+
+def data_fingerprint(X) -> Dict[str, Any]:
+    """
+    Отпечаток обучающей матрицы признаков.
+
+    Args:
+        X: DataFrame признаков
+
+    Returns:
+        Словарь с числом строк и колонок, границами индекса и SHA-256 значений
+    """
+    import pandas as pd
+
+    digest = hashlib.sha256(pd.util.hash_pandas_object(X, index=True).to_numpy().tobytes())
+    return {
+        'rows': len(X),
+        'columns': X.shape[1],
+        'start': str(X.index[0]) if len(X) else None,
+        'end': str(X.index[-1]) if len(X) else None,
+        'sha256': digest.hexdigest()
+    }
+
+
+def _json_default(value: Any) -> Any:
+    """Сериализация numpy-скаляров, меток времени и прочих типов в JSON."""
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def save_artifact(model_data: Dict[str, Any], path: str) -> Dict[str, Any]:
+    """
+    Сохранение словаря модели в формате booster + JSON-метаданные.
+
+    Args:
+        model_data: Словарь модели (как в BitcoinPredictor.save_model)
+        path: Путь к основному booster (.ubj)
+
+    Returns:
+        Записанные метаданные
+    """
+    import xgboost as xgb
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    stem = os.path.splitext(path)[0]
+
+    horizons = model_data.get('horizons')
+    if horizons:
+        models = {f'{horizon}d': model_data['models'][horizon] for horizon in horizons}
+        primary = f'{horizons[0]}d'
+    else:
+        models = {'model': model_data['model']}
+        primary = 'model'
+
+    boosters = {}
+    for name, model in models.items():
+        booster_path = path if name == primary else f'{stem}.{name}.ubj'
+        # XGBClassifier.save_model сохраняет booster вместе с параметрами sklearn-обертки
+        temp_path = f'{booster_path}.{os.getpid()}.tmp.ubj'
+        model.save_model(temp_path)
+        with open(temp_path, 'rb') as f:
+            raw = f.read()
+        os.replace(temp_path, booster_path)
+        boosters[name] = {
+            'file': os.path.basename(booster_path),
+            'sha256': hashlib.sha256(raw).hexdigest(),
+            'bytes': len(raw)
+        }
+
+    metadata = {
+        'format_version': FORMAT_VERSION,
+        'model_type': type(models[primary]).__name__,
+        'xgboost_version': xgb.__version__,
+        'primary': primary,
+        'boosters': boosters,
+        **{key: value for key, value in model_data.items() if key not in ('model', 'models')}
+    }
+    text = json.dumps(metadata, ensure_ascii=False, indent=2, default=_json_default)
+    # Метаданные записываются последними и атомарно: они ссылаются только на записанные booster
+    temp_path = f'{sidecar_path(path)}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text + '\n')
+    os.replace(temp_path, sidecar_path(path))
+    return json.loads(text)
+
+
+def save_model_data(model_data: Dict[str, Any], path: str) -> None:
+    """
+    Сохранение словаря модели: .pkl - прежний формат joblib, иначе - booster + JSON.
+
+    Args:
+        model_data: Словарь модели
+        path: Путь к модели
+    """
+    if is_legacy(path):
+        import joblib
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        joblib.dump(model_data, path)
+    else:
+        save_artifact(model_data, path)
+
+
+def read_metadata(path: str) -> Dict[str, Any]:
+    """
+    Метаданные модели без загрузки booster.
+
+    Args:
+        path: Путь к модели (.ubj или прежний .pkl)
+
+    Returns:
+        Словарь метаданных (для .pkl - словарь модели без объектов моделей)
+    """
+    if is_legacy(path):
+        import joblib
+        model_data = joblib.load(path)
+        return {key: value for key, value in model_data.items() if key not in ('model', 'models')}
+
+    with open(sidecar_path(path), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    if metadata.get('format_version', 0) > FORMAT_VERSION:
+        raise ValueError(f"Версия формата модели {metadata['format_version']} новее поддерживаемой {FORMAT_VERSION}")
+    for key in HORIZON_KEYED:
+        if metadata.get(key):
+            metadata[key] = {int(horizon): value for horizon, value in metadata[key].items()}
+    return metadata
+
+
+def load_artifact(path: str, verify: bool = True) -> Dict[str, Any]:
+    """
+    Загрузка модели в новом формате в виде словаря модели.
+
+    Args:
+        path: Путь к основному booster (.ubj)
+        verify: Сверять SHA-256 booster с метаданными
+
+    Returns:
+        Словарь модели с XGBClassifier в 'model' (и 'models' для нескольких горизонтов)
+    """
+    import xgboost as xgb
+
+    metadata = read_metadata(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    loaded = {}
+    for name, info in metadata['boosters'].items():
+        with open(os.path.join(directory, info['file']), 'rb') as f:
+            raw = f.read()
+        if verify and hashlib.sha256(raw).hexdigest() != info['sha256']:
+            raise ValueError(f"Контрольная сумма {info['file']} не совпадает с метаданными")
+        model = xgb.XGBClassifier()
+        model.load_model(bytearray(raw))
+        loaded[name] = model
+
+    model_data = {key: value for key, value in metadata.items() if key != 'boosters'}
+    model_data['model'] = loaded[metadata['primary']]
+    if metadata.get('horizons'):
+        model_data['models'] = {horizon: loaded[f'{horizon}d'] for horizon in metadata['horizons']}
+    return model_data
+
+
+def resolve_path(path: str) -> str:
+    """Файл, из которого будет загружена модель (артефакт или прежний .pkl)."""
+    if not is_legacy(path) and not os.path.exists(sidecar_path(path)):
+        legacy_path = os.path.splitext(path)[0] + LEGACY_SUFFIX
+        if os.path.exists(legacy_path):
+            return legacy_path
+    return path
+
+
+def load_model_data(path: str) -> Dict[str, Any]:
+    """
+    Загрузка словаря модели в любом формате.
+
+    Если артефакта нет, но рядом лежит прежний .pkl с тем же именем, загружается
+    он (с предупреждением о миграции).
+
+    Args:
+        path: Путь к модели (.ubj или .pkl)
+
+    Returns:
+        Словарь модели
+    """
+    resolved = resolve_path(path)
+    if resolved != path:
+        logger.warning(f"Модель {path} не найдена, загружается {resolved}; "
+                       f"переведите ее в новый формат: python model_artifact.py migrate {resolved}")
+        path = resolved
+    if is_legacy(path):
+        import joblib
+        return joblib.load(path)
+    return load_artifact(path)
+
+
+def fingerprint_path(path: str) -> str:
+    """Файл для отпечатка модели: метаданные артефакта (содержат SHA-256 booster) или .pkl."""
+    path = resolve_path(path)
+    return path if is_legacy(path) else sidecar_path(path)
+
+
+def migrate(legacy_path: str, output: Optional[str] = None) -> str:
+    """
+    Перевод модели из joblib .pkl в новый формат.
+
+    Args:
+        legacy_path: Путь к .pkl
+        output: Путь к новому артефакту (по умолчанию - то же имя с .ubj)
+
+    Returns:
+        Путь к записанному артефакту
+    """
+    import joblib
+
+    output = output or os.path.splitext(legacy_path)[0] + '.ubj'
+    model_data = joblib.load(legacy_path)
+    save_artifact(model_data, output)
+    # Проверка: артефакт читается и совпадает по признакам
+    loaded = load_artifact(output)
+    if loaded['feature_columns'] != list(model_data['feature_columns']):
+        raise ValueError("Признаки перенесенной модели не совпадают с исходной")
+    return output
+
+
+def main() -> int:
+    """Просмотр метаданных, проверка и миграция моделей."""
+    parser = argparse.ArgumentParser(description="Файлы модели: метаданные, проверка, миграция из .pkl")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    info_parser = subparsers.add_parser('info', help="Метаданные модели (без загрузки booster)")
+    info_parser.add_argument('path')
+    verify_parser = subparsers.add_parser('verify', help="Проверка контрольных сумм и загрузка модели")
+    verify_parser.add_argument('path')
+    migrate_parser = subparsers.add_parser('migrate', help="Перевод модели из .pkl в новый формат")
+    migrate_parser.add_argument('path')
+    migrate_parser.add_argument('--output', help="Путь к новому артефакту (по умолчанию - .ubj рядом)")
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(json.dumps(read_metadata(args.path), ensure_ascii=False, indent=2, default=_json_default))
+        return 0
+
+    print("=" * 50)
+    try:
+        if args.command == 'verify':
+            model_data = load_artifact(args.path)
+            print(f"✅ Модель {args.path} загружена, признаков: {len(model_data['feature_columns'])}")
+        else:
+            output = migrate(args.path, args.output)
+            print(f"✅ Модель перенесена: {args.path} -> {output} ({sidecar_path(output)})")
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        print("=" * 50)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Обучение моделей направления цены на несколько горизонтов (1, 3, 7 дней) одним артефактом.
+
+Матрица признаков строится один раз (BitcoinPredictor.build_features), цели
+всех горизонтов - одной векторной операцией по окнам цен закрытия. Модели
+горизонтов обучаются параллельно в пуле процессов (forkserver, данные
+передаются процессу один раз при инициализации) с теми же параметрами, что
+и BitcoinPredictor.train. Все модели сохраняются в один файл: 'model' -
+модель ближайшего горизонта (совместимо с одногоризонтным форматом),
+'models' - модели всех горизонтов. predict.BitcoinPredictor по одному расчету
+признаков возвращает прогнозы всех горизонтов.
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from dotenv import load_dotenv
+
+# Local imports
+from train import BitcoinPredictor
+from feature_store import FeatureStore
+from instrumentation import span
+from model_artifact import data_fingerprint, save_model_data
+from walk_forward import available_cores
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Загрузка переменных окружения
+load_dotenv()
+
+HORIZONS = (1, 3, 7)
+
+# Данные в процессе пула (задаются один раз в _init_worker)
+_X: Optional[pd.DataFrame] = None
+_targets: Optional[pd.DataFrame] = None
+
+
+def target_column(horizon: int) -> str:
+    """Название колонки цели горизонта."""
+    return f'target_{horizon}d'
+
+
+def horizons_from_env() -> List[int]:
+    """Горизонты из MODEL_HORIZONS (через запятую, по умолчанию 1,3,7)."""
+    value = os.getenv('MODEL_HORIZONS', ','.join(map(str, HORIZONS)))
+    return [int(horizon) for horizon in value.split(',') if horizon.strip()]
+
+
+def _init_worker(X: pd.DataFrame, targets: pd.DataFrame, threads: Optional[int] = None) -> None:
+    """Однократная передача признаков и целей процессу пула."""
+    global _X, _targets
+    _X, _targets = X, targets
+    if threads is not None:
+        os.environ['OMP_NUM_THREADS'] = str(threads)
+
+
+def _fit_horizon(horizon: int, settings: Dict[str, Any], threads: int) -> Dict[str, Any]:
+    """Обучение модели одного горизонта на строках с известной целью."""
+    started = time.perf_counter()
+    column = target_column(horizon)
+    known = _targets[column].notna()
+    X = _X[known]
+    y = _targets.loc[known, column].astype(int)
+
+    trainer = BitcoinPredictor()
+    trainer.model_params = dict(settings['model_params'])
+    trainer.early_stopping_rounds = settings['early_stopping_rounds']
+    trainer.validation_size = settings['validation_size']
+    trainer.time_budget = settings['time_budget']
+    trainer.n_jobs = threads
+    trainer.feature_columns = list(X.columns)
+    # Цели последних horizon строк перед тестом построены по ценам теста - embargo
+    metrics = trainer.train(X, y, settings['test_size'], gap=horizon)
+
+    return {
+        'horizon': horizon,
+        'model': trainer.model,
+        'best_iteration': trainer.best_iteration,
+        'metrics': {
+            'accuracy': float(metrics['accuracy']),
+            'auc': float(metrics['auc']),
+            'logloss': float(metrics['logloss']),
+            'rows': len(X),
+            'embargo_rows': horizon,
+            'n_trees': metrics['training']['n_trees'],
+            'best_iteration': trainer.best_iteration,
+        },
+        'seconds': time.perf_counter() - started,
+    }
+
+
+class MultiHorizonTrainer:
+    """Обучение моделей нескольких горизонтов на общей матрице признаков."""
+
+    def __init__(self, horizons: Sequence[int] = HORIZONS, feature_store: Optional[FeatureStore] = None):
+        """
+        Args:
+            horizons: Горизонты прогноза в строках (днях)
+            feature_store: Хранилище матриц признаков (опционально)
+        """
+        self.horizons = sorted(set(int(horizon) for horizon in horizons))
+        if not self.horizons or self.horizons[0] < 1:
+            raise ValueError(f"Горизонты должны быть положительными: {list(horizons)}")
+        # Признаки, параметры модели и режим обучения - как у одногоризонтной модели
+        self.base = BitcoinPredictor(feature_store=feature_store)
+        self.feature_columns = None
+        self.data_fingerprint = None
+        self.models: Dict[int, Any] = {}
+        self.best_iterations: Dict[int, Optional[int]] = {}
+        self.metrics: Dict[int, Dict[str, Any]] = {}
+
+    def create_targets(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Цели всех горизонтов: закрытие через h строк выше текущего.
+
+        Args:
+            df: DataFrame с колонкой close
+
+        Returns:
+            DataFrame с колонками target_{h}d (1.0 / 0.0, NaN - будущее закрытие неизвестно)
+        """
+        close = df['close'].to_numpy(dtype='float64')
+        # Окна close[i], ..., close[i + max_h]; в конце истории - NaN
+        padded = np.concatenate([close, np.full(self.horizons[-1], np.nan)])
+        future = sliding_window_view(padded, self.horizons[-1] + 1)[:, self.horizons]
+        targets = np.where(np.isnan(future), np.nan, future > close[:, None])
+        return pd.DataFrame(targets, index=df.index, columns=[target_column(h) for h in self.horizons])
+
+    def prepare_data(self, df: pd.DataFrame, symbol: Optional[str] = None) -> Tuple[pd.DataFrame, pd.DataFrame, list]:
+        """
+        Подготовка общей матрицы признаков и целей всех горизонтов.
+
+        Args:
+            df: Исходный DataFrame
+            symbol: Символ торговой пары (ключ хранилища признаков)
+
+        Returns:
+            Tuple с признаками, целями горизонтов и списком названий признаков
+        """
+        logger.info(f"Подготовка данных для горизонтов {self.horizons}...")
+
+        with span('prepare_data', rows=len(df)) as stage:
+            features_df, available_features = self.base.build_features(df, symbol)
+            X = features_df[available_features]
+            valid_idx = ~X.isnull().any(axis=1)
+            X = X[valid_idx]
+            targets = self.create_targets(features_df)[valid_idx]
+            stage.record(X)
+
+        known = targets.notna().sum().to_dict()
+        logger.info(f"Подготовлено {len(X)} образцов с {len(available_features)} признаками, "
+                    f"строк с известной целью: {known}")
+        return X, targets, available_features
+
+    def train(self, X: pd.DataFrame, targets: pd.DataFrame, test_size: float = 0.2,
+              workers: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Параллельное обучение моделей горизонтов.
+
+        Args:
+            X: Признаки
+            targets: Цели горизонтов (prepare_data)
+            test_size: Размер тестовой выборки каждого горизонта
+            workers: Число процессов (по умолчанию - число ядер; 1 - без пула)
+
+        Returns:
+            Словарь горизонт -> метрики на тестовой выборке
+        """
+        cores = available_cores()
+        workers = max(1, min(workers or cores, len(self.horizons)))
+        threads = max(1, cores // workers)
+        settings = {
+            'model_params': self.base.model_params,
+            'early_stopping_rounds': self.base.early_stopping_rounds,
+            'validation_size': self.base.validation_size,
+            'time_budget': self.base.time_budget,
+            'test_size': test_size,
+        }
+        logger.info(f"Обучение горизонтов {self.horizons}: {workers} процессов × {threads} потоков")
+
+        with span('train_horizons', rows=len(X)):
+            if workers == 1:
+                _init_worker(X, targets)
+                results = [_fit_horizon(horizon, settings, threads) for horizon in self.horizons]
+            else:
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(['multi_horizon'])
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                         initargs=(X, targets, threads)) as pool:
+                    futures = [pool.submit(_fit_horizon, horizon, settings, threads) for horizon in self.horizons]
+                    results = [future.result() for future in futures]
+
+        self.feature_columns = list(X.columns)
+        self.data_fingerprint = data_fingerprint(X)
+        for result in results:
+            horizon = result['horizon']
+            self.models[horizon] = result['model']
+            self.best_iterations[horizon] = result['best_iteration']
+            self.metrics[horizon] = result['metrics']
+            logger.info(f"Горизонт {horizon}d: accuracy {result['metrics']['accuracy']:.4f}, "
+                        f"AUC {result['metrics']['auc']:.4f} ({result['seconds']:.2f} с)")
+        return self.metrics
+
+    def save_model(self, model_path: str) -> None:
+        """
+        Сохранение моделей всех горизонтов одним файлом.
+
+        Args:
+            model_path: Путь для сохранения модели
+        """
+        if not self.models:
+            raise ValueError("Модели не обучены")
+
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+
+        primary = self.horizons[0]
+        engineer = self.base.feature_engineer
+        model_data = {
+            # Ближайший горизонт - в полях одногоризонтной модели
+            'model': self.models[primary],
+            'best_iteration': self.best_iterations[primary],
+            'horizons': self.horizons,
+            'models': self.models,
+            'best_iterations': self.best_iterations,
+            'horizon_metrics': self.metrics,
+            'feature_columns': self.feature_columns,
+            'model_params': self.base.model_params,
+            'min_history': engineer.min_history(self.feature_columns),
+            'tail_window': engineer.tail_window(columns=self.feature_columns),
+            'feature_config': engineer.config(),
+            'data_fingerprint': self.data_fingerprint,
+            'trained_at': datetime.now().isoformat()
+        }
+
+        with span('model_save') as stage:
+            save_model_data(model_data, model_path)
+            stage.record(nbytes=os.path.getsize(model_path))
+        logger.info(f"Модели горизонтов {self.horizons} сохранены в {model_path}")
+
+
+def main() -> int:
+    """Обучение многогоризонтной модели."""
+    parser = argparse.ArgumentParser(description="Обучение моделей направления цены на несколько горизонтов")
+    parser.add_argument('--horizons', type=int, nargs='+', default=horizons_from_env(),
+                        help="Горизонты в днях (MODEL_HORIZONS)")
+    parser.add_argument('--workers', type=int, default=None, help="Процессы пула (по умолчанию - число ядер)")
+    parser.add_argument('--output', default=os.getenv('MODEL_PATH', 'models/etf_model_v1.ubj'))
+    parser.add_argument('--synthetic', type=int, metavar='DAYS',
+                        help="Синтетические данные на DAYS дней вместо базы данных")
+    args = parser.parse_args()
+
+    symbol = os.getenv('BTC_SYMBOL', 'BTCUSDT')
+    if args.synthetic:
+        from train_demo import create_synthetic_data
+        data = create_synthetic_data(args.synthetic)
+    else:
+        from db import load_training_data
+        data = load_training_data(symbol=symbol, lookback_days=int(os.getenv('LOOKBACK_DAYS', '365')))
+    if data is None or len(data) < 100:
+        print("❌ Недостаточно данных для обучения")
+        return 1
+
+    trainer = MultiHorizonTrainer(args.horizons)
+    X, targets, _ = trainer.prepare_data(data, symbol=None if args.synthetic else symbol)
+    metrics = trainer.train(X, targets, workers=args.workers)
+    trainer.save_model(args.output)
+
+    print("=" * 50)
+    print("МНОГОГОРИЗОНТНАЯ МОДЕЛЬ")
+    print(f"{'горизонт':>9} {'строк':>6} {'accuracy':>9} {'auc':>7} {'logloss':>8} {'деревьев':>9}")
+    for horizon, info in metrics.items():
+        print(f"{horizon:>8}d {info['rows']:6} {info['accuracy']:9.4f} {info['auc']:7.4f} "
+              f"{info['logloss']:8.4f} {info['n_trees']:9}")
+    print(f"Модель: {args.output}")
+    print("=" * 50)
+    print("✅ Обучение завершено")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Загрузка панели данных по нескольким активам: свечи BTC/ETH/SOL и притоки ETF
+из btc_flows, eth_flow, sol_flow (включая колонки по эмитентам).
+
+Свечи всех символов читаются одним запросом с группировкой по символу,
+притоки - одним запросом на таблицу. Результат раскладывается в один
+трехмерный массив (актив × дата × поле) по общему индексу дат без
+последовательных merge: позиции строк находятся через Index.get_indexer и
+записываются в заранее выделенный массив.
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Local imports
+from candle_stream import OHLCV_AGG
+from db import (CANDLE_BUCKETS, FLOW_TABLES, flow_issuers_query,
+                intraday_enabled, panel_candles_query, get_database_manager)
+from dtype_policy import DtypePolicy, format_bytes
+from intraday import finalize_intraday
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Загрузка переменных окружения
+load_dotenv()
+
+# Таблица притоков, суммарный приток которой становится etf_flow актива
+ASSET_FLOW_TABLES = {
+    'BTCUSDT': 'btc_flows',
+    'ETHUSDT': 'eth_flow',
+    'SOLUSDT': 'sol_flow',
+}
+
+DEFAULT_SYMBOLS = tuple(ASSET_FLOW_TABLES)
+
+
+class PanelData:
+    """Панель данных: массив (актив × дата × поле) с метаданными колонок."""
+
+    def __init__(self, values: np.ndarray, assets: List[str], dates: pd.DatetimeIndex,
+                 fields: List[Dict[str, str]]):
+        """
+        Args:
+            values: Массив формы (len(assets), len(dates), len(fields))
+            assets: Символы активов
+            dates: Общий индекс дат
+            fields: Описание полей: name, source (candles или таблица притоков), column
+        """
+        self.values = values
+        self.assets = list(assets)
+        self.dates = dates
+        self.fields = fields
+        self.field_names = [field['name'] for field in fields]
+
+    @property
+    def nbytes(self) -> int:
+        """Размер массива значений в байтах."""
+        return int(self.values.nbytes)
+
+    def field_index(self, name: str) -> int:
+        """Позиция поля по имени."""
+        return self.field_names.index(name)
+
+    def asset_frame(self, asset: str) -> pd.DataFrame:
+        """
+        Данные одного актива в формате load_combined_data.
+
+        Строки без свечей отбрасываются, etf_flow - суммарный приток таблицы
+        актива (ASSET_FLOW_TABLES), остальные притоки остаются колонками
+        вида btc_flows.blackrock.
+
+        Args:
+            asset: Символ актива
+
+        Returns:
+            DataFrame с OHLCV, etf_flow и колонками притоков
+        """
+        df = pd.DataFrame(self.values[self.assets.index(asset)], index=self.dates, columns=self.field_names)
+        df = df.dropna(subset=list(OHLCV_AGG), how='all')
+        table = ASSET_FLOW_TABLES.get(asset)
+        if table is not None and f'{table}.total' in df.columns:
+            df['etf_flow'] = df[f'{table}.total']
+        return df
+
+    def metadata(self) -> Dict[str, Any]:
+        """Описание панели: активы, поля, диапазон дат и размер."""
+        return {
+            'shape': list(self.values.shape),
+            'dtype': str(self.values.dtype),
+            'nbytes': self.nbytes,
+            'assets': self.assets,
+            'fields': self.fields,
+            'dates': {
+                'start': self.dates[0].isoformat() if len(self.dates) else None,
+                'end': self.dates[-1].isoformat() if len(self.dates) else None,
+                'count': len(self.dates)
+            }
+        }
+
+
+def _naive_dates(values) -> pd.DatetimeIndex:
+    """Метки времени без часового пояса (в UTC), как у индекса свечей."""
+    dates = pd.DatetimeIndex(pd.to_datetime(values))
+    if dates.tz is not None:
+        dates = dates.tz_convert('UTC').tz_localize(None)
+    return dates
+
+
+def build_panel(candles: pd.DataFrame, flows: Dict[str, pd.DataFrame],
+                symbols: Iterable[str], dtype: str = 'float32') -> PanelData:
+    """
+    Сборка панели из свечей в длинном формате и таблиц притоков.
+
+    Args:
+        candles: Свечи всех символов: колонки symbol, timestamp и поля свечи
+        flows: Притоки по таблицам с колонкой date и колонками эмитентов
+        symbols: Порядок активов в панели
+        dtype: Тип массива значений
+
+    Returns:
+        PanelData
+    """
+    symbols = list(symbols)
+    candle_fields = [column for column in candles.columns if column not in ('symbol', 'timestamp')]
+    fields = [{'name': column, 'source': 'candles', 'column': column} for column in candle_fields]
+    for table, df in flows.items():
+        fields += [
+            {'name': f'{table}.{column}', 'source': table, 'column': column}
+            for column in df.columns if column != 'date'
+        ]
+
+    candle_dates = _naive_dates(candles['timestamp'])
+    dates = pd.DatetimeIndex(np.unique(candle_dates.values), name='timestamp')
+    values = np.full((len(symbols), len(dates), len(fields)), np.nan, dtype=dtype)
+
+    # Свечи: одна векторная запись по позициям (актив, дата)
+    asset_position = pd.Categorical(candles['symbol'], categories=symbols).codes
+    date_position = dates.get_indexer(candle_dates)
+    known = asset_position >= 0
+    values[asset_position[known], date_position[known], :len(candle_fields)] = (
+        candles.loc[known, candle_fields].to_numpy(dtype='float64')
+    )
+
+    # Притоки общие для всех активов; дни без записи - нулевой приток (как в load_combined_data)
+    offset = len(candle_fields)
+    for table, df in flows.items():
+        columns = [column for column in df.columns if column != 'date']
+        block = np.zeros((len(dates), len(columns)))
+        rows = dates.get_indexer(_naive_dates(df['date']))
+        matched = rows >= 0
+        block[rows[matched]] = np.nan_to_num(df.loc[matched, columns].to_numpy(dtype='float64'))
+        values[:, :, offset:offset + len(columns)] = block
+        offset += len(columns)
+
+    return PanelData(values, symbols, dates, fields)
+
+
+def load_panel(symbols: Iterable[str] = DEFAULT_SYMBOLS, flow_tables: Iterable[str] = FLOW_TABLES,
+               lookback_days: int = 365, bucket: Optional[str] = None) -> Optional[PanelData]:
+    """
+    Загрузка панели из базы данных: один запрос свечей и по одному на таблицу притоков.
+
+    Args:
+        symbols: Символы торговых пар
+        flow_tables: Таблицы притоков ETF
+        lookback_days: Количество дней для загрузки данных
+        bucket: Размер свечи (по умолчанию CANDLE_BUCKET)
+
+    Returns:
+        PanelData или None, если свечей нет
+    """
+    symbols = list(symbols)
+    bucket = bucket or os.getenv('CANDLE_BUCKET', '1d')
+    if bucket not in CANDLE_BUCKETS:
+        raise ValueError(f"Неизвестный размер свечи: {bucket}")
+
+    manager = get_database_manager()
+    if not manager.is_connected():
+        logger.error("Нет подключения к базе данных")
+        return None
+
+    intraday = intraday_enabled()
+    params = {'lookback_days': int(lookback_days)}
+    with manager.engine.connect() as conn:
+        candles = pd.read_sql(
+            panel_candles_query(bucket, intraday), conn,
+            params={**params, 'symbols': symbols}
+        )
+        flows = {
+            table: pd.read_sql(flow_issuers_query(table), conn, params=params)
+            for table in flow_tables
+        }
+
+    if candles.empty:
+        logger.warning(f"Нет свечей для символов {symbols}")
+        return None
+
+    if intraday:
+        # Слагаемые внутридневных статистик превращаются в признаки по каждой строке
+        fields = [column for column in candles.columns if column not in ('symbol', 'timestamp')]
+        finalized = finalize_intraday(candles[fields].astype(float))
+        candles = pd.concat([candles[['symbol', 'timestamp']], finalized], axis=1)
+
+    panel = build_panel(candles, flows, symbols, dtype=DtypePolicy.from_env().float_dtype)
+    logger.info(
+        f"Панель {len(panel.assets)} × {len(panel.dates)} × {len(panel.fields)} "
+        f"({format_bytes(panel.nbytes)})"
+    )
+    return panel
+
+
+def main() -> int:
+    """Загрузка панели и вывод ее описания."""
+    parser = argparse.ArgumentParser(description="Загрузка панели по нескольким активам")
+    parser.add_argument('--symbols', nargs='+', default=list(DEFAULT_SYMBOLS))
+    parser.add_argument('--flows', nargs='+', default=list(FLOW_TABLES), choices=FLOW_TABLES)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--bucket', default=None, choices=sorted(CANDLE_BUCKETS))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    panel = load_panel(args.symbols, args.flows, args.days, args.bucket)
+    if panel is None:
+        print("❌ Не удалось загрузить панель")
+        return 1
+
+    metadata = panel.metadata()
+    print("ПАНЕЛЬ ДАННЫХ")
+    print("=" * 50)
+    print(f"Форма (актив × дата × поле): {tuple(metadata['shape'])}, {metadata['dtype']}")
+    print(f"Размер: {format_bytes(panel.nbytes)}")
+    print(f"Даты: {metadata['dates']['start']} - {metadata['dates']['end']}")
+    for asset in panel.assets:
+        frame = panel.asset_frame(asset)
+        print(f"{asset:10} {len(frame):6} строк со свечами")
+    print(f"Загрузка: {time.perf_counter() - started:.3f} с")
+    print("=" * 50)
+    print("✅ Панель загружена")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,18 +3,21 @@
 """
 
 import os
+import sys
 import json
+import argparse
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
-from typing import Dict, Any, Optional
-import joblib
+from typing import Dict, Any, List, Optional, TextIO, Tuple
 from dotenv import load_dotenv
 
-# Local imports
-from db import load_training_data, get_database_manager
-from train import FeatureEngineer
+# Local imports (модуль db импортируется при первом обращении к базе данных)
+from features import FeatureEngineer
+from feature_store import FeatureStore, feature_store_from_env
+from prediction_cache import PredictionCache, file_fingerprint
+from model_artifact import fingerprint_path, load_model_data, resolve_path
+from instrumentation import span, with_timings, write_textfile
 
 # Настройка логирования
 logging.basicConfig(
@@ -30,136 +33,266 @@ load_dotenv()
 class BitcoinPredictor:
     """Класс для загрузки и использования обученной модели предсказания Биткоина."""
     
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, cache: Optional[PredictionCache] = None,
+                 feature_store: Optional[FeatureStore] = None):
         """
         Инициализация предсказателя с загрузкой модели.
         
         Args:
             model_path: Путь к файлу с обученной моделью
+            cache: Кэш результатов предсказания по состоянию данных (опционально)
+            feature_store: Хранилище матриц признаков, общее с обучением (опционально)
         """
         self.model_path = model_path
         self.model = None
         self.feature_columns = None
         self.model_params = None
         self.trained_at = None
+        self.iteration_range = None
+        # Модели всех горизонтов многогоризонтного артефакта (multi_horizon.py)
+        self.horizon_models = None
+        self.horizon_ranges = None
+        self.min_history = None
+        self.model_fingerprint = None
         self.feature_engineer = FeatureEngineer()
+        self.cache = cache
+        self.feature_store = feature_store
         
         self._load_model()
     
     def _load_model(self) -> None:
         """Загрузка обученной модели из файла."""
         try:
-            if not os.path.exists(self.model_path):
+            source_path = resolve_path(self.model_path)
+            if not os.path.exists(source_path):
                 raise FileNotFoundError(f"Файл модели не найден: {self.model_path}")
             
-            model_data = joblib.load(self.model_path)
+            with span('model_load', nbytes=os.path.getsize(source_path)):
+                model_data = load_model_data(self.model_path)
             
             self.model = model_data['model']
             self.feature_columns = model_data['feature_columns']
             self.model_params = model_data.get('model_params', {})
             self.trained_at = model_data.get('trained_at', 'Unknown')
+            # При ранней остановке используются только деревья до лучшей итерации
+            best_iteration = model_data.get('best_iteration')
+            self.iteration_range = (0, best_iteration + 1) if best_iteration is not None else None
+            horizons = model_data.get('horizons')
+            if horizons:
+                self.horizon_models = {horizon: model_data['models'][horizon] for horizon in horizons}
+                self.horizon_ranges = {
+                    horizon: (0, best + 1) if best is not None else None
+                    for horizon, best in model_data['best_iterations'].items()
+                }
+            # Модели, сохраненные до появления реестра признаков, не содержат min_history
+            self.min_history = model_data.get('min_history') or self.feature_engineer.min_history(self.feature_columns)
+            # Метаданные артефакта содержат SHA-256 всех booster
+            self.model_fingerprint = file_fingerprint(fingerprint_path(self.model_path))
             
             logger.info(f"Модель успешно загружена из {self.model_path}")
             logger.info(f"Модель обучена: {self.trained_at}")
             logger.info(f"Количество признаков: {len(self.feature_columns)}")
+            logger.info(f"Минимальная история: {self.min_history} строк")
             
         except Exception as e:
             logger.error(f"Ошибка загрузки модели: {e}")
             raise
     
-    def prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def prepare_features(self, df: pd.DataFrame, symbol: Optional[str] = None,
+                         use_store: bool = True) -> pd.DataFrame:
         """
         Подготовка признаков для предсказания.
         
         Args:
             df: DataFrame с данными OHLCV и ETF потоками
+            symbol: Символ торговой пары (ключ хранилища признаков)
+            use_store: Читать признаки из хранилища, если оно подключено
             
         Returns:
             DataFrame с подготовленными признаками
         """
-        # Создание признаков
-        features_df = self.feature_engineer.create_features(df)
-        
-        # Выбор только нужных признаков
-        available_features = [col for col in self.feature_columns if col in features_df.columns]
-        missing_features = [col for col in self.feature_columns if col not in features_df.columns]
-        
-        if missing_features:
-            logger.warning(f"Отсутствующие признаки: {missing_features}")
-            # Заполнение отсутствующих признаков нулями
-            for feature in missing_features:
-                features_df[feature] = 0
-        
-        # Создание финального датасета
-        X = features_df[self.feature_columns].copy()
-        
-        # Удаление строк с NaN
-        X = X.dropna()
-        
-        return X
+        with span('prepare_features') as stage:
+            # Создание признаков (через хранилище, если оно подключено)
+            if use_store and self.feature_store is not None:
+                features_df = self.feature_store.get_features(df, self.feature_engineer, symbol)
+            else:
+                # Считается только подграф зависимостей признаков модели
+                features_df = self.feature_engineer.create_features(df, columns=self.feature_columns)
+            
+            # Выбор только нужных признаков
+            available_features = [col for col in self.feature_columns if col in features_df.columns]
+            missing_features = [col for col in self.feature_columns if col not in features_df.columns]
+            
+            if missing_features:
+                logger.warning(f"Отсутствующие признаки: {missing_features}")
+                # Заполнение отсутствующих признаков нулями
+                for feature in missing_features:
+                    features_df[feature] = 0
+            
+            # Создание финального датасета
+            X = features_df[self.feature_columns]
+            
+            # Удаление строк с NaN
+            X = X.dropna()
+            
+            return stage.record(X)
     
-    def predict(self, data: pd.DataFrame) -> Dict[str, Any]:
+    @with_timings
+    def predict(self, data: pd.DataFrame, latest_only: bool = False,
+                symbol: Optional[str] = None) -> Dict[str, Any]:
         """
         Выполнение предсказания на основе данных.
         
         Args:
             data: DataFrame с данными для предсказания
+            latest_only: Считать признаки только по хвосту истории (см. predict_latest)
+            symbol: Символ торговой пары (ключ хранилища признаков; без него хранилище
+                не используется)
             
         Returns:
-            Словарь с результатами предсказания
+            Словарь с результатами предсказания (с блоком 'timings' по этапам)
         """
+        if latest_only:
+            return self.predict_latest(data)
+        
         if self.model is None:
             raise ValueError("Модель не загружена")
         
-        # Подготовка признаков
-        X = self.prepare_features(data)
+        # Подготовка признаков: хранилище - только для данных из базы (с символом);
+        # разовые данные запросов (JSON, POST /predict) в хранилище не записываются
+        X = self.prepare_features(data, symbol=symbol, use_store=symbol is not None)
         
         if len(X) == 0:
             raise ValueError("Нет данных для предсказания после обработки")
         
         # Предсказание
-        probabilities = self.model.predict_proba(X)
-        predictions = self.model.predict(X)
+        with span('predict_proba', rows=len(X)):
+            probabilities = self.model.predict_proba(X, iteration_range=self.iteration_range)
+            predictions = self.model.predict(X, iteration_range=self.iteration_range)
         
         # Результаты для последней строки (самые свежие данные)
         last_probability = probabilities[-1, 1]  # Вероятность роста
         last_prediction = predictions[-1]
         
+        return self._build_result(last_probability, int(last_prediction), len(X),
+                                  self._predict_horizons(X.iloc[-1:]))
+    
+    @with_timings
+    def predict_latest(self, data: pd.DataFrame, macd_warmup: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Быстрое предсказание только для самой свежей строки.
+        
+        Признаки считаются по хвосту истории длиной FeatureEngineer.tail_window()
+        для признаков модели (самое длинное окно или прогрев EMA для MACD), а модель
+        вызывается один раз для одной строки.
+        
+        Args:
+            data: DataFrame с данными для предсказания
+            macd_warmup: Число строк прогрева EMA в MACD (по умолчанию MACD_WARMUP_BARS)
+            
+        Returns:
+            Словарь с результатами предсказания
+        """
+        if self.model is None:
+            raise ValueError("Модель не загружена")
+        
+        tail = data.iloc[-self.feature_engineer.tail_window(macd_warmup, columns=self.feature_columns):]
+        # Хвост каждый раз начинается с новой строки - в хранилище его не сохраняем
+        X = self.prepare_features(tail, use_store=False)
+        
+        if len(X) == 0:
+            # В хвосте нет ни одной полной строки - считаем по всей истории
+            logger.warning("Недостаточно данных в хвосте истории, используется полный расчет")
+            return self.predict(data)
+        
+        with span('predict_proba', rows=1):
+            probability = self.model.predict_proba(X.iloc[-1:], iteration_range=self.iteration_range)[0, 1]
+        prediction = int(probability > 0.5)
+        
+        return self._build_result(probability, prediction, len(tail), self._predict_horizons(X.iloc[-1:]))
+    
+    def _predict_horizons(self, X_last: pd.DataFrame) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Прогнозы всех горизонтов по одной строке признаков (None для одногоризонтной модели)."""
+        if not self.horizon_models:
+            return None
+        horizons = {}
+        with span('predict_horizons', rows=len(self.horizon_models)):
+            for horizon, model in self.horizon_models.items():
+                probability = float(model.predict_proba(X_last, iteration_range=self.horizon_ranges[horizon])[0, 1])
+                horizons[f'{horizon}d'] = {
+                    'prediction': int(probability > 0.5),
+                    'probability_up': probability,
+                    'confidence': max(probability, 1 - probability)
+                }
+        return horizons
+    
+    def _build_result(self, probability: float, prediction: int, data_points_used: int,
+                      horizons: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Формирование словаря с результатами предсказания."""
         # Дополнительная информация
-        confidence = max(last_probability, 1 - last_probability)
+        confidence = max(probability, 1 - probability)
         
         # Важность признаков (если доступна)
         feature_importance = None
         if hasattr(self.model, 'feature_importances_'):
-            feature_importance = dict(zip(
-                self.feature_columns,
-                self.model.feature_importances_
-            ))
+            feature_importance = {
+                feature: float(importance)
+                for feature, importance in zip(self.feature_columns, self.model.feature_importances_)
+            }
         
         result = {
-            'prediction': int(last_prediction),
-            'probability_up': float(last_probability),
-            'probability_down': float(1 - last_probability),
+            'prediction': prediction,
+            'probability_up': float(probability),
+            'probability_down': float(1 - probability),
             'confidence': float(confidence),
-            'prediction_text': 'Рост' if last_prediction == 1 else 'Падение',
+            'prediction_text': 'Рост' if prediction == 1 else 'Падение',
             'timestamp': datetime.now().isoformat(),
-            'data_points_used': len(X),
+            'data_points_used': data_points_used,
             'feature_importance': feature_importance
         }
+        # Прогнозы всех горизонтов многогоризонтной модели
+        if horizons:
+            result['horizons'] = horizons
         
         return result
     
-    def predict_from_database(self, symbol: str = 'BTCUSDT', lookback_days: int = 60) -> Dict[str, Any]:
+    @with_timings
+    def predict_from_database(self, symbol: str = 'BTCUSDT', lookback_days: Optional[int] = 60,
+                              latest_only: bool = False) -> Dict[str, Any]:
         """
         Загрузка данных из базы данных и выполнение предсказания.
         
         Args:
             symbol: Символ торговой пары
-            lookback_days: Количество дней для загрузки данных
+            lookback_days: Количество дней для загрузки данных (None - все доступные дни
+                данных ETF, определяются только при промахе кэша)
+            latest_only: Считать признаки только по хвосту истории (см. predict_latest)
             
         Returns:
             Словарь с результатами предсказания
         """
+        from db import load_training_data, get_database_manager
+        
+        # Проверка кэша: один дешевый запрос водяного знака вместо загрузки истории
+        cache_key = None
+        if self.cache is not None:
+            watermark = get_database_manager().get_data_watermark(symbol)
+            if watermark is not None:
+                cache_key = PredictionCache.make_key(
+                    watermark=watermark,
+                    model=self.model_fingerprint,
+                    features=self.feature_engineer.config(),
+                    request={'symbol': symbol, 'lookback_days': lookback_days, 'latest_only': latest_only}
+                )
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info("Результат предсказания взят из кэша")
+                    cached['cached'] = True
+                    return cached
+        
+        if lookback_days is None:
+            lookback_days = get_available_days()
+        
         logger.info(f"Загрузка данных для предсказания: {symbol}, {lookback_days} дней")
         
         # Загрузка данных
@@ -171,7 +304,7 @@ class BitcoinPredictor:
         logger.info(f"Загружено {len(data)} записей")
         
         # Выполнение предсказания
-        result = self.predict(data)
+        result = self.predict(data, latest_only=latest_only, symbol=symbol)
         
         # Добавление информации о данных
         result['data_info'] = {
@@ -182,29 +315,37 @@ class BitcoinPredictor:
             'price_change_1d': float(data['close'].pct_change().iloc[-1])
         }
         
+        if cache_key is not None:
+            self.cache.put(cache_key, result)
+        result['cached'] = False
+        
         return result
     
-    def predict_from_json(self, json_data: Dict[str, Any]) -> Dict[str, Any]:
+    @with_timings
+    def predict_from_json(self, json_data: Dict[str, Any], latest_only: bool = False) -> Dict[str, Any]:
         """
         Выполнение предсказания на основе JSON данных.
         
         Args:
             json_data: Словарь с данными в формате JSON
+            latest_only: Считать признаки только по хвосту истории (см. predict_latest)
             
         Returns:
             Словарь с результатами предсказания
         """
         try:
-            # Конвертация JSON в DataFrame
-            df = pd.DataFrame(json_data)
-            
-            # Установка индекса если есть поле timestamp
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                df.set_index('timestamp', inplace=True)
+            with span('parse_json') as stage:
+                # Конвертация JSON в DataFrame
+                df = pd.DataFrame(json_data)
+                
+                # Установка индекса если есть поле timestamp
+                if 'timestamp' in df.columns:
+                    df['timestamp'] = pd.to_datetime(df['timestamp'])
+                    df.set_index('timestamp', inplace=True)
+                stage.record(df)
             
             # Выполнение предсказания
-            result = self.predict(df)
+            result = self.predict(df, latest_only=latest_only)
             
             return result
             
@@ -213,20 +354,29 @@ class BitcoinPredictor:
             raise
 
 
-def load_model(model_path: Optional[str] = None) -> BitcoinPredictor:
+def load_model(model_path: Optional[str] = None, use_cache: Optional[bool] = None) -> BitcoinPredictor:
     """
     Удобная функция для загрузки модели.
     
     Args:
         model_path: Путь к модели (если None, берется из переменных окружения)
+        use_cache: Кэшировать прогнозы по состоянию данных
+            (если None, берется из PREDICTION_CACHE, по умолчанию включено)
         
     Returns:
         Экземпляр BitcoinPredictor
     """
     if model_path is None:
-        model_path = os.getenv('MODEL_PATH', 'models/etf_model_v1.pkl')
+        model_path = os.getenv('MODEL_PATH', 'models/etf_model_v1.ubj')
     
-    return BitcoinPredictor(model_path)
+    if use_cache is None:
+        use_cache = os.getenv('PREDICTION_CACHE', 'true').lower() in ('1', 'true', 'yes')
+    
+    return BitcoinPredictor(
+        model_path,
+        cache=PredictionCache() if use_cache else None,
+        feature_store=feature_store_from_env()
+    )
 
 
 def get_available_days() -> int:
@@ -238,7 +388,6 @@ def get_available_days() -> int:
     """
     try:
         from db import get_database_manager
-        import pandas as pd
         
         db_manager = get_database_manager()
         if not db_manager.is_connected():
@@ -259,7 +408,6 @@ def get_available_days() -> int:
         
         # Рассчитываем количество дней
         days_diff = (last_date - first_date).days
-        db_manager.close_connection()
         
         return max(days_diff, 30)  # Минимум 30 дней
         
@@ -268,89 +416,237 @@ def get_available_days() -> int:
         return 60  # Fallback к 60 дням
 
 
-def predict_from_database(model_path: Optional[str] = None) -> Dict[str, Any]:
+@with_timings
+def predict_from_database(model_path: Optional[str] = None, latest_only: bool = False,
+                          use_cache: Optional[bool] = None) -> Dict[str, Any]:
     """
     Удобная функция для предсказания с использованием данных из базы данных.
     
     Args:
         model_path: Путь к модели
+        latest_only: Загружать и обрабатывать только хвост истории,
+            нужный для признаков последней строки
+        use_cache: Кэшировать прогнозы по состоянию данных (см. load_model)
         
     Returns:
-        Результаты предсказания
+        Результаты предсказания (блок 'timings' включает загрузку модели)
     """
-    predictor = load_model(model_path)
+    predictor = load_model(model_path, use_cache=use_cache)
     
-    # Используем все доступные дни данных ETF
-    available_days = get_available_days()
-    logger.info(f"Используем {available_days} дней данных ETF")
+    if latest_only:
+        # Хвост истории плюс запас на незавершенный текущий день
+        lookback_days = predictor.feature_engineer.tail_window(columns=predictor.feature_columns) + 2
+        logger.info(f"Используем последние {lookback_days} дней данных")
+        return predictor.predict_from_database(lookback_days=lookback_days, latest_only=True)
     
-    return predictor.predict_from_database(lookback_days=available_days)
+    # Все доступные дни данных ETF: определяются только при промахе кэша
+    return predictor.predict_from_database(lookback_days=None)
+
 
+def json_default(value: Any) -> Any:
+    """Сериализация numpy-скаляров и прочих нестандартных типов в JSON."""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
 
-def main():
+
+def predict_ndjson(predictor: BitcoinPredictor, input_stream: TextIO, output_stream: TextIO,
+                   include_importance: bool = False, latest_only: bool = False) -> Tuple[int, int]:
+    """
+    Пакетное предсказание для потока NDJSON.
+
+    Каждая строка входа - JSON-объект в формате predict_from_json (словарь списков),
+    опционально с полем "id". На каждую строку (включая пустые) выводится одна строка
+    JSON с результатом или ошибкой, поэтому выход построчно соответствует входу, а импорт
+    библиотек и загрузка модели выполняются один раз на пакет.
+
+    Args:
+        predictor: Загруженная модель
+        input_stream: Поток с NDJSON данными
+        output_stream: Поток для записи результатов
+        include_importance: Включать ли важность признаков в каждый результат
+        latest_only: Считать признаки только по хвосту истории (см. predict_latest)
+
+    Returns:
+        Tuple с количеством успешных и неудачных предсказаний
+    """
+    succeeded, failed = 0, 0
+
+    for line_number, line in enumerate(input_stream, 1):
+        line = line.strip()
+
+        record: Dict[str, Any] = {'line': line_number}
+        try:
+            if not line:
+                raise ValueError("Пустая строка")
+            payload = json.loads(line)
+            if not isinstance(payload, dict):
+                raise ValueError("Ожидается JSON-объект со списками значений")
+
+            if 'id' in payload and not isinstance(payload['id'], list):
+                record['id'] = payload.pop('id')
+
+            result = predictor.predict_from_json(payload, latest_only=latest_only)
+            if not include_importance:
+                result.pop('feature_importance', None)
+
+            record['success'] = True
+            record['result'] = result
+            succeeded += 1
+
+        except Exception as e:
+            record['success'] = False
+            record['error'] = str(e)
+            failed += 1
+
+        output_stream.write(json.dumps(record, ensure_ascii=False, default=json_default) + '\n')
+        output_stream.flush()
+
+    logger.info(f"Пакетное предсказание завершено: успешно {succeeded}, с ошибками {failed}")
+    return succeeded, failed
+
+
+def print_prediction(result: Dict[str, Any]) -> None:
+    """Вывод результатов предсказания в читаемом виде."""
+    data_info = result.get('data_info')
+
+    print("\n" + "="*50)
+    print("ПРОГНОЗ ЦЕНЫ БИТКОИНА")
+    print("="*50)
+    if data_info:
+        print(f"Символ: {data_info['symbol']}")
+        print(f"Последняя цена: ${data_info['last_price']:,.2f}")
+        print(f"Дата: {data_info['last_date']}")
+        print(f"Изменение за день: {data_info['price_change_1d']:.2%}")
+        print()
+    print(f"ПРОГНОЗ:")
+    print(f"Направление: {result['prediction_text']}")
+    print(f"Вероятность роста: {result['probability_up']:.2%}")
+    print(f"Вероятность падения: {result['probability_down']:.2%}")
+    print(f"Уверенность: {result['confidence']:.2%}")
+    if result.get('horizons'):
+        print("\nПО ГОРИЗОНТАМ:")
+        for horizon, info in result['horizons'].items():
+            print(f"{horizon:>4}: {'Рост' if info['prediction'] == 1 else 'Падение':8} "
+                  f"вероятность роста {info['probability_up']:.2%}")
+    print()
+    print(f"Время предсказания: {result['timestamp']}")
+    print(f"Использовано точек данных: {result['data_points_used']}")
+    
+    timings = result.get('timings')
+    if timings:
+        print(f"\nВРЕМЯ ПО ЭТАПАМ (всего {timings['total_seconds']:.3f} с):")
+        for stage, info in timings['stages'].items():
+            print(f"{stage:20} {info['seconds']:.3f} с")
+    
+    # Топ-5 важных признаков
+    if result['feature_importance']:
+        print("\nТОП-5 ВАЖНЫХ ПРИЗНАКОВ:")
+        sorted_features = sorted(
+            result['feature_importance'].items(),
+            key=lambda x: x[1],
+            reverse=True
+        )[:5]
+        
+        for i, (feature, importance) in enumerate(sorted_features, 1):
+            print(f"{i}. {feature}: {importance:.4f}")
+    
+    print("="*50)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description="Прогноз роста цены Биткоина")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--json', metavar='FILE',
+                      help="Предсказание по данным из JSON-файла (словарь списков)")
+    mode.add_argument('--ndjson', metavar='FILE', nargs='?', const='-',
+                      help="Пакетный режим: NDJSON из файла или stdin ('-'), "
+                           "одна строка JSON с результатом на каждую входную строку")
+    parser.add_argument('--output', metavar='FILE',
+                        help="Файл для результатов пакетного режима (по умолчанию stdout)")
+    parser.add_argument('--with-importance', action='store_true',
+                        help="Включать важность признаков в результаты пакетного режима")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Не использовать кэш прогнозов по состоянию данных")
+    parser.add_argument('--latest-only', action='store_true',
+                        help="Считать признаки только по хвосту истории для последней строки")
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'models/etf_model_v1.ubj'),
+                        help="Путь к модели")
+    return parser.parse_args(argv)
+
+
+def run_ndjson(args: argparse.Namespace) -> int:
+    """Запуск пакетного режима NDJSON. Возвращает код завершения."""
+    predictor = load_model(args.model)
+
+    input_stream = sys.stdin if args.ndjson == '-' else open(args.ndjson, 'r', encoding='utf-8')
+    output_stream = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+
+    try:
+        _, failed = predict_ndjson(
+            predictor, input_stream, output_stream,
+            include_importance=args.with_importance,
+            latest_only=args.latest_only
+        )
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+        write_textfile()
+
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None):
     """Основная функция для выполнения предсказания."""
+    args = parse_args(argv)
+
+    # Машинный режим: вывод только NDJSON, без интерактивного текста
+    if args.ndjson:
+        return run_ndjson(args)
+
     logger.info("Запуск предсказания цены Биткоина")
     
-    # Параметры из переменных окружения
-    model_path = os.getenv('MODEL_PATH', 'models/etf_model_v1.pkl')
-    symbol = os.getenv('BTC_SYMBOL', 'BTCUSDT')
-    
-    # Используем все доступные дни данных ETF
-    lookback_days = get_available_days()
-    logger.info(f"Используем {lookback_days} дней данных ETF")
+    # Путь к модели (аргумент командной строки или MODEL_PATH)
+    model_path = args.model
     
     try:
-        # Загрузка модели и выполнение предсказания
-        result = predict_from_database(model_path)
+        if args.json:
+            # Предсказание по данным из файла
+            with open(args.json, 'r', encoding='utf-8') as f:
+                json_data = json.load(f)
+            result = load_model(model_path).predict_from_json(json_data, latest_only=args.latest_only)
+        else:
+            result = predict_from_database(
+                model_path,
+                latest_only=args.latest_only,
+                use_cache=False if args.no_cache else None
+            )
         
         # Вывод результатов
-        print("\n" + "="*50)
-        print("ПРОГНОЗ ЦЕНЫ БИТКОИНА")
-        print("="*50)
-        print(f"Символ: {result['data_info']['symbol']}")
-        print(f"Последняя цена: ${result['data_info']['last_price']:,.2f}")
-        print(f"Дата: {result['data_info']['last_date']}")
-        print(f"Изменение за день: {result['data_info']['price_change_1d']:.2%}")
-        print()
-        print(f"ПРОГНОЗ:")
-        print(f"Направление: {result['prediction_text']}")
-        print(f"Вероятность роста: {result['probability_up']:.2%}")
-        print(f"Вероятность падения: {result['probability_down']:.2%}")
-        print(f"Уверенность: {result['confidence']:.2%}")
-        print()
-        print(f"Время предсказания: {result['timestamp']}")
-        print(f"Использовано точек данных: {result['data_points_used']}")
-        
-        # Топ-5 важных признаков
-        if result['feature_importance']:
-            print("\nТОП-5 ВАЖНЫХ ПРИЗНАКОВ:")
-            sorted_features = sorted(
-                result['feature_importance'].items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:5]
-            
-            for i, (feature, importance) in enumerate(sorted_features, 1):
-                print(f"{i}. {feature}: {importance:.4f}")
-        
-        print("="*50)
+        print_prediction(result)
         
         # Сохранение результатов в JSON файл
         output_file = f"prediction_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False, default=str)
+            json.dump(result, f, indent=2, ensure_ascii=False, default=json_default)
         
         print(f"Результаты сохранены в {output_file}")
+        write_textfile()
         
     except Exception as e:
         logger.error(f"Ошибка при выполнении предсказания: {e}")
         raise
     
     finally:
-        # Закрытие подключения к базе данных
-        db_manager = get_database_manager()
-        db_manager.close_connection()
+        # Закрытие подключения к базе данных (если оно открывалось)
+        from db import close_database_manager
+        close_database_manager()
+
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
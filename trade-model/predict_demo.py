@@ -16,6 +16,7 @@ from dotenv import load_dotenv
 
 # Local imports
 from predict import BitcoinPredictor
+from model_artifact import resolve_path
 from train_demo import create_synthetic_data
 
 # Настройка логирования
@@ -40,9 +41,9 @@ def load_demo_model(model_path: Optional[str] = None) -> BitcoinPredictor:
         Экземпляр BitcoinPredictor
     """
     if model_path is None:
-        model_path = os.getenv('MODEL_PATH', 'models/etf_model_v1.pkl')
+        model_path = os.getenv('MODEL_PATH', 'models/etf_model_v1.ubj')
     
-    if not os.path.exists(model_path):
+    if not os.path.exists(resolve_path(model_path)):
         raise FileNotFoundError(
             f"Модель не найдена: {model_path}\n"
             "Сначала запустите: python train_demo.py"
@@ -157,7 +158,7 @@ def main():
     logger.info("=" * 60)
     
     # Параметры из переменных окружения
-    model_path = os.getenv('MODEL_PATH', 'models/etf_model_v1.pkl')
+    model_path = os.getenv('MODEL_PATH', 'models/etf_model_v1.ubj')
     
     try:
         # Предсказание с синтетическими данными
@@ -0,0 +1,204 @@
+"""
+Кэш результатов предсказания, привязанный к состоянию данных.
+
+Ключ кэша строится из водяного знака данных (последняя 5m свеча символа,
+последняя запись btc_flows), отпечатка файла модели и конфигурации признаков.
+Пока данные в базе не изменились, повторный запрос возвращает сохраненный
+результат после одного дешевого запроса водяного знака.
+
+Кэш двухуровневый: LRU в памяти и JSON-файлы на диске (переживают перезапуск
+процесса и разделяются между запусками predict.py).
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Загрузка переменных окружения
+load_dotenv()
+
+
+def file_fingerprint(path: str) -> Dict[str, Any]:
+    """
+    Отпечаток файла: SHA-256 содержимого, размер и время изменения.
+
+    Args:
+        path: Путь к файлу
+
+    Returns:
+        Словарь с отпечатком файла
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    stat = os.stat(path)
+    return {
+        'sha256': digest.hexdigest(),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime
+    }
+
+
+class PredictionCache:
+    """Двухуровневый (память + диск) кэш результатов предсказания."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: Optional[int] = None,
+                 max_files: Optional[int] = None):
+        """
+        Инициализация кэша.
+
+        Args:
+            cache_dir: Каталог дискового уровня (None или пустая строка - только память)
+            max_entries: Максимум записей в памяти (LRU)
+            max_files: Максимум файлов на диске (вытесняются самые старые по времени доступа)
+        """
+        if cache_dir is None:
+            cache_dir = os.getenv('PREDICTION_CACHE_DIR', 'data/cache/predictions')
+        self.cache_dir = cache_dir or None
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('PREDICTION_CACHE_MAX_ENTRIES', '128'))
+        self.max_files = max_files if max_files is not None else int(os.getenv('PREDICTION_CACHE_MAX_FILES', '1000'))
+
+        self._memory: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0
+        }
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """
+        Построение ключа кэша из произвольных JSON-сериализуемых частей.
+
+        Returns:
+            Хеш SHA-256 канонического JSON-представления частей
+        """
+        canonical = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Получение результата из кэша.
+
+        Args:
+            key: Ключ кэша
+
+        Returns:
+            Сохраненный результат или None при промахе
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return dict(self._memory[key])
+
+        if self.cache_dir:
+            path = self._path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    value = json.load(f)
+                # Обновляем время доступа для вытеснения по LRU
+                os.utime(path)
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+                    self._remember(key, value)
+                return dict(value)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"Поврежденная запись кэша {path}: {e}")
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Сохранение результата в кэш.
+
+        Args:
+            key: Ключ кэша
+            value: JSON-сериализуемый результат
+        """
+        with self._lock:
+            self._remember(key, dict(value))
+            self._stats['stores'] += 1
+
+        if self.cache_dir:
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(value, f, ensure_ascii=False, default=str)
+                os.replace(tmp_path, path)
+                self._evict_files()
+            except OSError as e:
+                logger.warning(f"Не удалось записать кэш {path}: {e}")
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        """Запись в LRU в памяти (вызывается под блокировкой)."""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats['memory_evictions'] += 1
+
+    def _evict_files(self) -> None:
+        """Удаление самых давно использованных файлов сверх лимита."""
+        entries = [
+            entry for entry in os.scandir(self.cache_dir)
+            if entry.is_file() and entry.name.endswith('.json')
+        ]
+        excess = len(entries) - self.max_files
+        if excess <= 0:
+            return
+
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+                with self._lock:
+                    self._stats['disk_evictions'] += 1
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """Очистка обоих уровней кэша."""
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith('.json'):
+                    os.remove(entry.path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        total = hits + stats['misses']
+        stats['hit_rate'] = hits / total if total else 0.0
+        return stats
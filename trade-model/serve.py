@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Резидентный сервер прогнозов цены Биткоина.
+
+Модель и пул подключений к базе данных загружаются один раз при старте,
+после чего сервер отвечает на запросы predict, predict-from-data, model-info
+и health в формате JSON по HTTP (TCP) или через Unix-сокет; GET /metrics
+отдает счетчики этапов (instrumentation.py) в формате Prometheus.
+"""
+
+import os
+import json
+import argparse
+import threading
+import socketserver
+import logging
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from dotenv import load_dotenv
+
+# Local imports
+from predict import BitcoinPredictor, load_model, json_default
+from instrumentation import REGISTRY
+from model_artifact import resolve_path
+from db import get_database_manager, close_database_manager
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Загрузка переменных окружения
+load_dotenv()
+
+
+def _is_true(value: Optional[str]) -> bool:
+    """Разбор булевого параметра запроса."""
+    return (value or '').lower() in ('1', 'true', 'yes')
+
+
+class PredictionService:
+    """Держит загруженную модель и выполняет запросы к ней."""
+
+    def __init__(self, model_path: Optional[str] = None):
+        """
+        Инициализация сервиса с однократной загрузкой модели.
+
+        Args:
+            model_path: Путь к модели (если None, берется из переменных окружения)
+        """
+        self.model_path = model_path or os.getenv('MODEL_PATH', 'models/etf_model_v1.ubj')
+        self.symbol = os.getenv('BTC_SYMBOL', 'BTCUSDT')
+        self.started_at = datetime.now()
+        self._lock = threading.Lock()
+        self.predictor: BitcoinPredictor = load_model(self.model_path)
+
+    def reload(self) -> Dict[str, Any]:
+        """Перезагрузка модели с диска (например, после переобучения)."""
+        predictor = load_model(self.model_path)
+        with self._lock:
+            self.predictor = predictor
+        return self.model_info()
+
+    def health(self) -> Dict[str, Any]:
+        """Состояние сервиса."""
+        cache = self.predictor.cache
+        return {
+            'status': 'ok',
+            'model_loaded': self.predictor.model is not None,
+            'db_connected': get_database_manager().is_connected(),
+            'uptime_seconds': (datetime.now() - self.started_at).total_seconds(),
+            'cache': cache.stats() if cache is not None else None
+        }
+
+    def model_info(self) -> Dict[str, Any]:
+        """Метаданные загруженной модели."""
+        predictor = self.predictor
+        # Артефакт без метаданных - загружен прежний .pkl с тем же именем
+        source_path = resolve_path(self.model_path)
+        model_exists = os.path.exists(source_path)
+        return {
+            'model_path': self.model_path,
+            'model_exists': model_exists,
+            'model_size': os.path.getsize(source_path) if model_exists else 0,
+            'last_trained': predictor.trained_at,
+            'features_count': len(predictor.feature_columns),
+            'feature_columns': predictor.feature_columns,
+            'min_history': predictor.min_history,
+            'model_params': predictor.model_params,
+            'model_fingerprint': predictor.model_fingerprint,
+            'model_type': 'XGBoost'
+        }
+
+    def predict(self, symbol: Optional[str] = None, lookback_days: Optional[int] = None,
+                latest_only: bool = False) -> Dict[str, Any]:
+        """Прогноз на основе данных из базы данных."""
+        # Без lookback_days - все доступные дни (определяются только при промахе кэша)
+        if lookback_days is None and latest_only:
+            lookback_days = self.predictor.feature_engineer.tail_window(
+                columns=self.predictor.feature_columns) + 2
+        with self._lock:
+            return self.predictor.predict_from_database(
+                symbol=symbol or self.symbol,
+                lookback_days=lookback_days,
+                latest_only=latest_only
+            )
+
+    def predict_from_data(self, json_data: Dict[str, Any], latest_only: bool = False) -> Dict[str, Any]:
+        """Прогноз на основе переданных данных (словарь списков)."""
+        with self._lock:
+            return self.predictor.predict_from_json(json_data, latest_only=latest_only)
+
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    """HTTP-обработчик запросов к сервису прогнозов."""
+
+    server_version = 'ETFPredictionServer/1.0'
+    max_body_size = 10 * 1024 * 1024
+
+    @property
+    def service(self) -> PredictionService:
+        return self.server.service
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # client_address для Unix-сокета пустой, поэтому не используем address_string()
+        logger.info(f"{self.command} {self.path} - {format % args}")
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        self._send_text(status, json.dumps(payload, ensure_ascii=False, default=json_default),
+                        'application/json; charset=utf-8')
+
+    def _send_text(self, status: int, text: str, content_type: str) -> None:
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_result(self, data: Dict[str, Any]) -> None:
+        self._send_json(200, {
+            'success': True,
+            'data': data,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    def _send_error(self, status: int, message: str) -> None:
+        self._send_json(status, {
+            'success': False,
+            'error': message,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    def _read_json_body(self) -> Any:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            raise ValueError("Пустое тело запроса")
+        if length > self.max_body_size:
+            raise ValueError("Слишком большое тело запроса")
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def _route(self) -> Tuple[str, Dict[str, str]]:
+        parsed = urlparse(self.path)
+        route = parsed.path.rstrip('/')
+        if route.startswith('/api/ml'):
+            route = route[len('/api/ml'):]
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        return route or '/', query
+
+    def do_GET(self) -> None:
+        route, query = self._route()
+        try:
+            if route == '/health':
+                self._send_result(self.service.health())
+            elif route == '/model-info':
+                self._send_result(self.service.model_info())
+            elif route == '/metrics':
+                # Счетчики этапов в текстовом формате Prometheus
+                self._send_text(200, REGISTRY.prometheus_text(), 'text/plain; version=0.0.4; charset=utf-8')
+            elif route == '/predict':
+                lookback_days = query.get('lookback_days')
+                self._send_result(self.service.predict(
+                    symbol=query.get('symbol'),
+                    lookback_days=int(lookback_days) if lookback_days else None,
+                    latest_only=_is_true(query.get('latest_only'))
+                ))
+            else:
+                self._send_error(404, f"Неизвестный маршрут: {route}")
+        except ValueError as e:
+            self._send_error(400, str(e))
+        except Exception as e:
+            logger.error(f"Ошибка обработки запроса {route}: {e}")
+            self._send_error(500, str(e))
+
+    def do_POST(self) -> None:
+        route, query = self._route()
+        try:
+            if route == '/predict':
+                payload = self._read_json_body()
+                if not isinstance(payload, dict):
+                    raise ValueError("Ожидается JSON-объект со списками значений")
+                self._send_result(self.service.predict_from_data(
+                    payload,
+                    latest_only=_is_true(query.get('latest_only'))
+                ))
+            elif route == '/reload':
+                self._send_result(self.service.reload())
+            else:
+                self._send_error(404, f"Неизвестный маршрут: {route}")
+        except ValueError as e:
+            self._send_error(400, str(e))
+        except Exception as e:
+            logger.error(f"Ошибка обработки запроса {route}: {e}")
+            self._send_error(500, str(e))
+
+
+class PredictionHTTPServer(ThreadingHTTPServer):
+    """Многопоточный HTTP-сервер на TCP-порту."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: PredictionService):
+        self.service = service
+        super().__init__(address, PredictionRequestHandler)
+
+
+class PredictionUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Многопоточный HTTP-сервер на Unix-сокете."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: PredictionService):
+        self.service = service
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, PredictionRequestHandler)
+
+
+def create_server(service: PredictionService, host: str = '127.0.0.1', port: int = 8765,
+                  socket_path: Optional[str] = None) -> socketserver.BaseServer:
+    """
+    Создание сервера для сервиса прогнозов.
+
+    Args:
+        service: Сервис с загруженной моделью
+        host: Адрес для TCP-сервера
+        port: Порт для TCP-сервера
+        socket_path: Путь к Unix-сокету (если указан, TCP не используется)
+
+    Returns:
+        Экземпляр сервера
+    """
+    if socket_path:
+        return PredictionUnixServer(socket_path, service)
+    return PredictionHTTPServer((host, port), service)
+
+
+def main():
+    """Основная функция запуска сервера."""
+    parser = argparse.ArgumentParser(description="Резидентный сервер прогнозов цены Биткоина")
+    parser.add_argument('--host', default=os.getenv('ML_SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('ML_SERVER_PORT', '8765')))
+    parser.add_argument('--socket', default=os.getenv('ML_SERVER_SOCKET') or None,
+                        help="Путь к Unix-сокету вместо TCP")
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'models/etf_model_v1.ubj'))
+    args = parser.parse_args()
+
+    service = PredictionService(args.model)
+    server = create_server(service, args.host, args.port, args.socket)
+
+    address = args.socket or f"http://{args.host}:{args.port}"
+    logger.info(f"Сервер прогнозов запущен: {address}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Остановка сервера прогнозов")
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        close_database_manager()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Проверка бенчмарка конвейера (bench_pipeline.py): прогон этапов и поиск регрессий.
+
+Запуск: python -m pytest -q test_bench_pipeline.py или python test_bench_pipeline.py
+"""
+
+import tempfile
+
+import bench_pipeline
+
+
+def results(seconds: float, peak_bytes: int) -> dict:
+    return {'scenarios': {'1y_1d': {'stages': {'train': {'seconds': seconds, 'peak_bytes': peak_bytes}}}}}
+
+
+def test_pipeline_reports_every_stage():
+    with tempfile.TemporaryDirectory() as workdir:
+        run = bench_pipeline.run_pipeline({'days': 120, 'freq': 'D'}, workdir, trace=True)
+
+    assert run['rows'] == 120
+    for stage in bench_pipeline.STAGES:
+        assert run[stage]['seconds'] >= 0
+        assert run[stage]['peak_bytes'] >= 0
+
+
+def test_compare_flags_regressions():
+    baseline = results(1.0, 100 * 1024 ** 2)
+
+    assert bench_pipeline.compare(results(1.2, 110 * 1024 ** 2), baseline, 0.5, 0.2) == []
+    assert len(bench_pipeline.compare(results(2.0, 100 * 1024 ** 2), baseline, 0.5, 0.2)) == 1
+    assert len(bench_pipeline.compare(results(1.0, 200 * 1024 ** 2), baseline, 0.5, 0.2)) == 1
+
+    # Короткие этапы и сценарии без базы не сравниваются
+    short = results(0.001, 0)
+    assert bench_pipeline.compare(results(0.04, 0), short, 0.5, 0.2) == []
+    assert bench_pipeline.compare(results(9.0, 0), {'scenarios': {}}, 0.5, 0.2) == []
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_pipeline_reports_every_stage()
+    test_compare_flags_regressions()
+    print("✅ Бенчмарк конвейера работает корректно")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Проверки потоковой агрегации свечей (candle_stream.py) без базы данных.
+
+Запуск: python -m pytest -q test_candle_stream.py или python test_candle_stream.py
+"""
+
+import sys
+import json
+import subprocess
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from candle_stream import OHLCV_AGG, aggregate_candle_chunks
+
+# Дочерний процесс сворачивает минутную историю заданной длины и печатает пиковый RSS
+RSS_SNIPPET = (
+    "import sys, json, resource\n"
+    "from test_candle_stream import minute_chunks\n"
+    "from candle_stream import aggregate_candle_chunks\n"
+    "df = aggregate_candle_chunks(minute_chunks(int(sys.argv[1])), '1h')\n"
+    "print(json.dumps({'rows': len(df), 'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))\n"
+)
+
+
+def minute_chunks(days: int, chunksize: int = 50000, seed: int = 42) -> Iterator[pd.DataFrame]:
+    """Синтетические минутные свечи, выдаваемые частями (как серверный курсор)."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2020-01-01')
+    total = days * 24 * 60
+    price = 30000.0
+
+    for offset in range(0, total, chunksize):
+        n = min(chunksize, total - offset)
+        close = price * np.exp(np.cumsum(rng.normal(0, 0.0005, n)))
+        open_ = np.concatenate(([price], close[:-1]))
+        spread = np.abs(rng.normal(0, 0.0003, n)) * close
+        price = close[-1]
+        yield pd.DataFrame({
+            'timestamp': start + pd.to_timedelta(np.arange(offset, offset + n), unit='min'),
+            'open': open_,
+            'high': np.maximum(open_, close) + spread,
+            'low': np.minimum(open_, close) - spread,
+            'close': close,
+            'volume': rng.uniform(1, 10, n)
+        })
+
+
+def peak_rss_kb(days: int) -> int:
+    """Пиковый RSS отдельного процесса, свернувшего days дней минутных свечей."""
+    completed = subprocess.run(
+        [sys.executable, '-c', RSS_SNIPPET, str(days)],
+        capture_output=True, text=True, check=True
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert result['rows'] == days * 24
+    return result['peak_rss_kb']
+
+
+def test_stream_matches_resample():
+    # Нечетный размер части, чтобы интервалы пересекали границы частей
+    chunks = list(minute_chunks(20, chunksize=7919))
+    raw = pd.concat(chunks).set_index('timestamp')
+
+    for rule in ('1h', '4h', 'D'):
+        expected = raw.resample(rule).agg(OHLCV_AGG).dropna()
+        streamed = aggregate_candle_chunks(iter(chunks), rule)
+        pd.testing.assert_frame_equal(streamed, expected, check_freq=False, check_names=False)
+
+
+def test_stream_rejects_unordered_chunks():
+    chunks = list(minute_chunks(2, chunksize=1000))
+    try:
+        aggregate_candle_chunks(reversed(chunks), '1h')
+    except ValueError:
+        return
+    raise AssertionError("Неупорядоченные части должны отклоняться")
+
+
+def test_peak_rss_flat_as_history_grows():
+    # 1 год минутных свечей - 0.5 млн строк, 4 года - 2.1 млн (~100 МБ в одном DataFrame)
+    short = peak_rss_kb(365)
+    long = peak_rss_kb(4 * 365)
+    assert long - short < 30 * 1024, f"Пиковый RSS вырос на {(long - short) / 1024:.1f} МБ"
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_stream_matches_resample()
+    print("✅ Потоковая агрегация совпадает с resample")
+    for days in (365, 2 * 365, 4 * 365):
+        print(f"   {days:5} дней: пиковый RSS {peak_rss_kb(days) / 1024:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
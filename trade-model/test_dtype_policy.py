@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Проверки политики типов данных (dtype_policy.py) без базы данных.
+
+Запуск: python -m pytest -q test_dtype_policy.py или python test_dtype_policy.py
+"""
+
+import os
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from dtype_policy import DtypePolicy, MemoryReport
+from predict import BitcoinPredictor
+from train_demo import create_synthetic_data
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'etf_model_v1.pkl')
+
+
+def test_apply_compacts_loaded_columns():
+    df = pd.DataFrame({
+        'symbol': ['BTCUSDT', 'ETHUSDT'] * 3,
+        'open_time': pd.date_range('2025-01-01', periods=6, freq='h', tz='UTC'),
+        'close': np.linspace(1, 2, 6),
+        'total': [Decimal('1.5')] * 6
+    })
+    compact = DtypePolicy.from_env('compact').apply(df)
+
+    assert isinstance(compact['symbol'].dtype, pd.CategoricalDtype)
+    assert compact['open_time'].dtype == 'int64'
+    assert compact['open_time'].iloc[0] == 1735689600000
+    assert compact['close'].dtype == 'float32'
+    assert compact['total'].dtype == 'float32'
+
+    wide = DtypePolicy.from_env('wide').apply(df.drop(columns=['total']))
+    assert wide['close'].dtype == 'float64'
+    assert not isinstance(wide['symbol'].dtype, pd.CategoricalDtype)
+
+
+def check_compact_matches_wide(model_path: str = MODEL_PATH) -> MemoryReport:
+    """Предсказания на float32-признаках совпадают с float64 (XGBoost работает с float32)."""
+    data = create_synthetic_data(500)
+    predictor = BitcoinPredictor(model_path, cache=None)
+    report = MemoryReport()
+
+    probabilities = {}
+    for name in ('wide', 'compact'):
+        policy = DtypePolicy.from_env(name)
+        predictor.feature_engineer.dtype_policy = policy
+        X = predictor.prepare_features(policy.apply(data))
+        assert (X.dtypes == policy.float_dtype).all()
+        report.record(f"X {name}", X)
+        probabilities[name] = predictor.model.predict_proba(X)[:, 1]
+
+    np.testing.assert_allclose(probabilities['compact'], probabilities['wide'], atol=1e-6)
+    assert report.stages['X compact']['bytes'] < report.stages['X wide']['bytes']
+    return report
+
+
+def test_compact_features_match_wide_predictions():
+    check_compact_matches_wide()
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_apply_compacts_loaded_columns()
+    report = check_compact_matches_wide()
+    print("✅ Предсказания на float32-признаках совпадают с float64")
+    report.log()
+
+
+if __name__ == "__main__":
+    main()
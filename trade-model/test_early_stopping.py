@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Проверка ранней остановки и бюджета времени в BitcoinPredictor.train.
+
+Запуск: python -m pytest -q test_early_stopping.py или python test_early_stopping.py
+"""
+
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pytest
+
+from train import BitcoinPredictor as Trainer
+from train_demo import create_synthetic_data
+from predict import BitcoinPredictor
+
+
+def test_early_stopping_records_best_iteration():
+    trainer = Trainer()
+    trainer.model_params['n_estimators'] = 500
+    trainer.early_stopping_rounds = 10
+    data = create_synthetic_data(500)
+    X, y, feature_columns = trainer.prepare_data(data)
+    trainer.feature_columns = feature_columns
+    metrics = trainer.train(X, y)
+
+    training = metrics['training']
+    # Валидационный отрезок берется из обучающей части, тестовая не меняется
+    split_idx = int(len(X) * 0.8)
+    assert training['validation_rows'] == split_idx - int(split_idx * (1 - trainer.validation_size))
+    assert training['tree_method'] == 'hist'
+    assert training['n_trees'] < 500
+    assert training['n_trees'] == training['best_iteration'] + 1 + trainer.early_stopping_rounds
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        trainer.save_model(model_path)
+        saved = joblib.load(model_path)
+        assert saved['best_iteration'] == training['best_iteration']
+        assert saved['model'].get_params()['callbacks'] is None
+
+        # Предсказание использует только деревья до лучшей итерации
+        predictor = BitcoinPredictor(model_path)
+        assert predictor.iteration_range == (0, training['best_iteration'] + 1)
+        result = predictor.predict(data)
+    X_last = X.iloc[-1:]
+    expected = trainer.model.get_booster()[:training['best_iteration'] + 1].inplace_predict(X_last)[0]
+    assert np.isclose(result['probability_up'], expected, rtol=1e-5)
+
+
+def test_time_budget_stops_training():
+    trainer = Trainer()
+    trainer.model_params['n_estimators'] = 500
+    trainer.time_budget = 1e-6
+    trainer.n_jobs = 1
+    X, y, _ = trainer.prepare_data(create_synthetic_data(300))
+    metrics = trainer.train(X, y)
+
+    assert metrics['training']['budget_exhausted']
+    assert metrics['training']['n_trees'] == 1
+    assert metrics['training']['best_iteration'] is None
+    assert trainer.model.get_params()['n_jobs'] == 1
+
+
+def test_empty_training_part_raises():
+    trainer = Trainer()
+    X, y, _ = trainer.prepare_data(create_synthetic_data(300))
+    # embargo длиннее обучающей части: понятная ошибка до обучения, а не IndexError
+    with pytest.raises(ValueError, match="Недостаточно данных"):
+        trainer.train(X, y, gap=len(X))
+    assert trainer.model is None
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_early_stopping_records_best_iteration()
+    test_time_budget_stops_training()
+    test_empty_training_part_raises()
+    print("✅ Ранняя остановка и бюджет времени работают корректно")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Проверка реестра признаков (feature_registry.py): полнота, расчет подграфа
+и минимальная длина истории.
+
+Запуск: python -m pytest -q test_feature_registry.py или python test_feature_registry.py
+"""
+
+import numpy as np
+import pandas as pd
+
+import feature_registry
+from dtype_policy import DtypePolicy
+from features import FeatureEngineer
+from train_demo import create_synthetic_data
+
+
+def wide_engineer() -> FeatureEngineer:
+    engineer = FeatureEngineer()
+    engineer.dtype_policy = DtypePolicy.from_env('wide')
+    return engineer
+
+
+def test_registry_covers_feature_names():
+    engineer = wide_engineer()
+    outputs = [name for name, spec in feature_registry.REGISTRY.items() if spec.output]
+    assert sorted(outputs) == sorted(engineer.feature_names())
+
+    data = create_synthetic_data(100).drop(columns=['etf_flow'])
+    features = engineer.create_features(data)
+    assert list(features.columns[len(data.columns):]) == engineer.feature_names(has_etf_flow=False)
+    assert (features['etf_flow_ratio'] == 0.0).all()
+
+
+def test_subset_computes_only_needed_subgraph():
+    order, missing = feature_registry.resolve(['price_to_ma7', 'volume_ratio'], ['close', 'volume'])
+    assert order == ['ma_7', 'price_to_ma7', 'volume_ma7', 'volume_ratio']
+    assert missing == []
+
+    order, missing = feature_registry.resolve(['macd_signal', 'etf_flow_lag_1', 'unknown'], ['close'])
+    assert order == ['ema_fast', 'ema_slow', 'macd', 'macd_signal']
+    assert missing == ['etf_flow_lag_1', 'unknown']
+
+    engineer = wide_engineer()
+    data = create_synthetic_data(200)
+    columns = ['macd_signal', 'volume_ratio', 'return_lag_2']
+    subset = engineer.create_features(data, columns=columns)
+    full = engineer.create_features(data)
+    assert list(subset.columns) == list(data.columns) + columns
+    pd.testing.assert_frame_equal(subset[columns], full[columns])
+
+
+def test_min_history_is_exact():
+    # Последняя строка по хвосту min_history совпадает с расчетом по всей истории,
+    # по хвосту на строку короче - нет
+    engineer = wide_engineer()
+    data = create_synthetic_data(200)
+    for columns in (['return_prev'], ['volatility'], ['ma7_to_ma30'], ['rsi'], ['return_lag_3', 'hl_spread']):
+        rows = engineer.min_history(columns)
+        full = engineer.create_features(data, columns=columns)[columns].iloc[-1]
+        last = engineer.create_features(data.iloc[-rows:], columns=columns)[columns].iloc[-1]
+        short = engineer.create_features(data.iloc[-(rows - 1):], columns=columns)[columns].iloc[-1]
+        assert np.allclose(last, full, rtol=1e-9), columns
+        assert not np.allclose(short, full, rtol=1e-9), columns
+
+    assert engineer.min_history(['volatility']) == engineer.volatility_window + 1
+    assert engineer.tail_window(macd_warmup=500, columns=['rsi']) == engineer.min_history(['rsi'])
+    assert engineer.tail_window(macd_warmup=500, columns=['rsi', 'macd']) == 500
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_registry_covers_feature_names()
+    test_subset_computes_only_needed_subgraph()
+    test_min_history_is_exact()
+    print("✅ Реестр признаков работает корректно")
+
+
+if __name__ == "__main__":
+    main()
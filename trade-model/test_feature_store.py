@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Проверка хранилища признаков (feature_store.py): попадание, дозапись новых
+строк, перестройка при изменении истории и вытеснение по размеру.
+
+Запуск: python -m pytest -q test_feature_store.py или python test_feature_store.py
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+from bench_features import max_difference
+from dtype_policy import DtypePolicy
+from feature_store import FeatureStore
+from features import FeatureEngineer
+from predict import BitcoinPredictor
+from train_demo import create_synthetic_data
+
+TOLERANCE = 1e-9
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'etf_model_v1.ubj')
+
+
+def wide_engineer() -> FeatureEngineer:
+    engineer = FeatureEngineer()
+    engineer.dtype_policy = DtypePolicy.from_env('wide')
+    return engineer
+
+
+def test_store_appends_only_new_rows():
+    data = create_synthetic_data(1500)
+    engineer = wide_engineer()
+    names = engineer.feature_names()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = FeatureStore(root=root, warmup=600)
+
+        first = store.get_features(data.iloc[:1200], engineer, 'BTCUSDT')
+        again = store.get_features(data.iloc[:1200], engineer, 'BTCUSDT')
+        pd.testing.assert_frame_equal(first, again)
+
+        # История выросла: считаются только новые строки
+        grown = store.get_features(data, engineer, 'BTCUSDT')
+        assert max_difference(grown, engineer.create_features(data), names) < TOLERANCE
+        assert list(grown.columns) == list(engineer.create_features(data).columns)
+
+        stats = store.stats()
+        assert (stats['misses'], stats['hits'], stats['appends']) == (1, 1, 1)
+        assert stats['entries'] == 1
+
+        # Исправленная задним числом история перестраивает запись
+        revised = data.copy()
+        revised.iloc[500, revised.columns.get_loc('close')] *= 1.01
+        rebuilt = store.get_features(revised, engineer, 'BTCUSDT')
+        assert max_difference(rebuilt, engineer.create_features(revised), names) == 0.0
+        assert store.stats()['rebuilds'] == 1
+
+
+def test_store_separates_configs_and_evicts_by_size():
+    data = create_synthetic_data(400)
+    engineer = wide_engineer()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = FeatureStore(root=root)
+        store.get_features(data, engineer, 'BTCUSDT')
+        other = wide_engineer()
+        other.ma_long_window = 20
+        store.get_features(data, other, 'BTCUSDT')
+        assert store.stats()['entries'] == 2
+
+        # Лимит размера вмещает одну запись: вытесняется давно использованная
+        store.max_bytes = max(entry['bytes'] for entry in store.entries())
+        store.get_features(data, other, 'BTCUSDT')
+        stats = store.stats()
+        assert stats['entries'] == 1 and stats['evictions'] == 1
+        assert stats['hits'] == 1
+
+
+def test_shifted_window_appends_instead_of_missing():
+    data = create_synthetic_data(1500)
+    engineer = wide_engineer()
+    names = engineer.feature_names()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = FeatureStore(root=root, warmup=600)
+        store.get_features(data.iloc[:1200], engineer, 'BTCUSDT')
+
+        # Скользящее окно "последние N дней": начало сдвигается вместе с концом
+        for shift in (1, 2, 100):
+            window = data.iloc[shift:1200 + shift]
+            shifted = store.get_features(window, engineer, 'BTCUSDT')
+            assert shifted.index.equals(window.index)
+            # Признаки - как у полного расчета по истории с начала записи
+            expected = engineer.create_features(data.iloc[:1200 + shift]).loc[window.index]
+            assert max_difference(shifted, expected, names) < TOLERANCE
+
+        stats = store.stats()
+        assert (stats['misses'], stats['appends'], stats['hits']) == (1, 3, 0)
+        assert stats['entries'] == 1
+
+        # Окно внутри сохраненной истории читается с диска
+        store.get_features(data.iloc[50:1000], engineer, 'BTCUSDT')
+        assert store.stats()['hits'] == 1
+
+
+def test_ad_hoc_predictions_bypass_store():
+    data = create_synthetic_data(200)
+    payload = data.reset_index()
+    payload['timestamp'] = payload['timestamp'].astype(str)
+
+    with tempfile.TemporaryDirectory() as root:
+        store = FeatureStore(root=root)
+        predictor = BitcoinPredictor(MODEL_PATH, feature_store=store)
+
+        # Разовые данные запроса (JSON, POST /predict) не пишутся в хранилище
+        from_json = predictor.predict_from_json(payload.to_dict(orient='list'))
+        predictor.predict(data)
+        assert store.stats()['entries'] == 0
+
+        # Данные из базы (с символом) идут через хранилище, прогноз тот же
+        from_store = predictor.predict(data, symbol='BTCUSDT')
+        assert store.stats()['entries'] == 1
+    assert from_store['probability_up'] == from_json['probability_up']
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_store_appends_only_new_rows()
+    test_store_separates_configs_and_evicts_by_size()
+    test_shifted_window_appends_instead_of_missing()
+    test_ad_hoc_predictions_bypass_store()
+    print("✅ Хранилище признаков работает корректно")
+
+
+if __name__ == "__main__":
+    main()
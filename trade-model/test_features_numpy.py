@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Сверка движка признаков на NumPy (features_numpy.py) с расчетом на pandas.
+
+Запуск: python -m pytest -q test_features_numpy.py или python test_features_numpy.py
+"""
+
+import numpy as np
+import pandas as pd
+
+import features_numpy
+from bench_features import max_difference, synthetic_ohlcv
+from dtype_policy import DtypePolicy
+from features import FeatureEngineer
+from train_demo import create_synthetic_data
+
+TOLERANCE = 1e-7
+
+
+def engines_difference(data: pd.DataFrame, policy: str = 'wide') -> float:
+    """Максимальное расхождение признаков pandas и numpy на одних данных."""
+    results = {}
+    for engine in ('pandas', 'numpy'):
+        engineer = FeatureEngineer()
+        engineer.engine = engine
+        engineer.dtype_policy = DtypePolicy.from_env(policy)
+        results[engine] = engineer.create_features(data)
+
+    columns = FeatureEngineer().feature_names('etf_flow' in data.columns)
+    assert list(results['pandas'].columns) == list(results['numpy'].columns)
+    assert (results['numpy'][columns].dtypes == DtypePolicy.from_env(policy).float_dtype).all()
+    return max_difference(results['pandas'], results['numpy'], columns)
+
+
+def test_parity_on_synthetic_history():
+    data = create_synthetic_data(600)
+    # Нулевые притоки дают деление на ноль в etf_flow_change
+    data.iloc[100:110, data.columns.get_loc('etf_flow')] = 0.0
+
+    assert engines_difference(data) < TOLERANCE
+    assert engines_difference(data, policy='compact') < TOLERANCE
+    assert engines_difference(data.drop(columns=['etf_flow'])) < TOLERANCE
+    # История короче самых длинных окон
+    assert engines_difference(data.iloc[:20]) < TOLERANCE
+
+
+def test_parity_across_block_boundaries():
+    # Несколько блоков кумулятивных сумм и EMA, притоки ~1e8 около нуля
+    assert engines_difference(synthetic_ohlcv(5000)) < TOLERANCE
+
+
+def test_parity_with_gaps():
+    data = create_synthetic_data(300)
+    data.iloc[150, data.columns.get_loc('volume')] = np.nan
+    data.iloc[200, data.columns.get_loc('close')] = np.nan
+    assert engines_difference(data) < TOLERANCE
+
+
+def test_ewm_matches_pandas():
+    x = np.random.default_rng(0).normal(100, 5, 3 * features_numpy.EMA_BLOCK + 17)
+    for span in (9, 12, 26):
+        expected = pd.Series(x).ewm(span=span).mean().to_numpy()
+        np.testing.assert_allclose(features_numpy.ewm_mean(x, span), expected, rtol=1e-12)
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_parity_on_synthetic_history()
+    test_parity_across_block_boundaries()
+    test_parity_with_gaps()
+    test_ewm_matches_pandas()
+    print("✅ Движок numpy совпадает с pandas")
+
+
+if __name__ == "__main__":
+    main()
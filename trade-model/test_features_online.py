@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Сверка потокового расчета признаков (features_online.py) с пакетным.
+
+Запуск: python -m pytest -q test_features_online.py или python test_features_online.py
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from bench_features import max_difference, synthetic_ohlcv
+from dtype_policy import DtypePolicy
+from features import FeatureEngineer
+from features_online import OnlineFeatureEngineer, RECOMPUTE_EVERY
+from train_demo import create_synthetic_data
+
+TOLERANCE = 1e-9
+
+
+def wide_engineer() -> FeatureEngineer:
+    engineer = FeatureEngineer()
+    engineer.dtype_policy = DtypePolicy.from_env('wide')
+    return engineer
+
+
+def online_difference(data: pd.DataFrame, restart_at: int) -> float:
+    """
+    Расхождение потокового и пакетного расчета, с перезапуском из
+    сериализованного состояния на строке restart_at.
+    """
+    engineer = wide_engineer()
+    batch = engineer.create_features(data)
+
+    online = OnlineFeatureEngineer(engineer, has_etf_flow='etf_flow' in data.columns)
+    head = online.update_many(data.iloc[:restart_at])
+
+    # Перезапуск сервиса: состояние проходит через JSON
+    state = json.loads(json.dumps(online.state_dict()))
+    restored = OnlineFeatureEngineer.from_state(state, engineer)
+    assert restored.bars_seen == restart_at
+    tail = restored.update_many(data.iloc[restart_at:])
+
+    return max_difference(batch, pd.concat([head, tail]), online.feature_names)
+
+
+def test_online_matches_batch_with_restart():
+    data = create_synthetic_data(600)
+    data.iloc[100:110, data.columns.get_loc('etf_flow')] = 0.0
+    data.iloc[150, data.columns.get_loc('volume')] = np.nan
+    data.iloc[200, data.columns.get_loc('close')] = np.nan
+
+    assert online_difference(data, restart_at=300) < TOLERANCE
+    assert online_difference(data.drop(columns=['etf_flow']), restart_at=5) < TOLERANCE
+
+
+def test_online_matches_batch_on_long_history():
+    # Несколько циклов пересчета сумм окон, притоки ~1e8 около нуля
+    data = synthetic_ohlcv(3 * RECOMPUTE_EVERY + 100)
+    assert online_difference(data, restart_at=RECOMPUTE_EVERY + 7) < TOLERANCE
+
+
+def test_state_size_does_not_grow():
+    data = synthetic_ohlcv(3000)
+    online = OnlineFeatureEngineer(wide_engineer())
+    online.update_many(data.iloc[:500])
+    small = len(json.dumps(online.state_dict()))
+    online.update_many(data.iloc[500:])
+    large = len(json.dumps(online.state_dict()))
+    assert large <= small * 1.1
+
+
+def test_config_mismatch_is_rejected():
+    online = OnlineFeatureEngineer(wide_engineer())
+    state = online.state_dict()
+    other = wide_engineer()
+    other.ma_long_window += 1
+    try:
+        OnlineFeatureEngineer.from_state(state, other)
+    except ValueError:
+        return
+    raise AssertionError("Состояние с другими параметрами окон должно отклоняться")
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_online_matches_batch_with_restart()
+    test_online_matches_batch_on_long_history()
+    test_state_size_does_not_grow()
+    test_config_mismatch_is_rejected()
+    print("✅ Потоковый расчет совпадает с пакетным")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Проверка дообучения сохраненной модели (BitcoinPredictor.update) и перехода к полному обучению.
+
+Запуск: python -m pytest -q test_incremental.py или python test_incremental.py
+"""
+
+import os
+import tempfile
+
+from train import BitcoinPredictor as Trainer
+from train_demo import create_synthetic_data
+from predict import BitcoinPredictor
+
+
+def train_and_save(data, model_path: str) -> Trainer:
+    """Полное обучение на data и сохранение модели."""
+    trainer = Trainer()
+    trainer.model_params['n_estimators'] = 50
+    X, y, feature_columns = trainer.prepare_data(data)
+    trainer.feature_columns = feature_columns
+    trainer.train(X, y)
+    trainer.save_model(model_path)
+    return trainer
+
+
+def test_update_adds_rounds_on_new_rows():
+    data = create_synthetic_data(420)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        trained = train_and_save(data.iloc[:400], model_path)
+
+        trainer = Trainer()
+        trainer.load_model(model_path)
+        assert trainer.data_end == trained.data_end
+        assert trainer.incremental['updates'] == 0
+
+        X, y, _ = trainer.prepare_data(data)
+        result = trainer.update(X, y, rounds=5, replay_rows=30)
+        assert result['updated']
+        # Новые строки - все после последней обучающей строки, кроме последней (без цели)
+        assert result['new_rows'] == int((X.index > trained.data_end).sum()) - 1
+        assert result['replay_rows'] == 30
+        assert result['n_trees'] == 50 + 5
+        assert trainer.data_end == X.index[-2]
+        trainer.save_model(model_path)
+
+        # Предсказание использует все деревья дообученной модели
+        predictor = BitcoinPredictor(model_path)
+        assert predictor.iteration_range is None
+        assert 0.0 <= predictor.predict(data)['probability_up'] <= 1.0
+
+        # Повторный запуск без новых строк модель не меняет
+        reloaded = Trainer()
+        reloaded.load_model(model_path)
+        assert reloaded.incremental['updates'] == 1
+        again = reloaded.update(X, y, rounds=5)
+        assert not again['updated'] and again['reason'] is None and again['new_rows'] == 0
+
+
+def test_full_retrain_fallbacks():
+    data = create_synthetic_data(420)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        train_and_save(data.iloc[:400], model_path)
+        X, y, _ = Trainer().prepare_data(data)
+
+        # Рост logloss на новых строках сверх допуска
+        trainer = Trainer()
+        trainer.load_model(model_path)
+        result = trainer.update(X, y, tolerance=-1.0, min_eval_rows=1)
+        assert not result['updated'] and 'logloss' in result['reason']
+        assert trainer.model.get_booster().num_boosted_rounds() == 50
+
+        # Предел числа дообучений
+        trainer = Trainer()
+        trainer.load_model(model_path)
+        assert trainer.update(X, y, rounds=2)['updated']
+        assert 'предел' in trainer.full_retrain_reason(max_updates=1, tolerance=0.05, min_eval_rows=20)
+
+        # Изменился набор признаков
+        trainer = Trainer()
+        trainer.load_model(model_path)
+        result = trainer.update(X.drop(columns=['rsi']), y)
+        assert not result['updated'] and 'признаков' in result['reason']
+
+        # Модель без состояния дообучения
+        assert Trainer().full_retrain_reason(30, 0.05, 20) == "сохраненная модель не найдена"
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_update_adds_rounds_on_new_rows()
+    test_full_retrain_fallbacks()
+    print("✅ Дообучение модели работает корректно")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Проверка времени этапов и экспорта счетчиков (instrumentation.py).
+
+Запуск: python -m pytest -q test_instrumentation.py или python test_instrumentation.py
+"""
+
+import os
+import socket
+import tempfile
+
+import instrumentation
+from instrumentation import MetricsRegistry, StatsdClient, collect, span
+from predict import BitcoinPredictor
+from test_predict import train_synthetic_model
+from train_demo import create_synthetic_data
+
+
+def test_prediction_result_has_stage_timings():
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        train_synthetic_model(model_path, days=300)
+
+        with collect() as timings:
+            predictor = BitcoinPredictor(model_path)
+        assert 'model_load' in timings.stages
+        assert timings.stages['model_load']['bytes'] == os.path.getsize(model_path)
+
+        data = create_synthetic_data(300)
+        result = predictor.predict(data)
+        stages = result['timings']['stages']
+        for stage in ('prepare_features', 'create_features', 'predict_proba'):
+            assert stage in stages and stages[stage]['calls'] == 1, stage
+        assert stages['create_features']['rows'] == len(data)
+        assert result['timings']['total_seconds'] >= stages['prepare_features']['seconds']
+
+        # Вложенные вызовы попадают в результат внешнего: разбор JSON и признаки
+        payload = {'timestamp': [str(ts) for ts in data.index], **{c: data[c].tolist() for c in data.columns}}
+        stages = predictor.predict_from_json(payload)['timings']['stages']
+        assert {'parse_json', 'prepare_features', 'predict_proba'} <= set(stages)
+        assert stages['parse_json']['rows'] == len(data)
+
+    text = instrumentation.REGISTRY.prometheus_text()
+    assert '# TYPE trade_model_stage_seconds_total counter' in text
+    assert 'trade_model_rows_processed_total{stage="create_features"}' in text
+
+
+def test_registry_and_statsd_export():
+    registry = MetricsRegistry(prefix='test')
+    registry.observe('db.load_candles', 0.5, rows=100, nbytes=4000)
+    registry.observe('db.load_candles', 0.25, rows=50, nbytes=2000, error=True)
+    text = registry.prometheus_text()
+    assert 'test_stage_calls_total{stage="db.load_candles"} 2' in text
+    assert 'test_stage_errors_total{stage="db.load_candles"} 1' in text
+    assert 'test_stage_seconds_total{stage="db.load_candles"} 0.75' in text
+    assert 'test_rows_processed_total{stage="db.load_candles"} 150' in text
+    assert 'test_bytes_loaded_total{stage="db.load_candles"} 6000' in text
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(2)
+    try:
+        client = StatsdClient('127.0.0.1', receiver.getsockname()[1], prefix='test')
+        client.send('resample', 0.012, rows=288, nbytes=1024)
+        lines = receiver.recv(4096).decode('ascii').split('\n')
+    finally:
+        receiver.close()
+    assert lines == ['test.resample.time:12.000|ms', 'test.resample.rows:288|c', 'test.resample.bytes:1024|c']
+
+    # Ошибка внутри этапа учитывается и пробрасывается дальше
+    try:
+        with span('failing_stage'):
+            raise RuntimeError('boom')
+    except RuntimeError:
+        pass
+    assert instrumentation.REGISTRY.snapshot()['failing_stage']['errors'] >= 1
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_prediction_result_has_stage_timings()
+    test_registry_and_statsd_export()
+    print("✅ Время этапов и экспорт счетчиков работают корректно")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Проверки внутридневных статистик (intraday.py) при агрегации свечей.
+
+Запуск: python -m pytest -q test_intraday.py или python test_intraday.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from candle_stream import OHLCV_AGG, aggregate_candles, aggregate_candle_chunks
+from intraday import INTRADAY_FEATURES
+from test_candle_stream import minute_chunks
+
+
+def five_minute_candles(days: int) -> pd.DataFrame:
+    """Синтетические 5m свечи с DatetimeIndex timestamp."""
+    df = pd.concat(minute_chunks(days * 5)).iloc[::5].reset_index(drop=True)
+    df['timestamp'] = pd.date_range('2024-01-01', periods=len(df), freq='5min')
+    return df.set_index('timestamp')
+
+
+def reference_day(day: pd.DataFrame) -> dict:
+    """Внутридневные статистики одного дня, посчитанные напрямую."""
+    returns = np.log(day['close'] / day['open'])
+    vwap = ((day['high'] + day['low'] + day['close']) / 3 * day['volume']).sum() / day['volume'].sum()
+    up = day.loc[day['close'] > day['open'], 'volume'].sum()
+    down = day.loc[day['close'] < day['open'], 'volume'].sum()
+    asia = day[day.index.hour < 8]
+    return {
+        'realized_variance': (returns ** 2).sum(),
+        'max_abs_return_5m': returns.abs().max(),
+        'vwap_deviation': day['close'].iloc[-1] / vwap - 1,
+        'up_volume_share': up / (up + down),
+        'range_asia': (asia['high'].max() - asia['low'].min()) / day['open'].iloc[0],
+    }
+
+
+def test_daily_statistics_match_direct_calculation():
+    candles = five_minute_candles(3)
+    daily = aggregate_candles(candles, 'D', intraday=True)
+
+    pd.testing.assert_frame_equal(daily[list(OHLCV_AGG)], aggregate_candles(candles, 'D'), check_freq=False)
+    assert set(INTRADAY_FEATURES) <= set(daily.columns)
+
+    for day, group in candles.groupby(candles.index.floor('D')):
+        for name, value in reference_day(group).items():
+            assert np.isclose(daily.at[day, name], value, rtol=1e-10), name
+
+
+def test_stream_matches_single_pass():
+    # Границы частей не совпадают с границами дней
+    candles = five_minute_candles(4)
+    chunks = (candles.iloc[i:i + 700].reset_index() for i in range(0, len(candles), 700))
+    streamed = aggregate_candle_chunks(chunks, 'D', intraday=True)
+    single = aggregate_candles(candles, 'D', intraday=True)
+
+    pd.testing.assert_frame_equal(streamed, single, check_freq=False, check_names=False, rtol=1e-12)
+
+    # Часовые свечи: сессии вне интервала дают нулевой диапазон, а не пропуск
+    hourly = aggregate_candles(candles, '1h', intraday=True)
+    assert not hourly[INTRADAY_FEATURES].isna().any().any()
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_daily_statistics_match_direct_calculation()
+    test_stream_matches_single_pass()
+    print("✅ Внутридневные статистики совпадают с прямым расчетом")
+
+
+if __name__ == "__main__":
+    main()
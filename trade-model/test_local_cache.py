@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Проверка локального Parquet-кэша (local_cache.py) без базы данных: дописывание
+частей, компакция, пропуск повторно выгруженных строк, поиск пропусков и
+дубликатов свечей.
+
+Запуск: python -m pytest -q test_local_cache.py или python test_local_cache.py
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+import pytest
+
+import db
+import local_cache
+from local_cache import LocalDataCache, ParquetDataset
+
+
+def make_candles(start: str, periods: int, freq: str = '5min', close: float = 100.0) -> pd.DataFrame:
+    """Свечи с колонками btc_candles."""
+    open_time = pd.date_range(start, periods=periods, freq=freq)
+    return pd.DataFrame({
+        'open_time': open_time,
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': 10.0, 'quote_volume': 1000.0, 'trades': 5, 'taker_buy_base': 4.0,
+    })
+
+
+def test_import_shares_flow_tables():
+    # Модуль импортируется без подключения к базе, список таблиц общий с db.py
+    assert local_cache.FLOW_TABLES is db.FLOW_TABLES
+    cache = LocalDataCache(None, cache_dir='unused')
+    for table in db.FLOW_TABLES:
+        assert cache.flows_dataset(table).key == 'date'
+    with pytest.raises(ValueError):
+        cache.flows_dataset('unknown_flow')
+
+
+def test_append_and_compact():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset = ParquetDataset(os.path.join(tmp_dir, 'candles'), key='open_time', watermark_column='open_time')
+        assert dataset.read().empty and dataset.manifest()['watermark'] is None
+
+        dataset.append(make_candles('2025-01-01', 4))
+        # Вторая выгрузка перезаписывает последнюю свечу (побеждает последняя запись)
+        dataset.append(make_candles('2025-01-01 00:15', 3, close=200.0))
+        dataset.append(make_candles('2025-01-01', 0))
+
+        manifest = dataset.manifest()
+        assert len(manifest['parts']) == 2 and manifest['rows'] == 7
+        assert manifest['watermark'] == pd.Timestamp('2025-01-01 00:25').isoformat()
+
+        df = dataset.read()
+        assert len(df) == 6 and df['open_time'].is_monotonic_increasing
+        assert df.loc[df['open_time'] == '2025-01-01 00:15', 'close'].item() == 200.0
+
+        assert dataset.compact() == 6
+        manifest = dataset.manifest()
+        assert len(manifest['parts']) == 1 and manifest['rows'] == 6
+        assert sorted(name for name in os.listdir(dataset.path) if name.endswith('.parquet')) == manifest['parts']
+        pd.testing.assert_frame_equal(dataset.read(), df)
+
+        dataset.clear()
+        assert os.listdir(dataset.path) == [] and dataset.read().empty
+
+
+def test_already_stored_skips_unchanged_rows():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = LocalDataCache(None, cache_dir=tmp_dir, compact_threshold=2)
+        dataset = cache.candles_dataset('BTCUSDT', '5m')
+        cache._append_and_read(dataset, make_candles('2025-01-01', 4))
+
+        # Повторно выгруженная последняя свеча без изменений - новый файл не пишется
+        current = dataset.read()
+        last = make_candles('2025-01-01 00:15', 1)
+        assert LocalDataCache._already_stored(dataset, current, last)
+        cache._append_and_read(dataset, last)
+        assert len(dataset.manifest()['parts']) == 1
+
+        # Изменилась цена или появилась новая свеча - строки дописываются
+        assert not LocalDataCache._already_stored(dataset, current, make_candles('2025-01-01 00:15', 1, close=101.0))
+        assert not LocalDataCache._already_stored(dataset, current, make_candles('2025-01-01 00:15', 2))
+        assert not LocalDataCache._already_stored(dataset, current, last.drop(columns=['trades']))
+        cache._append_and_read(dataset, make_candles('2025-01-01 00:15', 2, close=101.0))
+        assert len(dataset.manifest()['parts']) == 2
+
+        # Файлов больше compact_threshold - компакция
+        df = cache._append_and_read(dataset, make_candles('2025-01-01 00:25', 1))
+        assert len(dataset.manifest()['parts']) == 1
+        assert len(df) == 6 and df['close'].tolist() == [100.0] * 3 + [101.0] * 2 + [100.0]
+
+        # Без подключения sync_candles возвращает сохраненный снимок
+        pd.testing.assert_frame_equal(cache.sync_candles('BTCUSDT', '5m'), df)
+
+
+def test_check_candles_finds_gaps_and_duplicates():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = LocalDataCache(None, cache_dir=tmp_dir)
+        assert cache.check_candles('BTCUSDT', '5m')['rows'] == 0
+
+        dataset = cache.candles_dataset('BTCUSDT', '5m')
+        dataset.append(make_candles('2025-01-01', 3))
+        # Пропущены 00:15 и 00:20, 00:25 выгружена дважды в одной части
+        dataset.append(pd.concat([make_candles('2025-01-01 00:25', 2), make_candles('2025-01-01 00:25', 1)]))
+        # Перезапись последней свечи между выгрузками дубликатом не считается
+        dataset.append(make_candles('2025-01-01 00:30', 1))
+
+        report = cache.check_candles('BTCUSDT', '5m')
+        assert report['rows'] == 5
+        assert report['duplicates'] == 1
+        assert (report['gaps'], report['missing_bars']) == (1, 2)
+        assert report['first_gaps'] == [{'after': '2025-01-01T00:10:00', 'before': '2025-01-01T00:25:00'}]
+        assert (report['first'], report['last']) == ('2025-01-01T00:00:00', '2025-01-01T00:30:00')
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_import_shares_flow_tables()
+    test_append_and_compact()
+    test_already_stored_skips_unchanged_rows()
+    test_check_candles_finds_gaps_and_duplicates()
+    print("✅ Локальный кэш работает корректно")
+
+
+if __name__ == "__main__":
+    main()
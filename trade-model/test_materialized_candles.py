@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Проверка режима CANDLE_AGGREGATION=materialized (db.py) без базы данных:
+btc_candles_daily обновляется только при появлении в btc_candles свечей новее
+ее водяного знака.
+
+Запуск: python -m pytest -q test_materialized_candles.py или python test_materialized_candles.py
+"""
+
+from unittest import mock
+
+import pandas as pd
+
+import db
+
+
+def stub_manager(source_max, daily_max):
+    """Менеджер с подмененным подключением: запрос водяных знаков возвращает source_max и daily_max."""
+    with mock.patch.object(db.DatabaseManager, '_connect', lambda manager: None):
+        manager = db.DatabaseManager()
+
+    conn = mock.MagicMock()
+    conn.execute.return_value.mappings.return_value.one.return_value = {
+        'source_max_open_time': source_max,
+        'daily_max_open_time': daily_max,
+    }
+    manager.engine = mock.MagicMock()
+    manager.engine.connect.return_value.__enter__.return_value = conn
+    return manager, conn
+
+
+def load_materialized(manager) -> mock.Mock:
+    """Загрузка дневных свечей в режиме materialized; возвращает подмененный refresh_daily_candles."""
+    daily = pd.DataFrame(
+        {'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 10.0},
+        index=pd.date_range('2025-10-01', periods=3, freq='D', name='timestamp')
+    )
+    with mock.patch.object(manager, 'refresh_daily_candles') as refresh, \
+            mock.patch.object(manager, '_load_candles_materialized', return_value=daily), \
+            mock.patch.dict('os.environ', {'CANDLE_INTRADAY': 'false'}):
+        df = manager.load_bitcoin_data('BTCUSDT', 30, aggregation='materialized', bucket='1d')
+    assert len(df) == 3
+    return refresh
+
+
+def test_refresh_only_when_new_candles():
+    last_candle = pd.Timestamp('2025-10-10 23:55')
+    cases = [
+        (last_candle, pd.Timestamp('2025-10-10 23:50'), True),   # пришла новая свеча
+        (last_candle, None, True),                               # дневная таблица пуста
+        (last_candle, last_candle, False),                       # таблица актуальна
+        (None, None, False),                                     # исходных свечей нет
+    ]
+    for source_max, daily_max, expected in cases:
+        manager, conn = stub_manager(source_max, daily_max)
+        assert manager.daily_candles_stale('BTCUSDT') is expected
+
+        refresh = load_materialized(manager)
+        assert refresh.called is expected, (source_max, daily_max)
+        if expected:
+            refresh.assert_called_once_with('BTCUSDT')
+
+        # Проверка актуальности только читает и не пишет в базу
+        query = str(conn.execute.call_args.args[0])
+        assert 'SELECT' in query and 'INSERT' not in query and 'last_open_time' in query
+        assert conn.execute.call_args.args[1] == {'symbol': 'BTCUSDT'}
+        conn.commit.assert_not_called()
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_refresh_only_when_new_candles()
+    print("✅ Дневные свечи обновляются только при появлении новых данных")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Проверка формата модели booster + JSON-метаданные (model_artifact.py) и миграции из .pkl.
+
+Запуск: python -m pytest -q test_model_artifact.py или python test_model_artifact.py
+"""
+
+import os
+import sys
+import json
+import subprocess
+import tempfile
+
+import joblib
+import numpy as np
+import pytest
+
+from model_artifact import (
+    load_artifact, load_model_data, migrate, read_metadata, resolve_path, sidecar_path
+)
+from multi_horizon import MultiHorizonTrainer
+from train import BitcoinPredictor as Trainer
+from train_demo import create_synthetic_data
+from predict import BitcoinPredictor
+
+
+def train_small(data) -> Trainer:
+    """Обучение небольшой модели на data."""
+    trainer = Trainer()
+    trainer.model_params['n_estimators'] = 30
+    X, y, feature_columns = trainer.prepare_data(data)
+    trainer.feature_columns = feature_columns
+    trainer.train(X, y)
+    return trainer
+
+
+def test_round_trip_and_metadata_without_xgboost():
+    data = create_synthetic_data(300)
+    trainer = train_small(data)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.ubj')
+        trainer.save_model(model_path)
+        assert sorted(os.listdir(tmp)) == ['model.json', 'model.ubj']
+
+        metadata = read_metadata(model_path)
+        assert metadata['feature_columns'] == trainer.feature_columns
+        assert metadata['feature_config'] == trainer.feature_engineer.config()
+        assert metadata['data_fingerprint'] == trainer.data_fingerprint
+        assert metadata['boosters']['model']['bytes'] == os.path.getsize(model_path)
+
+        # Метаданные читаются без импорта xgboost
+        code = (f"import sys, model_artifact; model_artifact.read_metadata({model_path!r}); "
+                f"sys.exit('xgboost' in sys.modules)")
+        assert subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__))).returncode == 0
+
+        # Состояние дообучения восстанавливается из метаданных
+        reloaded = Trainer()
+        reloaded.load_model(model_path)
+        assert reloaded.data_end == trainer.data_end
+        assert reloaded.incremental == trainer.incremental
+        assert reloaded.data_fingerprint == trainer.data_fingerprint
+
+        result = BitcoinPredictor(model_path).predict(data)
+    X, _, _ = trainer.prepare_data(data)
+    expected = trainer.model.predict_proba(X.iloc[-1:])[0, 1]
+    assert np.isclose(result['probability_up'], expected, rtol=1e-6)
+
+
+def test_checksum_mismatch_is_rejected():
+    trainer = train_small(create_synthetic_data(300))
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.ubj')
+        trainer.save_model(model_path)
+        with open(model_path, 'r+b') as f:
+            f.seek(-8, os.SEEK_END)
+            f.write(b'\x00' * 8)
+
+        with pytest.raises(ValueError, match='Контрольная сумма'):
+            load_artifact(model_path)
+        with pytest.raises(ValueError):
+            BitcoinPredictor(model_path)
+
+
+def test_migration_and_legacy_fallback():
+    data = create_synthetic_data(300)
+    trainer = train_small(data)
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'model.pkl')
+        trainer.save_model(legacy_path)
+        assert 'model' in joblib.load(legacy_path)
+
+        # Артефакта еще нет - загружается .pkl с тем же именем
+        model_path = os.path.join(tmp, 'model.ubj')
+        assert resolve_path(model_path) == legacy_path
+        legacy = BitcoinPredictor(model_path).predict(data)
+
+        assert migrate(legacy_path) == model_path
+        assert resolve_path(model_path) == model_path
+        with open(sidecar_path(model_path), encoding='utf-8') as f:
+            assert json.load(f)['trained_at'] == joblib.load(legacy_path)['trained_at']
+        migrated = BitcoinPredictor(model_path).predict(data)
+
+    assert migrated['probability_up'] == legacy['probability_up']
+
+
+def test_multi_horizon_round_trip():
+    data = create_synthetic_data(300)
+    trainer = MultiHorizonTrainer((1, 3))
+    trainer.base.model_params['n_estimators'] = 10
+    X, targets, _ = trainer.prepare_data(data)
+    trainer.train(X, targets, workers=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.ubj')
+        trainer.save_model(model_path)
+        assert sorted(os.listdir(tmp)) == ['model.3d.ubj', 'model.json', 'model.ubj']
+
+        model_data = load_model_data(model_path)
+        assert model_data['horizons'] == [1, 3]
+        assert sorted(model_data['best_iterations']) == [1, 3]
+        assert model_data['horizon_metrics'][3]['rows'] == trainer.metrics[3]['rows']
+        for horizon in (1, 3):
+            expected = trainer.models[horizon].predict_proba(X.iloc[-5:])
+            assert np.allclose(model_data['models'][horizon].predict_proba(X.iloc[-5:]), expected)
+        assert model_data['model'] is model_data['models'][1]
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_round_trip_and_metadata_without_xgboost()
+    test_checksum_mismatch_is_rejected()
+    test_migration_and_legacy_fallback()
+    test_multi_horizon_round_trip()
+    print("✅ Формат модели и миграция работают корректно")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Проверка многогоризонтной модели (multi_horizon.py): цели горизонтов, общий артефакт, прогноз.
+
+Запуск: python -m pytest -q test_multi_horizon.py или python test_multi_horizon.py
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from multi_horizon import MultiHorizonTrainer, target_column
+from train import BitcoinPredictor as Trainer
+from train_demo import create_synthetic_data
+from predict import BitcoinPredictor
+
+
+def test_targets_match_shifted_close():
+    trainer = MultiHorizonTrainer((7, 1, 3))
+    assert trainer.horizons == [1, 3, 7]
+
+    data = create_synthetic_data(60)
+    targets = trainer.create_targets(data)
+    for horizon in trainer.horizons:
+        column = targets[target_column(horizon)]
+        expected = (data['close'].shift(-horizon) > data['close']).astype(float)
+        pd.testing.assert_series_equal(column.iloc[:-horizon], expected.iloc[:-horizon], check_names=False)
+        # Будущее закрытие неизвестно - цели нет
+        assert column.iloc[-horizon:].isna().all()
+        assert column.iloc[:-horizon].notna().all()
+
+    with pytest.raises(ValueError):
+        MultiHorizonTrainer((0, 1))
+
+
+def test_embargo_excludes_rows_before_test():
+    trainer = Trainer()
+    trainer.model_params['n_estimators'] = 10
+    X, y, feature_columns = trainer.prepare_data(create_synthetic_data(300))
+    trainer.feature_columns = feature_columns
+    split_idx = int(len(X) * 0.8)
+
+    trainer.train(X, y, gap=7)
+    assert trainer.data_end == X.index[split_idx - 8]
+    assert trainer.training['embargo_rows'] == 7
+
+    # С ранней остановкой embargo есть и перед валидационным отрезком
+    trainer.early_stopping_rounds = 5
+    trainer.train(X, y, gap=7)
+    validation_idx = int((split_idx - 7) * (1 - trainer.validation_size))
+    assert trainer.training['validation_rows'] == split_idx - 7 - validation_idx
+    assert trainer.data_end == X.index[validation_idx - 8]
+
+
+def test_parallel_training_and_all_horizons_prediction():
+    data = create_synthetic_data(400)
+    trainer = MultiHorizonTrainer((1, 3, 7))
+    trainer.base.model_params['n_estimators'] = 30
+    X, targets, _ = trainer.prepare_data(data)
+    assert len(targets) == len(X)
+
+    metrics = trainer.train(X, targets, workers=2)
+    assert sorted(metrics) == [1, 3, 7]
+    # У горизонта h последние h строк без цели
+    assert metrics[1]['rows'] - metrics[7]['rows'] == 6
+    assert [metrics[h]['embargo_rows'] for h in (1, 3, 7)] == [1, 3, 7]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        trainer.save_model(model_path)
+
+        predictor = BitcoinPredictor(model_path)
+        result = predictor.predict(data)
+        latest = predictor.predict_latest(data)
+
+        # Многогоризонтная модель дообучается только полным обучением
+        with pytest.raises(ValueError):
+            Trainer().load_model(model_path)
+
+    assert sorted(result['horizons']) == ['1d', '3d', '7d']
+    # Основной прогноз - ближайший горизонт
+    assert np.isclose(result['horizons']['1d']['probability_up'], result['probability_up'])
+    for horizon in (1, 3, 7):
+        expected = trainer.models[horizon].predict_proba(X.iloc[-1:])[0, 1]
+        assert np.isclose(result['horizons'][f'{horizon}d']['probability_up'], expected, rtol=1e-5)
+    assert sorted(latest['horizons']) == ['1d', '3d', '7d']
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_targets_match_shifted_close()
+    test_embargo_excludes_rows_before_test()
+    test_parallel_training_and_all_horizons_prediction()
+    print("✅ Многогоризонтная модель работает корректно")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Проверка сборки панели по нескольким активам (panel_loader.py) без базы данных.
+
+Запуск: python -m pytest -q test_panel_loader.py или python test_panel_loader.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from db import FLOW_ISSUERS, flow_issuers_query
+from panel_loader import build_panel
+
+
+def long_candles() -> pd.DataFrame:
+    """Свечи двух символов в длинном формате (как из panel_candles_query); у ETH нет первого дня."""
+    frames = []
+    for symbol, base, days in (('BTCUSDT', 30000.0, 5), ('ETHUSDT', 2000.0, 4)):
+        dates = pd.date_range('2024-01-01', periods=5, freq='D', tz='UTC')[5 - days:]
+        close = base + np.arange(days)
+        frames.append(pd.DataFrame({
+            'symbol': symbol, 'timestamp': dates,
+            'open': close - 1, 'high': close + 2, 'low': close - 2, 'close': close,
+            'volume': np.full(days, 10.0)
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def flow_tables() -> dict:
+    """Притоки с пропущенным днем и пустой колонкой эмитента."""
+    btc = pd.DataFrame({'date': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-04'])})
+    for column in FLOW_ISSUERS['btc_flows']:
+        btc[column] = 1.0
+    btc['total'] = [100.0, 200.0, 400.0]
+    btc['valkyrie'] = np.nan
+    eth = pd.DataFrame({'date': pd.to_datetime(['2024-01-03']), 'blackrock': [5.0], 'total': [7.0]})
+    return {'btc_flows': btc, 'eth_flow': eth}
+
+
+def test_panel_aligns_assets_and_flows():
+    panel = build_panel(long_candles(), flow_tables(), ['BTCUSDT', 'ETHUSDT', 'SOLUSDT'])
+
+    n_fields = 5 + len(FLOW_ISSUERS['btc_flows']) + 2
+    assert panel.values.shape == (3, 5, n_fields)
+    assert panel.values.dtype == np.float32
+    assert panel.dates.tz is None
+
+    close = panel.field_index('close')
+    assert np.isnan(panel.values[1, 0, close])          # ETH без первого дня
+    assert panel.values[1, 1, close] == 2000.0
+    assert not np.isnan(panel.values[2]).all()           # притоки есть и у SOL
+    assert np.isnan(panel.values[2, :, close]).all()     # свечей SOL нет
+
+    total = panel.field_index('btc_flows.total')
+    np.testing.assert_array_equal(panel.values[0, :, total], [100, 200, 0, 400, 0])
+    np.testing.assert_array_equal(panel.values[0, :, total], panel.values[1, :, total])
+    assert (panel.values[:, :, panel.field_index('btc_flows.valkyrie')] == 0).all()
+
+    eth = panel.asset_frame('ETHUSDT')
+    assert len(eth) == 4
+    assert eth['etf_flow'].tolist() == [0.0, 7.0, 0.0, 0.0]
+    assert panel.fields[total] == {'name': 'btc_flows.total', 'source': 'btc_flows', 'column': 'total'}
+    assert panel.metadata()['dates']['count'] == 5
+
+
+def test_issuer_columns_are_quoted():
+    query = str(flow_issuers_query('btc_flows'))
+    assert '"twentyOneShares"' in query and '"grayscaleBtc"' in query
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_panel_aligns_assets_and_flows()
+    test_issuer_columns_are_quoted()
+    print("✅ Панель собирается корректно")
+
+
+if __name__ == "__main__":
+    main()
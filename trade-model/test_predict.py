@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Проверки пути предсказания на синтетических данных (без базы данных).
+
+Запуск: python -m pytest -q test_predict.py или python test_predict.py
+"""
+
+import io
+import os
+import json
+import tempfile
+from unittest import mock
+
+from features import FeatureEngineer
+from train import BitcoinPredictor as Trainer
+from train_demo import create_synthetic_data
+from predict import BitcoinPredictor, load_model, parse_args, predict_ndjson, run_ndjson
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'etf_model_v1.ubj')
+
+
+def train_synthetic_model(model_path: str, days: int = 400) -> None:
+    """Обучение небольшой модели на синтетических данных."""
+    data = create_synthetic_data(days)
+    trainer = Trainer()
+    trainer.model_params['n_estimators'] = 50
+    X, y, feature_columns = trainer.prepare_data(data)
+    trainer.feature_columns = feature_columns
+    trainer.train(X, y)
+    trainer.save_model(model_path)
+
+
+def check_latest_only_matches_full_history(model_path: str, tolerance: float = 1e-6) -> float:
+    """Сравнение predict_latest с расчетом по всей истории на нескольких срезах."""
+    predictor = BitcoinPredictor(model_path)
+    data = create_synthetic_data(700)
+
+    max_diff = 0.0
+    for end in (350, 420, 555, 700):
+        history = data.iloc[:end]
+        full = predictor.predict(history)
+        latest = predictor.predict(history, latest_only=True)
+
+        diff = abs(full['probability_up'] - latest['probability_up'])
+        assert diff <= tolerance, f"Расхождение {diff} на срезе {end}"
+        assert full['prediction'] == latest['prediction']
+        assert latest['data_points_used'] == predictor.feature_engineer.tail_window()
+        max_diff = max(max_diff, diff)
+
+    return max_diff
+
+
+def test_latest_only_matches_full_history(tmp_path):
+    model_path = os.path.join(str(tmp_path), 'model.pkl')
+    train_synthetic_model(model_path)
+    check_latest_only_matches_full_history(model_path)
+
+
+def test_tail_window_covers_longest_indicator():
+    engineer = FeatureEngineer()
+
+    assert engineer.min_history() >= engineer.ma_long_window
+    assert engineer.tail_window(macd_warmup=0) == engineer.min_history()
+    assert engineer.tail_window(macd_warmup=500) == 500
+
+
+def ndjson_lines() -> list:
+    """Пакет NDJSON: корректные строки с id и без, пустая, не JSON и не объект."""
+    payload = create_synthetic_data(60).reset_index()
+    payload['timestamp'] = payload['timestamp'].astype(str)
+    payload = payload.to_dict(orient='list')
+    return [
+        json.dumps(dict(payload, id='first')),
+        '',
+        '{"close": [1, 2',
+        '[1, 2, 3]',
+        json.dumps(payload),
+    ]
+
+
+def test_ndjson_one_output_line_per_input():
+    output = io.StringIO()
+    input_stream = io.StringIO('\n'.join(ndjson_lines()) + '\n')
+    succeeded, failed = predict_ndjson(load_model(MODEL_PATH), input_stream, output)
+    assert (succeeded, failed) == (2, 3)
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record['line'] for record in records] == [1, 2, 3, 4, 5]
+    assert [record['success'] for record in records] == [True, False, False, False, True]
+
+    # id возвращается без изменений, у строки без id поля нет
+    assert records[0]['id'] == 'first' and 'id' not in records[4]
+    assert 0.0 <= records[0]['result']['probability_up'] <= 1.0
+    assert 'feature_importance' not in records[0]['result']
+    assert records[0]['result']['probability_up'] == records[4]['result']['probability_up']
+
+    assert records[1]['error'] == "Пустая строка"
+    assert records[2]['error'].startswith("Expecting")
+    assert records[3]['error'] == "Ожидается JSON-объект со списками значений"
+    assert all('result' not in record for record in records[1:4])
+
+
+def test_run_ndjson_exit_code():
+    lines = ndjson_lines()
+    with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.dict(os.environ, {'METRICS_TEXTFILE': ''}):
+        input_path = os.path.join(tmp_dir, 'payloads.ndjson')
+        output_path = os.path.join(tmp_dir, 'results.ndjson')
+
+        for batch, expected_code, expected_lines in ((lines, 1, 5), ([lines[0], lines[4]], 0, 2)):
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(batch) + '\n')
+            args = parse_args(['--ndjson', input_path, '--output', output_path, '--model', MODEL_PATH])
+            assert run_ndjson(args) == expected_code
+            with open(output_path, 'r', encoding='utf-8') as f:
+                assert len(f.read().splitlines()) == expected_lines
+
+
+def main():
+    """Запуск проверок без pytest."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, 'model.pkl')
+        train_synthetic_model(model_path)
+        max_diff = check_latest_only_matches_full_history(model_path)
+        print(f"✅ predict_latest совпадает с полным расчетом (макс. расхождение {max_diff:.2e})")
+    test_ndjson_one_output_line_per_input()
+    test_run_ndjson_exit_code()
+    print("✅ Пакетный режим NDJSON работает корректно")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Проверка кэша прогнозов (prediction_cache.py): уровни памяти и диска, LRU,
+вытеснение файлов, смена водяного знака, счетчики; порядок запросов к базе
+в predict_from_database.
+
+Запуск: python -m pytest -q test_prediction_cache.py или python test_prediction_cache.py
+"""
+
+import os
+import tempfile
+from unittest import mock
+
+import db
+import predict
+from prediction_cache import PredictionCache
+from train_demo import create_synthetic_data
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'etf_model_v1.ubj')
+
+
+def test_memory_and_disk_tiers():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = PredictionCache(cache_dir=cache_dir, max_entries=2, max_files=10)
+        assert cache.get('a') is None
+        cache.put('a', {'probability_up': 0.6})
+
+        # Возвращается копия: изменение результата не портит кэш
+        hit = cache.get('a')
+        hit['probability_up'] = 0.0
+        assert cache.get('a') == {'probability_up': 0.6}
+
+        # Новый процесс (пустая память) читает файл и поднимает запись в память
+        restarted = PredictionCache(cache_dir=cache_dir, max_entries=2, max_files=10)
+        assert restarted.get('a') == {'probability_up': 0.6}
+        assert restarted.get('a') == {'probability_up': 0.6}
+        stats = restarted.stats()
+        assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 0)
+
+        stats = cache.stats()
+        assert (stats['memory_hits'], stats['disk_hits'], stats['misses'], stats['stores']) == (2, 0, 1, 1)
+        assert stats['hit_rate'] == 2 / 3
+
+        cache.clear()
+        assert os.listdir(cache_dir) == []
+        assert cache.get('a') is None
+
+
+def test_lru_and_file_eviction():
+    cache = PredictionCache(cache_dir='', max_entries=2)
+    cache.put('a', {'value': 1})
+    cache.put('b', {'value': 2})
+    cache.get('a')
+    # Давно использованная запись 'b' вытесняется из памяти
+    cache.put('c', {'value': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'value': 1} and cache.get('c') == {'value': 3}
+    assert cache.stats()['memory_evictions'] == 1
+    assert cache.stats()['memory_entries'] == 2
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = PredictionCache(cache_dir=cache_dir, max_entries=10, max_files=2)
+        for age, key in enumerate(('old', 'mid')):
+            cache.put(key, {'key': key})
+            os.utime(os.path.join(cache_dir, f'{key}.json'), (1000 + age, 1000 + age))
+        cache.put('new', {'key': 'new'})
+        assert sorted(os.listdir(cache_dir)) == ['mid.json', 'new.json']
+        assert cache.stats()['disk_evictions'] == 1
+
+
+def test_watermark_changes_key():
+    watermark = {'candles_max_open_time': '2025-10-10T23:55:00', 'flows_max_date': '2025-10-10'}
+    key = PredictionCache.make_key(watermark=watermark, model={'sha256': 'x'}, request={'symbol': 'BTCUSDT'})
+    # Порядок полей не влияет на ключ, новая свеча - влияет
+    assert key == PredictionCache.make_key(request={'symbol': 'BTCUSDT'}, model={'sha256': 'x'}, watermark=watermark)
+    moved = dict(watermark, candles_max_open_time='2025-10-11T00:00:00')
+    assert key != PredictionCache.make_key(watermark=moved, model={'sha256': 'x'}, request={'symbol': 'BTCUSDT'})
+
+
+def test_cache_checked_before_available_days():
+    watermark = {'candles_max_open_time': '2025-10-10T23:55:00'}
+    manager = mock.Mock(**{'get_data_watermark.side_effect': lambda symbol: dict(watermark)})
+    loader = mock.Mock(return_value=create_synthetic_data(200))
+    available_days = mock.Mock(return_value=150)
+
+    with mock.patch.dict(os.environ, {'FEATURE_STORE': 'false', 'PREDICTION_CACHE_DIR': ''}), \
+            mock.patch.object(db, 'get_database_manager', return_value=manager), \
+            mock.patch.object(db, 'load_training_data', loader), \
+            mock.patch.object(predict, 'get_available_days', available_days):
+        first = predict.predict_from_database(MODEL_PATH, use_cache=True)
+        assert not first['cached'] and first['data_info']['lookback_days'] == 150
+
+        predictor = predict.load_model(MODEL_PATH, use_cache=True)
+        predictor.cache = PredictionCache(cache_dir='')
+        predictor.predict_from_database(lookback_days=None)
+        available_days.reset_mock()
+        loader.reset_mock()
+
+        # Попадание: только запрос водяного знака, без подсчета дней и загрузки данных
+        cached = predictor.predict_from_database(lookback_days=None)
+        assert cached['cached']
+        available_days.assert_not_called()
+        loader.assert_not_called()
+
+        # Новая свеча - промах, дни и данные запрашиваются заново
+        watermark['candles_max_open_time'] = '2025-10-11T00:00:00'
+        assert not predictor.predict_from_database(lookback_days=None)['cached']
+        available_days.assert_called_once()
+        loader.assert_called_once_with(symbol='BTCUSDT', lookback_days=150)
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_memory_and_disk_tiers()
+    test_lru_and_file_eviction()
+    test_watermark_changes_key()
+    test_cache_checked_before_available_days()
+    print("✅ Кэш прогнозов работает корректно")
+
+
+if __name__ == "__main__":
+    main()
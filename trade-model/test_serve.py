@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Проверка резидентного сервера прогнозов (serve.py) по HTTP в том же процессе
+и повторного подключения к базе данных (db.get_database_manager).
+
+База данных подменяется: загрузчик возвращает синтетические данные.
+
+Запуск: python -m pytest -q test_serve.py или python test_serve.py
+"""
+
+import os
+import json
+import threading
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from unittest import mock
+
+import db
+import serve
+from train_demo import create_synthetic_data
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'etf_model_v1.ubj')
+
+
+class StubDatabaseManager:
+    """Менеджер базы данных без подключения: постоянный водяной знак данных."""
+
+    def is_connected(self) -> bool:
+        return True
+
+    def use_local_cache(self) -> bool:
+        return False
+
+    def get_data_watermark(self, symbol: str = 'BTCUSDT'):
+        return {'candles_max_open_time': '2025-10-10T23:55:00', 'flows_max_date': '2025-10-10T00:00:00',
+                'flows_updated_at': '2025-10-11T08:00:00'}
+
+
+@contextmanager
+def running_server(loads: list):
+    """Сервер на свободном порту с подмененной базой данных; loads - вызовы загрузчика."""
+    data = create_synthetic_data(200)
+
+    def load_training_data(symbol='BTCUSDT', lookback_days=365):
+        loads.append((symbol, lookback_days))
+        return data
+
+    manager = StubDatabaseManager()
+    env = {'FEATURE_STORE': 'false', 'PREDICTION_CACHE': 'true', 'PREDICTION_CACHE_DIR': ''}
+    with mock.patch.dict(os.environ, env), \
+            mock.patch.object(db, 'get_database_manager', return_value=manager), \
+            mock.patch.object(serve, 'get_database_manager', return_value=manager), \
+            mock.patch.object(db, 'load_training_data', load_training_data):
+        service = serve.PredictionService(MODEL_PATH)
+        server = serve.create_server(service, '127.0.0.1', 0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{server.server_address[1]}"
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def request(url: str, payload=None):
+    """HTTP-запрос к серверу: (статус, JSON ответа или текст)."""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            status, text = response.status, response.read().decode('utf-8')
+    except urllib.error.HTTPError as e:
+        status, text = e.code, e.read().decode('utf-8')
+    try:
+        return status, json.loads(text)
+    except ValueError:
+        return status, text
+
+
+def test_http_routes():
+    loads = []
+    with running_server(loads) as base:
+        status, health = request(f"{base}/health")
+        assert status == 200 and health['data']['model_loaded'] and health['data']['db_connected']
+
+        status, info = request(f"{base}/api/ml/model-info")
+        assert status == 200 and info['data']['features_count'] == 25
+
+        # Повторный запрос при неизменном водяном знаке - из кэша, без загрузки данных
+        status, first = request(f"{base}/predict?lookback_days=60")
+        assert status == 200 and first['success'] and not first['data']['cached']
+        status, second = request(f"{base}/predict?lookback_days=60")
+        assert second['data']['cached']
+        assert second['data']['probability_up'] == first['data']['probability_up']
+        assert loads == [('BTCUSDT', 60)]
+
+        payload = create_synthetic_data(60).reset_index()
+        payload['timestamp'] = payload['timestamp'].astype(str)
+        status, posted = request(f"{base}/predict", payload.to_dict(orient='list'))
+        assert status == 200 and 0.0 <= posted['data']['probability_up'] <= 1.0
+
+        status, error = request(f"{base}/predict", [1, 2, 3])
+        assert status == 400 and not error['success']
+        status, error = request(f"{base}/unknown")
+        assert status == 404
+
+        status, metrics = request(f"{base}/metrics")
+        assert status == 200 and 'predict_proba' in metrics
+
+
+def test_database_manager_reconnects():
+    available = {'up': False}
+
+    def connect(manager):
+        manager.last_connect_attempt = 0.0
+        manager.engine = object() if available['up'] else None
+
+    with mock.patch.object(db.DatabaseManager, '_connect', connect), \
+            mock.patch.object(db, '_db_manager', None), \
+            mock.patch.dict(os.environ, {'DB_RECONNECT_INTERVAL': '0', 'DATA_SOURCE': 'db'}):
+        # База недоступна при старте сервера
+        manager = db.get_database_manager()
+        assert not manager.is_connected()
+        assert not db.get_database_manager().is_connected()
+
+        # База поднялась: следующий запрос подключается тем же менеджером
+        available['up'] = True
+        assert db.get_database_manager() is manager
+        assert manager.is_connected()
+
+        # Повторы не чаще DB_RECONNECT_INTERVAL
+        manager.engine = None
+        manager.last_connect_attempt = float('inf')
+        with mock.patch.dict(os.environ, {'DB_RECONNECT_INTERVAL': '60'}):
+            assert not db.get_database_manager().is_connected()
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_http_routes()
+    test_database_manager_reconnects()
+    print("✅ Сервер прогнозов работает корректно")
+
+
+if __name__ == "__main__":
+    main()
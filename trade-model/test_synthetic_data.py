@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Проверка генератора синтетических данных (synthetic_data.py): воспроизводимость,
+согласованность OHLC и потоковая запись в Parquet.
+
+Запуск: python -m pytest -q test_synthetic_data.py или python test_synthetic_data.py
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import COLUMNS, SyntheticMarket
+
+
+def test_generator_is_reproducible_and_consistent():
+    market = SyntheticMarket(seed=7, freq='5min', regime_days=2)
+    data = market.generate(market.periods(30), chunk_rows=1000)
+
+    assert len(data) == 30 * 288
+    assert list(data.columns) == COLUMNS
+    assert data.index.is_monotonic_increasing and data.index.is_unique
+    assert (data.index[1:] - data.index[:-1] == pd.Timedelta('5min')).all()
+    pd.testing.assert_frame_equal(data, market.generate(len(data), chunk_rows=1000))
+
+    # Тени охватывают тело свечи, open равен предыдущему close
+    assert (data['low'] <= data[['open', 'close']].min(axis=1)).all()
+    assert (data['high'] >= data[['open', 'close']].max(axis=1)).all()
+    assert (data['open'].iloc[1:].to_numpy() == data['close'].iloc[:-1].to_numpy()).all()
+    assert (data['volume'] > 0).all()
+
+    returns = np.log(data['close'] / data['open'])
+    assert np.corrcoef(returns, data['etf_flow'])[0, 1] > 0.3
+    assert not data.equals(SyntheticMarket(seed=8, freq='5min').generate(len(data), chunk_rows=1000))
+
+
+def test_parquet_stream_matches_memory():
+    market = SyntheticMarket(seed=3, freq='1min')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'candles.parquet')
+        assert market.to_parquet(path, 5000, chunk_rows=1200) == 5000
+        stored = pd.read_parquet(path).set_index('timestamp')
+
+    expected = market.generate(5000, chunk_rows=1200)
+    pd.testing.assert_frame_equal(stored, expected, check_freq=False, check_index_type=False)
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_generator_is_reproducible_and_consistent()
+    test_parquet_stream_matches_memory()
+    print("✅ Генератор синтетических данных работает корректно")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Проверка подбора гиперпараметров (tune.py): ступени halving, пул процессов, метаданные модели.
+
+Запуск: python -m pytest -q test_tune.py или python test_tune.py
+"""
+
+import os
+import tempfile
+
+import joblib
+import pytest
+
+from train import BitcoinPredictor
+from train_demo import create_synthetic_data
+from tune import HyperparameterSearch, halving_schedule, inner_split
+
+
+def test_halving_schedule_and_budget():
+    assert halving_schedule(500, 25, 3) == [55, 166, 500]
+    assert halving_schedule(100, 100, 3) == [100]
+    # Ранняя остановка - по концу обучающей части фолда (после пропуска gap строк)
+    assert inner_split(0, 100, 0.2, 1) == (79, 80)
+
+    predictor = BitcoinPredictor()
+    X, y, _ = predictor.prepare_data(create_synthetic_data(400))
+
+    # Бюджет исчерпан до старта поиска: ни одна проба не запускается
+    search = HyperparameterSearch(predictor.model_params, n_trials=3, max_rounds=20,
+                                  workers=1, budget_seconds=1e-9)
+    with pytest.raises(TimeoutError):
+        search.run(X, y)
+
+
+def test_parallel_search_matches_sequential_and_saves_params():
+    predictor = BitcoinPredictor()
+    X, y, feature_columns = predictor.prepare_data(create_synthetic_data(500))
+
+    options = dict(n_trials=6, max_rounds=60, min_rounds=20, early_stopping=10, n_splits=2)
+    sequential = HyperparameterSearch(predictor.model_params, workers=1, **options).run(X, y)
+    parallel = HyperparameterSearch(predictor.model_params, workers=2, **options).run(X, y)
+
+    assert sequential['schedule'] == [20, 60]
+    assert parallel['workers'] == 2
+    assert parallel['best_params'] == sequential['best_params']
+    # На последнюю ступень переходит 1/3 проб
+    assert sum(trial['rounds'] == 60 for trial in sequential['trials']) == 2
+    assert 1 <= sequential['best_params']['n_estimators'] <= 60
+
+    # Лучшие параметры применяются к модели и сохраняются в метаданных
+    tuning = predictor.tune(X, y, HyperparameterSearch(predictor.model_params, workers=1, **options))
+    # Фолды поиска не затрагивают тестовую выборку train()
+    split_idx = int(len(X) * 0.8)
+    assert tuning['rows'] == split_idx
+    assert all(test_end <= split_idx for _, _, _, test_end in tuning['folds'])
+    assert predictor.model_params['max_depth'] == tuning['best_params']['max_depth']
+    predictor.feature_columns = feature_columns
+    predictor.train(X, y)
+    assert predictor.model.n_estimators == tuning['best_params']['n_estimators']
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        predictor.save_model(model_path)
+        saved = joblib.load(model_path)
+    assert saved['tuning']['best_params'] == tuning['best_params']
+    assert saved['model_params']['learning_rate'] == tuning['best_params']['learning_rate']
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_halving_schedule_and_budget()
+    test_parallel_search_matches_sequential_and_saves_params()
+    print("✅ Подбор гиперпараметров работает корректно")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Проверка walk-forward оценки (walk_forward.py): границы фолдов и параллельное обучение.
+
+Запуск: python -m pytest -q test_walk_forward.py или python test_walk_forward.py
+"""
+
+import os
+import tempfile
+
+import joblib
+import pytest
+
+from train import BitcoinPredictor
+from train_demo import create_synthetic_data
+from walk_forward import walk_forward_evaluate, walk_forward_splits
+
+
+def test_splits_are_chronological_with_gap():
+    splits = walk_forward_splits(600, n_splits=5, gap=2)
+    assert len(splits) == 5
+    for train_start, train_end, test_start, test_end in splits:
+        assert train_start == 0
+        assert test_start - train_end == 2
+        assert test_end - test_start == 100
+    assert [split[2] for split in splits] == [100, 200, 300, 400, 500]
+    assert splits[-1][3] == 600
+
+    sliding = walk_forward_splits(600, n_splits=5, gap=2, window='sliding', train_size=80)
+    assert all(train_end - train_start == 80 for train_start, train_end, _, _ in sliding)
+
+    # Фолды с обучающей выборкой меньше min_train пропускаются
+    assert len(walk_forward_splits(300, n_splits=5, gap=1, min_train=60)) == 4
+    with pytest.raises(ValueError):
+        walk_forward_splits(600, window='random')
+
+
+def test_parallel_folds_match_sequential():
+    predictor = BitcoinPredictor()
+    predictor.model_params['n_estimators'] = 30
+    X, y, feature_columns = predictor.prepare_data(create_synthetic_data(500))
+
+    sequential = walk_forward_evaluate(X, y, predictor.model_params, n_splits=4, workers=1)
+    parallel = walk_forward_evaluate(X, y, predictor.model_params, n_splits=4, workers=2, threads_per_fold=1)
+
+    assert parallel['workers'] == 2 and parallel['threads_per_fold'] == 1
+    assert len(parallel['folds']) == 4
+    for left, right in zip(sequential['folds'], parallel['folds']):
+        assert left['test_start'] == right['test_start']
+        assert left['accuracy'] == right['accuracy']
+        assert left['logloss'] == pytest.approx(right['logloss'], rel=1e-6)
+    assert 0.0 <= parallel['aggregate']['accuracy_mean'] <= 1.0
+
+    # Средние метрики сохраняются в метаданных модели
+    predictor.feature_columns = feature_columns
+    predictor.walk_forward = sequential
+    predictor.train(X, y)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        predictor.save_model(model_path)
+        saved = joblib.load(model_path)['walk_forward']
+    assert saved['aggregate'] == sequential['aggregate']
+    assert saved['config']['n_splits'] == 4
+
+
+def main():
+    """Запуск проверок без pytest."""
+    test_splits_are_chronological_with_gap()
+    test_parallel_folds_match_sequential()
+    print("✅ Walk-forward оценка работает корректно")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,21 +3,29 @@
 """
 
 import os
+import sys
+import time
+import argparse
 import pandas as pd
-import numpy as np
 from datetime import datetime
 import logging
 from typing import Tuple, Optional
-import joblib
 from dotenv import load_dotenv
 
 # ML libraries
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, roc_auc_score, classification_report
+from sklearn.metrics import accuracy_score, roc_auc_score, classification_report, log_loss
 import xgboost as xgb
 
 # Local imports
-from db import load_training_data, get_database_manager
+from db import load_training_data, close_database_manager
+from features import FeatureEngineer
+from feature_store import FeatureStore, feature_store_from_env
+from intraday import INTRADAY_FEATURES
+from dtype_policy import MemoryReport
+from instrumentation import collect, span, write_textfile
+from walk_forward import walk_forward_evaluate, walk_forward_from_env, print_report
+from tune import METHODS, HyperparameterSearch, print_report as print_tuning_report
+from model_artifact import data_fingerprint, load_model_data, resolve_path, save_model_data
 
 # Настройка логирования
 logging.basicConfig(
@@ -30,119 +38,52 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 
-class FeatureEngineer:
-    """Класс для создания признаков из сырых данных."""
+class TimeBudget(xgb.callback.TrainingCallback):
+    """Остановка обучения XGBoost по истечении бюджета времени."""
     
-    def __init__(self):
-        """Инициализация параметров для создания признаков."""
-        self.volatility_window = int(os.getenv('VOLATILITY_WINDOW', '7'))
-        self.ma_short_window = int(os.getenv('MA_SHORT_WINDOW', '7'))
-        self.ma_long_window = int(os.getenv('MA_LONG_WINDOW', '30'))
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.deadline = None
+        self.stopped_at = None
     
-    def create_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """
-        Создание признаков для модели машинного обучения.
-        
-        Args:
-            df: DataFrame с данными OHLCV и ETF потоками
-            
-        Returns:
-            DataFrame с созданными признаками
-        """
-        logger.info("Создание признаков...")
-        
-        # Создаем копию для безопасности
-        features_df = df.copy()
-        
-        # 1. Returns (доходность)
-        features_df['return_prev'] = features_df['close'].pct_change(1)
-        features_df['return_3d'] = features_df['close'].pct_change(3)
-        features_df['return_7d'] = features_df['close'].pct_change(7)
-        
-        # 2. Volatility (волатильность)
-        features_df['volatility'] = features_df['return_prev'].rolling(
-            window=self.volatility_window
-        ).std()
-        
-        # 3. Moving Averages (скользящие средние)
-        features_df['ma_7'] = features_df['close'].rolling(
-            window=self.ma_short_window
-        ).mean()
-        features_df['ma_30'] = features_df['close'].rolling(
-            window=self.ma_long_window
-        ).mean()
-        
-        # 4. Price relative to moving averages
-        features_df['price_to_ma7'] = features_df['close'] / features_df['ma_7'].replace(0, 1)
-        features_df['price_to_ma30'] = features_df['close'] / features_df['ma_30'].replace(0, 1)
-        features_df['ma7_to_ma30'] = features_df['ma_7'] / features_df['ma_30'].replace(0, 1)
-        
-        # 5. High-Low spread
-        features_df['hl_spread'] = (features_df['high'] - features_df['low']) / features_df['close']
-        
-        # 6. Volume features
-        features_df['volume_ma7'] = features_df['volume'].rolling(
-            window=self.ma_short_window
-        ).mean()
-        features_df['volume_ratio'] = features_df['volume'] / features_df['volume_ma7'].replace(0, 1)
-        
-        # 7. ETF Flow features
-        if 'etf_flow' in features_df.columns:
-            features_df['etf_flow_change'] = features_df['etf_flow'].pct_change(1)
-            features_df['etf_flow_ma7'] = features_df['etf_flow'].rolling(
-                window=self.ma_short_window
-            ).mean()
-            # Избегаем деления на ноль
-            features_df['etf_flow_ratio'] = features_df['etf_flow'] / features_df['etf_flow_ma7'].replace(0, 1)
-        else:
-            # Если нет данных ETF, заполняем нулями
-            features_df['etf_flow_change'] = 0
-            features_df['etf_flow_ma7'] = 0
-            features_df['etf_flow_ratio'] = 0
-        
-        # 8. Lag features (лаговые признаки)
-        for lag in [1, 2, 3]:
-            features_df[f'return_lag_{lag}'] = features_df['return_prev'].shift(lag)
-            features_df[f'volume_lag_{lag}'] = features_df['volume'].shift(lag)
-            if 'etf_flow' in features_df.columns:
-                features_df[f'etf_flow_lag_{lag}'] = features_df['etf_flow'].shift(lag)
-        
-        # 9. Technical indicators
-        features_df['rsi'] = self._calculate_rsi(features_df['close'])
-        features_df['macd'], features_df['macd_signal'] = self._calculate_macd(features_df['close'])
-        
-        # 10. Очистка от бесконечных значений
-        features_df = features_df.replace([np.inf, -np.inf], np.nan)
-        
-        logger.info(f"Создано {len(features_df.columns)} признаков")
-        return features_df
-    
-    def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
-        """Расчет RSI (Relative Strength Index)."""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+    def before_training(self, model):
+        self.deadline = time.perf_counter() + self.seconds
+        return model
     
-    def _calculate_macd(self, prices: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[pd.Series, pd.Series]:
-        """Расчет MACD (Moving Average Convergence Divergence)."""
-        ema_fast = prices.ewm(span=fast).mean()
-        ema_slow = prices.ewm(span=slow).mean()
-        macd = ema_fast - ema_slow
-        macd_signal = macd.ewm(span=signal).mean()
-        return macd, macd_signal
+    def after_iteration(self, model, epoch: int, evals_log) -> bool:
+        if time.perf_counter() > self.deadline:
+            self.stopped_at = epoch + 1
+            return True
+        return False
+
+
+def incremental_from_env() -> dict:
+    """Параметры дообучения из INCREMENTAL_*."""
+    return {
+        'rounds': int(os.getenv('INCREMENTAL_ROUNDS', '10')),
+        'replay_rows': int(os.getenv('INCREMENTAL_REPLAY_ROWS', '90')),
+        'max_updates': int(os.getenv('INCREMENTAL_MAX_UPDATES', '30')),
+        'tolerance': float(os.getenv('INCREMENTAL_TOLERANCE', '0.05')),
+        'min_eval_rows': int(os.getenv('INCREMENTAL_MIN_EVAL_ROWS', '20')),
+    }
 
 
 class BitcoinPredictor:
     """Класс для обучения и использования модели предсказания Биткоина."""
     
-    def __init__(self):
-        """Инициализация модели."""
+    def __init__(self, feature_store: Optional[FeatureStore] = None):
+        """
+        Инициализация модели.
+        
+        Args:
+            feature_store: Хранилище матриц признаков (опционально)
+        """
         self.model = None
         self.feature_columns = None
         self.feature_engineer = FeatureEngineer()
+        self.feature_store = feature_store
+        self.walk_forward = None
+        self.tuning = None
         
         # Параметры модели из переменных окружения
         self.model_params = {
@@ -151,8 +92,28 @@ class BitcoinPredictor:
             'learning_rate': float(os.getenv('XGB_LEARNING_RATE', '0.05')),
             'random_state': int(os.getenv('XGB_RANDOM_STATE', '42')),
             'eval_metric': 'logloss',
-            'objective': 'binary:logistic'
+            'objective': 'binary:logistic',
+            'tree_method': os.getenv('XGB_TREE_METHOD', 'hist')
         }
+        
+        # Ранняя остановка на валидационном отрезке перед тестовым (0 - отключена),
+        # бюджет времени обучения и число потоков XGBoost
+        time_budget = os.getenv('XGB_TIME_BUDGET_SECONDS')
+        n_jobs = os.getenv('XGB_N_JOBS')
+        self.early_stopping_rounds = int(os.getenv('XGB_EARLY_STOPPING_ROUNDS', '0'))
+        self.validation_size = float(os.getenv('XGB_VALIDATION_SIZE', '0.15'))
+        self.time_budget = float(time_budget) if time_budget else None
+        self.n_jobs = int(n_jobs) if n_jobs else None
+        self.best_iteration = None
+        self.training = None
+        
+        # Состояние дообучения: последняя строка, на которой обучалась модель,
+        # logloss тестовой части при полном обучении и счетчики дообучений с него
+        self.data_end = None
+        # Отпечаток данных последнего полного обучения
+        self.data_fingerprint = None
+        self.reference_logloss = None
+        self.incremental = None
     
     def create_target(self, df: pd.DataFrame) -> pd.Series:
         """
@@ -168,24 +129,17 @@ class BitcoinPredictor:
         target = (df['close'].shift(-1) > df['close']).astype(int)
         return target
     
-    def prepare_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, list]:
+    def build_features(self, df: pd.DataFrame, symbol: Optional[str] = None) -> Tuple[pd.DataFrame, list]:
         """
-        Подготовка данных для обучения модели.
+        Расчет признаков модели (строки прогрева с NaN не удаляются).
         
         Args:
             df: Исходный DataFrame
+            symbol: Символ торговой пары (ключ хранилища признаков)
             
         Returns:
-            Tuple с признаками, целевой переменной и списком названий признаков
+            Tuple с DataFrame признаков и списком доступных признаков модели
         """
-        logger.info("Подготовка данных для обучения...")
-        
-        # Создание признаков
-        features_df = self.feature_engineer.create_features(df)
-        
-        # Создание целевой переменной
-        target = self.create_target(features_df)
-        
         # Выбор признаков для модели
         feature_columns = [
             'return_prev', 'return_3d', 'return_7d',
@@ -198,32 +152,70 @@ class BitcoinPredictor:
             'etf_flow_lag_1', 'etf_flow_lag_2', 'etf_flow_lag_3',
             'rsi', 'macd', 'macd_signal'
         ]
+        # Внутридневные статистики свечей (CANDLE_INTRADAY=true) - если есть в данных
+        feature_columns += INTRADAY_FEATURES
+        
+        # Создание признаков (через хранилище, если оно подключено и известен символ;
+        # иначе - только подграф зависимостей выбранных признаков)
+        if self.feature_store is not None and symbol is not None:
+            features_df = self.feature_store.get_features(df, self.feature_engineer, symbol)
+        else:
+            features_df = self.feature_engineer.create_features(df, columns=feature_columns)
         
         # Фильтрация существующих признаков
         available_features = [col for col in feature_columns if col in features_df.columns]
+        return features_df, available_features
+    
+    def prepare_data(self, df: pd.DataFrame, symbol: Optional[str] = None) -> Tuple[pd.DataFrame, pd.Series, list]:
+        """
+        Подготовка данных для обучения модели.
         
-        # Создание финального датасета
-        X = features_df[available_features].copy()
-        y = target.copy()
-        
-        # Удаление строк с NaN
-        valid_idx = ~(X.isnull().any(axis=1) | y.isnull())
-        X = X[valid_idx]
-        y = y[valid_idx]
+        Args:
+            df: Исходный DataFrame
+            symbol: Символ торговой пары (ключ хранилища признаков)
+            
+        Returns:
+            Tuple с признаками, целевой переменной и списком названий признаков
+        """
+        logger.info("Подготовка данных для обучения...")
         
-        logger.info(f"Подготовлено {len(X)} образцов с {len(available_features)} признаками")
-        logger.info(f"Распределение классов: {y.value_counts().to_dict()}")
+        with span('prepare_data', rows=len(df)) as stage:
+            features_df, available_features = self.build_features(df, symbol)
+            
+            # Создание целевой переменной
+            target = self.create_target(features_df)
+            
+            # Создание финального датасета
+            # Выбор колонок уже создает новый DataFrame, отдельная копия не нужна
+            X = features_df[available_features]
+            y = target
+            
+            # Удаление строк с NaN
+            valid_idx = ~(X.isnull().any(axis=1) | y.isnull())
+            X = X[valid_idx]
+            y = y[valid_idx]
+            
+            logger.info(f"Подготовлено {len(X)} образцов с {len(available_features)} признаками")
+            logger.info(f"Распределение классов: {y.value_counts().to_dict()}")
+            
+            stage.record(X)
         
         return X, y, available_features
     
-    def train(self, X: pd.DataFrame, y: pd.Series, test_size: float = 0.2) -> dict:
+    def train(self, X: pd.DataFrame, y: pd.Series, test_size: float = 0.2, gap: int = 0) -> dict:
         """
         Обучение модели XGBoost.
         
+        При early_stopping_rounds > 0 последние validation_size обучающей части
+        отделяются для ранней остановки; метрики по-прежнему считаются на
+        тестовой части, которую модель при обучении не видит.
+        
         Args:
             X: Признаки
             y: Целевая переменная
             test_size: Размер тестовой выборки
+            gap: Пропуск строк перед тестовой (и валидационной) частью (embargo):
+                цели последних строк обучения не должны зависеть от цен теста
             
         Returns:
             Словарь с метриками модели
@@ -232,34 +224,91 @@ class BitcoinPredictor:
         
         # Разделение на train/test (без перемешивания для временных рядов)
         split_idx = int(len(X) * (1 - test_size))
-        X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
-        y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
-        
+        train_end = max(0, split_idx - gap)
+        X_train, X_test = X.iloc[:train_end], X.iloc[split_idx:]
+        y_train, y_test = y.iloc[:train_end], y.iloc[split_idx:]
+        X_eval, y_eval = X_test, y_test
+        
+        if self.early_stopping_rounds > 0:
+            # Валидационный отрезок - конец обучающей части, перед тестовым
+            validation_idx = int(train_end * (1 - self.validation_size))
+            X_eval, y_eval = X_train.iloc[validation_idx:], y_train.iloc[validation_idx:]
+            X_train = X_train.iloc[:max(0, validation_idx - gap)]
+            y_train = y_train.iloc[:max(0, validation_idx - gap)]
+            logger.info(f"Размер валидационной выборки: {len(X_eval)} "
+                        f"(ранняя остановка через {self.early_stopping_rounds} деревьев)")
+
+        if len(X_train) == 0 or len(X_test) == 0 or len(X_eval) == 0:
+            raise ValueError(
+                f"Недостаточно данных для обучения: {len(X)} строк дают {len(X_train)} обучающих, "
+                f"{len(X_eval)} валидационных и {len(X_test)} тестовых (test_size={test_size}, gap={gap})"
+            )
+
         logger.info(f"Размер обучающей выборки: {len(X_train)}")
         logger.info(f"Размер тестовой выборки: {len(X_test)}")
         
         # Создание и обучение модели
-        self.model = xgb.XGBClassifier(**self.model_params)
+        budget = TimeBudget(self.time_budget) if self.time_budget else None
+        self.model = xgb.XGBClassifier(
+            **self.model_params,
+            n_jobs=self.n_jobs,
+            early_stopping_rounds=self.early_stopping_rounds or None,
+            callbacks=[budget] if budget else None
+        )
         
         # Обучение с валидацией
-        self.model.fit(
-            X_train, y_train,
-            eval_set=[(X_test, y_test)],
-            verbose=False
-        )
+        started = time.perf_counter()
+        with span('train', rows=len(X_train)):
+            self.model.fit(
+                X_train, y_train,
+                eval_set=[(X_eval, y_eval)],
+                verbose=False
+            )
+        fit_seconds = time.perf_counter() - started
+        # Callback бюджета не нужен в сохраненной модели
+        self.model.set_params(callbacks=None)
+        
+        n_trees = self.model.get_booster().num_boosted_rounds()
+        self.best_iteration = self.model.best_iteration if self.early_stopping_rounds > 0 else None
+        self.training = {
+            'tree_method': self.model_params.get('tree_method'),
+            'n_jobs': self.n_jobs,
+            'early_stopping_rounds': self.early_stopping_rounds or None,
+            'validation_rows': len(X_eval) if self.early_stopping_rounds > 0 else 0,
+            'embargo_rows': gap,
+            'time_budget': self.time_budget,
+            'budget_exhausted': bool(budget and budget.stopped_at),
+            'n_trees': n_trees,
+            'best_iteration': self.best_iteration,
+            'fit_seconds': fit_seconds
+        }
+        if budget and budget.stopped_at:
+            logger.warning(f"Бюджет времени {self.time_budget} с исчерпан: обучено {n_trees} деревьев")
+        if self.best_iteration is not None:
+            logger.info(f"Лучшая итерация: {self.best_iteration} из {n_trees} деревьев")
         
         # Предсказания
-        y_pred = self.model.predict(X_test)
-        y_pred_proba = self.model.predict_proba(X_test)[:, 1]
+        with span('evaluate', rows=len(X_test)):
+            y_pred = self.model.predict(X_test, iteration_range=self.iteration_range())
+            y_pred_proba = self.model.predict_proba(X_test, iteration_range=self.iteration_range())[:, 1]
         
         # Метрики
         accuracy = accuracy_score(y_test, y_pred)
         auc = roc_auc_score(y_test, y_pred_proba)
+        logloss = log_loss(y_test, y_pred_proba, labels=[0, 1])
+        
+        # Полное обучение сбрасывает счетчики дообучений
+        self.data_end = X_train.index[-1] if isinstance(X.index, pd.DatetimeIndex) else None
+        self.data_fingerprint = data_fingerprint(X_train)
+        self.reference_logloss = logloss
+        self.incremental = {'updates': 0, 'rows': 0, 'logloss_sum': 0.0, 'n_trees': n_trees, 'last_update': None}
         
         metrics = {
             'accuracy': accuracy,
             'auc': auc,
-            'classification_report': classification_report(y_test, y_pred)
+            'logloss': logloss,
+            'classification_report': classification_report(y_test, y_pred),
+            'training': self.training
         }
         
         logger.info(f"Точность (Accuracy): {accuracy:.4f}")
@@ -267,6 +316,194 @@ class BitcoinPredictor:
         
         return metrics
     
+    def full_retrain_reason(self, max_updates: int, tolerance: float, min_eval_rows: int,
+                            feature_columns: Optional[list] = None) -> Optional[str]:
+        """
+        Причина, по которой вместо дообучения нужно полное обучение.
+        
+        Args:
+            max_updates: Предельное число дообучений с последнего полного обучения
+            tolerance: Допустимый относительный рост logloss на новых строках
+            min_eval_rows: Минимум новых строк для сравнения logloss
+            feature_columns: Текущий набор признаков (если уже известен)
+            
+        Returns:
+            Причина или None, если дообучение возможно
+        """
+        if self.model is None:
+            return "сохраненная модель не найдена"
+        if self.incremental is None or self.data_end is None:
+            return "модель сохранена без состояния дообучения"
+        if feature_columns is not None and list(feature_columns) != list(self.feature_columns):
+            return "изменился набор признаков"
+        if self.incremental['updates'] >= max_updates:
+            return f"достигнут предел дообучений ({max_updates})"
+        
+        rows = self.incremental['rows']
+        if rows >= min_eval_rows and self.reference_logloss is not None:
+            logloss = self.incremental['logloss_sum'] / rows
+            if logloss > self.reference_logloss * (1 + tolerance):
+                return (f"logloss на новых строках {logloss:.4f} хуже logloss полного обучения "
+                        f"{self.reference_logloss:.4f} более чем на {tolerance:.0%}")
+        return None
+    
+    def update(self, X: pd.DataFrame, y: pd.Series, rounds: int = 10, replay_rows: int = 90,
+               max_updates: int = 30, tolerance: float = 0.05, min_eval_rows: int = 20) -> dict:
+        """
+        Дообучение загруженной модели (warm start) на новых строках.
+        
+        Сначала текущая модель оценивается на строках после data_end, которых она
+        не видела (logloss накапливается с последнего полного обучения). Затем к
+        ней добавляется rounds деревьев, обученных на новых строках и replay_rows
+        предыдущих. Если нужна полная переподготовка (full_retrain_reason), модель
+        не меняется.
+        
+        Args:
+            X: Признаки (история должна покрывать новые строки и окно повтора)
+            y: Целевая переменная
+            rounds: Число добавляемых деревьев
+            replay_rows: Число предыдущих строк, повторно используемых при дообучении
+            max_updates: Предельное число дообучений с последнего полного обучения
+            tolerance: Допустимый относительный рост logloss на новых строках
+            min_eval_rows: Минимум новых строк для сравнения logloss
+            
+        Returns:
+            Словарь с результатом: updated, reason (причина полного обучения), new_rows, ...
+        """
+        # У последней строки закрытие следующего дня еще неизвестно
+        X, y = X.iloc[:-1], y.iloc[:-1]
+        policy = dict(max_updates=max_updates, tolerance=tolerance, min_eval_rows=min_eval_rows)
+        
+        reason = self.full_retrain_reason(feature_columns=list(X.columns), **policy)
+        if reason is not None:
+            return {'updated': False, 'reason': reason, 'new_rows': 0}
+        
+        new_rows = int((X.index > self.data_end).sum())
+        if new_rows == 0:
+            logger.info(f"Новых строк после {self.data_end} нет, модель не изменилась")
+            return {'updated': False, 'reason': None, 'new_rows': 0}
+        
+        # Оценка текущей модели на новых строках до дообучения
+        X_new, y_new = X.iloc[-new_rows:], y.iloc[-new_rows:]
+        probabilities = self.model.predict_proba(X_new, iteration_range=self.iteration_range())[:, 1]
+        new_logloss = log_loss(y_new, probabilities, labels=[0, 1])
+        self.incremental['rows'] += new_rows
+        self.incremental['logloss_sum'] += new_logloss * new_rows
+        
+        reason = self.full_retrain_reason(**policy)
+        if reason is not None:
+            return {'updated': False, 'reason': reason, 'new_rows': new_rows}
+        
+        # Продолжение бустинга с деревьев, которые использует предсказание
+        booster = self.model.get_booster()
+        if self.best_iteration is not None:
+            booster = booster[:self.best_iteration + 1]
+        start = max(0, len(X) - new_rows - replay_rows)
+        model = xgb.XGBClassifier(**{**self.model_params, 'n_estimators': rounds}, n_jobs=self.n_jobs)
+        with span('train_incremental', rows=len(X) - start):
+            model.fit(X.iloc[start:], y.iloc[start:], xgb_model=booster, verbose=False)
+        
+        self.model = model
+        self.best_iteration = None
+        self.data_end = X.index[-1]
+        self.incremental['updates'] += 1
+        self.incremental['n_trees'] = model.get_booster().num_boosted_rounds()
+        self.incremental['last_update'] = datetime.now().isoformat()
+        
+        logger.info(
+            f"Дообучение #{self.incremental['updates']}: {new_rows} новых строк, "
+            f"{len(X) - start - new_rows} строк повтора, +{rounds} деревьев "
+            f"(всего {self.incremental['n_trees']})"
+        )
+        return {
+            'updated': True,
+            'reason': None,
+            'new_rows': new_rows,
+            'replay_rows': len(X) - start - new_rows,
+            'rounds': rounds,
+            'n_trees': self.incremental['n_trees'],
+            'new_rows_logloss': new_logloss,
+            'incremental_logloss': self.incremental['logloss_sum'] / self.incremental['rows'],
+            'reference_logloss': self.reference_logloss,
+            'updates': self.incremental['updates']
+        }
+    
+    def update_lookback_days(self, replay_rows: int) -> int:
+        """Число дней истории для дообучения: новые дни, окно повтора и прогрев признаков."""
+        days_since = (pd.Timestamp.now(tz='UTC').tz_localize(None) - self.data_end).days
+        return days_since + replay_rows + self.feature_engineer.min_history(self.feature_columns) + 2
+    
+    def iteration_range(self) -> Optional[Tuple[int, int]]:
+        """Деревья, используемые при предсказании (до лучшей итерации при ранней остановке)."""
+        return (0, self.best_iteration + 1) if self.best_iteration is not None else None
+    
+    def evaluate_walk_forward(self, X: pd.DataFrame, y: pd.Series, **kwargs) -> dict:
+        """
+        Walk-forward оценка текущих параметров модели (см. walk_forward.py).
+        
+        Args:
+            X: Признаки
+            y: Целевая переменная
+            **kwargs: Параметры walk_forward_evaluate (n_splits, window, gap, workers, ...)
+            
+        Returns:
+            Словарь с метриками по фолдам и средними
+        """
+        with span('walk_forward', rows=len(X)):
+            self.walk_forward = walk_forward_evaluate(X, y, self.model_params, **kwargs)
+        return self.walk_forward
+    
+    def tune(self, X: pd.DataFrame, y: pd.Series, search: Optional[HyperparameterSearch] = None,
+             test_size: float = 0.2) -> dict:
+        """
+        Подбор гиперпараметров (см. tune.py); лучшие параметры заменяют model_params.
+        
+        Поиск идет только на обучающей части: тестовая выборка train() с тем же
+        test_size не участвует ни в выборе параметров, ни в ранней остановке.
+        
+        Args:
+            X: Признаки
+            y: Целевая переменная
+            search: Настроенный поиск (по умолчанию - из переменных TUNE_*)
+            test_size: Размер тестовой выборки последующего train()
+            
+        Returns:
+            Словарь с лучшими параметрами и результатами проб
+        """
+        search = search or HyperparameterSearch.from_env(self.model_params)
+        split_idx = int(len(X) * (1 - test_size))
+        with span('tune', rows=split_idx):
+            self.tuning = search.run(X.iloc[:split_idx], y.iloc[:split_idx])
+        self.model_params.update(self.tuning['best_params'])
+        logger.info(f"Параметры модели после подбора: {self.tuning['best_params']}")
+        return self.tuning
+    
+    def load_model(self, model_path: str) -> None:
+        """
+        Загрузка сохраненной модели и ее метаданных (для дообучения).
+        
+        Args:
+            model_path: Путь к файлу модели
+        """
+        with span('model_load', nbytes=os.path.getsize(resolve_path(model_path))):
+            model_data = load_model_data(model_path)
+        if len(model_data.get('horizons') or []) > 1:
+            raise ValueError(f"{model_path} - многогоризонтная модель, ее обучает multi_horizon.py")
+        
+        self.model = model_data['model']
+        self.feature_columns = model_data['feature_columns']
+        self.model_params = model_data.get('model_params', self.model_params)
+        self.best_iteration = model_data.get('best_iteration')
+        self.training = model_data.get('training')
+        self.walk_forward = model_data.get('walk_forward')
+        self.tuning = model_data.get('tuning')
+        data_end = model_data.get('data_end')
+        self.data_end = pd.Timestamp(data_end) if data_end else None
+        self.reference_logloss = model_data.get('reference_logloss')
+        self.incremental = model_data.get('incremental')
+        self.data_fingerprint = model_data.get('data_fingerprint')
+        logger.info(f"Модель загружена из {model_path} (обучена {model_data.get('trained_at', 'Unknown')})")
+    
     def save_model(self, model_path: str) -> None:
         """
         Сохранение обученной модели.
@@ -285,10 +522,36 @@ class BitcoinPredictor:
             'model': self.model,
             'feature_columns': self.feature_columns,
             'model_params': self.model_params,
+            # Предсказание использует только деревья до лучшей итерации
+            'best_iteration': self.best_iteration,
+            'training': self.training,
+            # Состояние дообучения (python train.py update)
+            'data_end': self.data_end.isoformat() if self.data_end is not None else None,
+            'reference_logloss': self.reference_logloss,
+            'incremental': self.incremental,
+            # Минимальная история для признаков последней строки (по графу зависимостей)
+            'min_history': self.feature_engineer.min_history(self.feature_columns),
+            'tail_window': self.feature_engineer.tail_window(columns=self.feature_columns),
+            # Параметры признаков и отпечаток обучающих данных
+            'feature_config': self.feature_engineer.config(),
+            'data_fingerprint': self.data_fingerprint,
+            # Средние метрики walk-forward оценки (если она выполнялась)
+            'walk_forward': {
+                'config': self.walk_forward['config'],
+                'aggregate': self.walk_forward['aggregate']
+            } if self.walk_forward else None,
+            # Результат подбора гиперпараметров (если он выполнялся)
+            'tuning': {
+                key: self.tuning[key]
+                for key in ('method', 'metric', 'best_score', 'best_params', 'schedule',
+                            'completed_trials', 'budget_exhausted', 'seconds')
+            } if self.tuning else None,
             'trained_at': datetime.now().isoformat()
         }
         
-        joblib.dump(model_data, model_path)
+        with span('model_save') as stage:
+            save_model_data(model_data, model_path)
+            stage.record(nbytes=os.path.getsize(model_path))
         logger.info(f"Модель сохранена в {model_path}")
     
     def predict_last_row(self, X: pd.DataFrame) -> dict:
@@ -306,8 +569,8 @@ class BitcoinPredictor:
         
         # Предсказание для последней строки
         last_row = X.iloc[-1:][self.feature_columns]
-        probability = self.model.predict_proba(last_row)[0, 1]
-        prediction = self.model.predict(last_row)[0]
+        probability = self.model.predict_proba(last_row, iteration_range=self.iteration_range())[0, 1]
+        prediction = self.model.predict(last_row, iteration_range=self.iteration_range())[0]
         
         return {
             'probability_up': probability,
@@ -316,70 +579,168 @@ class BitcoinPredictor:
         }
 
 
-def main():
-    """Основная функция для обучения модели."""
+def main(argv=None):
+    """Основная функция для обучения модели (tune - с подбором гиперпараметров, update - дообучение)."""
+    parser = argparse.ArgumentParser(description="Обучение модели предсказания Биткоина")
+    parser.add_argument('command', nargs='?', choices=['train', 'tune', 'update'], default='train',
+                        help="train - обучение с XGB_*, tune - подбор гиперпараметров и обучение с лучшими, "
+                             "update - дообучение сохраненной модели на новых строках")
+    parser.add_argument('--method', choices=METHODS, help="Метод поиска (TUNE_METHOD)")
+    parser.add_argument('--trials', type=int, help="Число проб (TUNE_TRIALS)")
+    parser.add_argument('--budget', type=float, help="Бюджет времени поиска в секундах (TUNE_BUDGET_SECONDS)")
+    parser.add_argument('--workers', type=int, help="Процессы пула поиска (TUNE_WORKERS)")
+    parser.add_argument('--walk-forward', type=int, metavar='SPLITS',
+                        help="Walk-forward оценка на SPLITS фолдах перед обучением (WALK_FORWARD_SPLITS)")
+    args = parser.parse_args(argv)
+    
     logger.info("Запуск обучения модели предсказания Биткоина")
     
     # Параметры из переменных окружения
     symbol = os.getenv('BTC_SYMBOL', 'BTCUSDT')
     lookback_days = int(os.getenv('LOOKBACK_DAYS', '365'))
-    model_path = os.getenv('MODEL_PATH', 'models/etf_model_v1.pkl')
-    
-    try:
-        # Загрузка данных
-        logger.info(f"Загрузка данных для {symbol} за последние {lookback_days} дней...")
-        data = load_training_data(symbol=symbol, lookback_days=lookback_days)
-        
-        if data is None or len(data) < 100:
-            logger.error("Недостаточно данных для обучения")
-            return
-        
-        logger.info(f"Загружено {len(data)} записей")
-        
-        # Создание и обучение модели
-        predictor = BitcoinPredictor()
-        X, y, feature_columns = predictor.prepare_data(data)
-        
-        if len(X) < 50:
-            logger.error("Недостаточно данных после обработки")
-            return
-        
-        # Сохранение списка признаков
-        predictor.feature_columns = feature_columns
-        
-        # Обучение модели
-        metrics = predictor.train(X, y)
-        
-        # Сохранение модели
-        predictor.save_model(model_path)
-        
-        # Предсказание для последней строки
-        prediction = predictor.predict_last_row(X)
-        
-        # Вывод результатов
-        print("\n" + "="*50)
-        print("РЕЗУЛЬТАТЫ ОБУЧЕНИЯ МОДЕЛИ")
-        print("="*50)
-        print(f"Точность (Accuracy): {metrics['accuracy']:.4f}")
-        print(f"AUC: {metrics['auc']:.4f}")
-        print(f"\nОтчет о классификации:")
-        print(metrics['classification_report'])
-        
-        print(f"\nПРИМЕР ПРОГНОЗА (последняя строка):")
-        print(f"Вероятность роста: {prediction['probability_up']:.4f}")
-        print(f"Предсказание: {'Рост' if prediction['prediction'] == 1 else 'Падение'}")
-        print(f"Уверенность: {prediction['confidence']:.4f}")
-        print("="*50)
-        
-    except Exception as e:
-        logger.error(f"Ошибка при обучении модели: {e}")
-        raise
+    model_path = os.getenv('MODEL_PATH', 'models/etf_model_v1.ubj')
     
-    finally:
-        # Закрытие подключения к базе данных
-        db_manager = get_database_manager()
-        db_manager.close_connection()
+    with collect() as timings:
+        try:
+            predictor = BitcoinPredictor(feature_store=feature_store_from_env())
+            
+            # Дообучение сохраненной модели (python train.py update)
+            if args.command == 'update':
+                incremental = incremental_from_env()
+                if os.path.exists(model_path):
+                    predictor.load_model(model_path)
+                reason = predictor.full_retrain_reason(
+                    incremental['max_updates'], incremental['tolerance'], incremental['min_eval_rows']
+                )
+                if reason is None:
+                    # Загружаются только новые дни, окно повтора и прогрев признаков
+                    update_days = min(lookback_days, predictor.update_lookback_days(incremental['replay_rows']))
+                    logger.info(f"Загрузка данных для {symbol} за последние {update_days} дней...")
+                    data = load_training_data(symbol=symbol, lookback_days=update_days)
+                    if data is None:
+                        logger.error("Не удалось загрузить данные для дообучения")
+                        return
+                    X, y, feature_columns = predictor.prepare_data(data, symbol=symbol)
+                    result = predictor.update(X, y, **incremental)
+                    reason = result['reason']
+                
+                if reason is None:
+                    if result['updated']:
+                        predictor.save_model(model_path)
+                    timings_info = timings.to_dict()
+                    
+                    print("\n" + "="*50)
+                    print("ДООБУЧЕНИЕ МОДЕЛИ")
+                    print("="*50)
+                    if result['updated']:
+                        print(f"Новых строк: {result['new_rows']}, строк повтора: {result['replay_rows']}")
+                        print(f"Добавлено деревьев: {result['rounds']} (всего {result['n_trees']})")
+                        print(f"Logloss на новых строках до дообучения: {result['new_rows_logloss']:.4f}")
+                        print(f"Logloss с полного обучения: {result['incremental_logloss']:.4f} "
+                              f"(при полном обучении {result['reference_logloss']:.4f})")
+                        print(f"Дообучений с полного обучения: {result['updates']} из {incremental['max_updates']}")
+                    else:
+                        print("Новых строк нет, модель не изменилась")
+                    print(f"Время: {timings_info['total_seconds']:.3f} с")
+                    print("="*50)
+                    return
+                
+                logger.warning(f"Полное обучение вместо дообучения: {reason}")
+            
+            # Загрузка данных
+            logger.info(f"Загрузка данных для {symbol} за последние {lookback_days} дней...")
+            data = load_training_data(symbol=symbol, lookback_days=lookback_days)
+            
+            if data is None or len(data) < 100:
+                logger.error("Недостаточно данных для обучения")
+                return
+            
+            logger.info(f"Загружено {len(data)} записей")
+            memory = MemoryReport()
+            memory.record('loaded', data)
+            
+            # Создание и обучение модели
+            X, y, feature_columns = predictor.prepare_data(data, symbol=symbol)
+            memory.record('X', X)
+            memory.record('y', y)
+            memory.log(f"Память по этапам (float {predictor.feature_engineer.dtype_policy.float_dtype})")
+            
+            if len(X) < 50:
+                logger.error("Недостаточно данных после обработки")
+                return
+            
+            # Сохранение списка признаков
+            predictor.feature_columns = feature_columns
+            
+            # Подбор гиперпараметров (python train.py tune)
+            if args.command == 'tune':
+                search = HyperparameterSearch.from_env(predictor.model_params)
+                if args.method:
+                    search.method = args.method
+                if args.trials:
+                    search.n_trials = args.trials
+                if args.budget:
+                    search.budget_seconds = args.budget
+                if args.workers:
+                    search.workers = args.workers
+                predictor.tune(X, y, search)
+            
+            # Walk-forward оценка на нескольких фолдах - только по запросу (--walk-forward
+            # или WALK_FORWARD_SPLITS > 0): каждый фолд - отдельное обучение модели
+            walk_forward = walk_forward_from_env()
+            if args.walk_forward is not None:
+                walk_forward['n_splits'] = args.walk_forward
+            if walk_forward['n_splits'] > 0:
+                predictor.evaluate_walk_forward(X, y, **walk_forward)
+            
+            # Обучение модели
+            metrics = predictor.train(X, y)
+            
+            # Сохранение модели
+            predictor.save_model(model_path)
+            metrics['timings'] = timings.to_dict()
+            
+            # Предсказание для последней строки
+            prediction = predictor.predict_last_row(X)
+            
+            # Вывод результатов
+            print("\n" + "="*50)
+            print("РЕЗУЛЬТАТЫ ОБУЧЕНИЯ МОДЕЛИ")
+            print("="*50)
+            print(f"Точность (Accuracy): {metrics['accuracy']:.4f}")
+            print(f"AUC: {metrics['auc']:.4f}")
+            training = metrics['training']
+            print(f"Деревьев: {training['n_trees']}"
+                  + (f", лучшая итерация {training['best_iteration']}" if training['best_iteration'] is not None else '')
+                  + (" (бюджет времени исчерпан)" if training['budget_exhausted'] else ''))
+            print(f"\nОтчет о классификации:")
+            print(metrics['classification_report'])
+            
+            if predictor.tuning:
+                print_tuning_report(predictor.tuning)
+            
+            if predictor.walk_forward:
+                print_report(predictor.walk_forward)
+            
+            print(f"\nПРИМЕР ПРОГНОЗА (последняя строка):")
+            print(f"Вероятность роста: {prediction['probability_up']:.4f}")
+            print(f"Предсказание: {'Рост' if prediction['prediction'] == 1 else 'Падение'}")
+            print(f"Уверенность: {prediction['confidence']:.4f}")
+            
+            print(f"\nВРЕМЯ ПО ЭТАПАМ (всего {metrics['timings']['total_seconds']:.3f} с):")
+            for stage, info in metrics['timings']['stages'].items():
+                print(f"{stage:20} {info['seconds']:.3f} с")
+            print("="*50)
+            
+        except Exception as e:
+            logger.error(f"Ошибка при обучении модели: {e}")
+            raise
+        
+        finally:
+            # Закрытие подключения к базе данных
+            close_database_manager()
+            write_textfile()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
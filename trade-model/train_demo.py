@@ -20,6 +20,7 @@ import xgboost as xgb
 
 # Local imports
 from train import FeatureEngineer, BitcoinPredictor
+from synthetic_data import SyntheticMarket
 
 # Настройка логирования
 logging.basicConfig(
@@ -32,66 +33,23 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 
-def create_synthetic_data(days: int = 365) -> pd.DataFrame:
+def create_synthetic_data(days: int = 365, freq: str = 'D') -> pd.DataFrame:
     """
     Создание синтетических данных для демонстрации.
     
     Args:
         days: Количество дней данных
+        freq: Частота свечей (например, 'D' или '5min')
         
     Returns:
         DataFrame с синтетическими данными
     """
     logger.info(f"Создание синтетических данных на {days} дней...")
     
-    # Создание временного ряда
-    dates = pd.date_range(start='2023-01-01', periods=days, freq='D')
-    
-    # Параметры для генерации реалистичных данных
-    np.random.seed(42)
-    base_price = 45000
-    daily_volatility = 0.02
-    trend = 0.0005  # Небольшой восходящий тренд
-    
-    # Генерация цен
-    prices = [base_price]
-    for i in range(1, len(dates)):
-        # Случайное блуждание с трендом
-        change = np.random.normal(trend, daily_volatility)
-        new_price = prices[-1] * (1 + change)
-        prices.append(new_price)
-    
-    # Создание OHLCV данных
-    data = []
-    for i, (date, close) in enumerate(zip(dates, prices)):
-        # Генерация реалистичных OHLC
-        intraday_vol = np.random.uniform(0.005, 0.02)
-        high = close * (1 + np.random.uniform(0, intraday_vol))
-        low = close * (1 - np.random.uniform(0, intraday_vol))
-        open_price = close * (1 + np.random.uniform(-intraday_vol/2, intraday_vol/2))
-        
-        # Объем (зависит от волатильности)
-        base_volume = 1000
-        volume_multiplier = 1 + abs(change) * 10  # Больше объема при больших изменениях
-        volume = base_volume * volume_multiplier * np.random.uniform(0.5, 1.5)
-        
-        # ETF потоки (коррелируют с изменениями цены)
-        base_flow = 1000000  # $1M базовый поток
-        flow_correlation = change * 10000000  # Потоки реагируют на изменения цены
-        etf_flow = base_flow + flow_correlation + np.random.normal(0, 200000)
-        
-        data.append({
-            'timestamp': date,
-            'open': round(open_price, 2),
-            'high': round(high, 2),
-            'low': round(low, 2),
-            'close': round(close, 2),
-            'volume': round(volume, 0),
-            'etf_flow': round(etf_flow, 2)
-        })
-    
-    df = pd.DataFrame(data)
-    df.set_index('timestamp', inplace=True)
+    # Один режим с небольшим восходящим трендом; притоки коррелируют с изменением цены
+    market = SyntheticMarket(seed=42, freq=freq, trend=0.0005, volatility=0.02, regimes=None,
+                             flow_volatility=300_000, flow_correlation=0.7)
+    df = market.generate(market.periods(days))
     
     logger.info(f"Создано {len(df)} записей")
     logger.info(f"Диапазон цен: ${df['close'].min():,.2f} - ${df['close'].max():,.2f}")
@@ -106,7 +64,7 @@ def main():
     logger.info("=" * 60)
     
     # Параметры из переменных окружения
-    model_path = os.getenv('MODEL_PATH', 'models/etf_model_v1.pkl')
+    model_path = os.getenv('MODEL_PATH', 'models/etf_model_v1.ubj')
     lookback_days = int(os.getenv('LOOKBACK_DAYS', '365'))
     
     try:
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Параллельный подбор гиперпараметров XGBoost (random search и successive halving).
+
+Пробы оцениваются на walk-forward фолдах (walk_forward.walk_forward_splits):
+средний logloss на тестовых отрезках. Ранняя остановка идет по внутреннему
+валидационному отрезку в конце обучающей части фолда, поэтому тестовый отрезок
+не влияет на число деревьев. Каждый процесс пула один раз строит квантованные
+матрицы фолдов (QuantileDMatrix, обучающая матрица задает границы бинов для
+остальных) и переиспользует их во всех своих пробах. Successive halving
+сначала обучает все пробы на малом числе деревьев и на каждой ступени
+оставляет лучшую 1/eta часть. Ранняя остановка прекращает бесперспективные
+пробы внутри ступени. После исчерпания бюджета времени новые пробы не
+запускаются, а результат строится по завершенным.
+"""
+
+import os
+import math
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# ML libraries
+import xgboost as xgb
+from sklearn.metrics import log_loss
+
+# Local imports
+from walk_forward import available_cores, walk_forward_splits
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Загрузка переменных окружения
+load_dotenv()
+
+METHODS = ('random', 'halving')
+
+# Матрицы фолдов в процессе пула (строятся один раз в _init_worker):
+# обучение, валидация для ранней остановки, тест и его метки
+_folds: List[Tuple[xgb.QuantileDMatrix, xgb.QuantileDMatrix, xgb.QuantileDMatrix, np.ndarray]] = []
+
+
+def sample_params(rng: np.random.Generator) -> Dict[str, Any]:
+    """Случайная точка пространства поиска (параметры в именах XGBClassifier)."""
+    return {
+        'max_depth': int(rng.integers(3, 9)),
+        'learning_rate': float(10 ** rng.uniform(np.log10(0.01), np.log10(0.3))),
+        'min_child_weight': float(10 ** rng.uniform(0.0, 1.0)),
+        'subsample': float(rng.uniform(0.6, 1.0)),
+        'colsample_bytree': float(rng.uniform(0.6, 1.0)),
+        'reg_lambda': float(10 ** rng.uniform(-1.0, 1.0)),
+    }
+
+
+def inner_split(train_start: int, train_end: int, validation_size: float, gap: int) -> Tuple[int, int]:
+    """
+    Внутренний валидационный отрезок в конце обучающей части фолда.
+
+    Returns:
+        (конец обучения, начало валидации); между ними пропущено gap строк
+    """
+    valid_rows = max(1, int((train_end - train_start) * validation_size))
+    valid_start = train_end - valid_rows
+    fit_end = valid_start - gap
+    if fit_end <= train_start:
+        raise ValueError("Обучающая часть фолда слишком мала для валидационного отрезка")
+    return fit_end, valid_start
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray, splits: List[Tuple[int, int, int, int]], max_bin: int,
+                 validation_size: float, gap: int) -> None:
+    """Однократное построение квантованных матриц фолдов в процессе пула."""
+    global _folds
+    _folds = []
+    for train_start, train_end, test_start, test_end in splits:
+        fit_end, valid_start = inner_split(train_start, train_end, validation_size, gap)
+        dtrain = xgb.QuantileDMatrix(X[train_start:fit_end], label=y[train_start:fit_end], max_bin=max_bin)
+        dvalid = xgb.QuantileDMatrix(X[valid_start:train_end], label=y[valid_start:train_end], ref=dtrain)
+        dtest = xgb.QuantileDMatrix(X[test_start:test_end], ref=dtrain)
+        _folds.append((dtrain, dvalid, dtest, y[test_start:test_end]))
+
+
+def _run_trial(params: Dict[str, Any], rounds: int, early_stopping: int) -> Dict[str, Any]:
+    """Обучение пробы на всех фолдах процесса: остановка по валидации, logloss на тесте."""
+    started = time.perf_counter()
+    scores, iterations = [], []
+    for dtrain, dvalid, dtest, y_test in _folds:
+        booster = xgb.train(
+            params, dtrain, num_boost_round=rounds,
+            evals=[(dvalid, 'valid')], early_stopping_rounds=early_stopping, verbose_eval=False
+        )
+        proba = booster.predict(dtest, iteration_range=(0, booster.best_iteration + 1))
+        scores.append(log_loss(y_test, proba, labels=[0, 1]))
+        iterations.append(booster.best_iteration + 1)
+    return {
+        'score': float(np.mean(scores)),
+        'n_estimators': int(round(np.mean(iterations))),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def halving_schedule(max_rounds: int, min_rounds: int, eta: int) -> List[int]:
+    """Число деревьев на ступенях successive halving (последняя - max_rounds)."""
+    rungs = max(1, int(math.floor(math.log(max_rounds / min_rounds, eta))) + 1)
+    return [max(1, max_rounds // eta ** (rungs - 1 - rung)) for rung in range(rungs)]
+
+
+class HyperparameterSearch:
+    """Поиск гиперпараметров XGBoost на walk-forward фолдах в пуле процессов."""
+
+    def __init__(self, base_params: Dict[str, Any], method: str = 'halving', n_trials: int = 27,
+                 max_rounds: int = 500, min_rounds: int = 25, eta: int = 3,
+                 early_stopping: int = 30, n_splits: int = 3, gap: int = 1,
+                 validation_size: float = 0.2, budget_seconds: Optional[float] = None,
+                 workers: Optional[int] = None, max_bin: int = 256, seed: int = 42):
+        """
+        Args:
+            base_params: Базовые параметры модели (BitcoinPredictor.model_params)
+            method: 'random' - все пробы на max_rounds, 'halving' - successive halving
+            n_trials: Число проб
+            max_rounds: Максимальное число деревьев
+            min_rounds: Число деревьев на первой ступени halving
+            eta: Доля проб, переходящих на следующую ступень (1/eta)
+            early_stopping: Ранняя остановка после стольких деревьев без улучшения
+            n_splits: Число walk-forward фолдов
+            gap: Пропуск строк между обучением и тестом (и перед валидацией)
+            validation_size: Доля обучающей части фолда для ранней остановки
+            budget_seconds: Бюджет времени на поиск (None - без ограничения)
+            workers: Число процессов (по умолчанию - число ядер; 1 - без пула)
+            max_bin: Число бинов квантования признаков
+            seed: Seed выборки параметров
+        """
+        if method not in METHODS:
+            raise ValueError(f"Неизвестный метод поиска: {method} (ожидается {', '.join(METHODS)})")
+        self.base_params = base_params
+        self.method = method
+        self.n_trials = n_trials
+        self.max_rounds = max_rounds
+        self.min_rounds = min(min_rounds, max_rounds)
+        self.eta = eta
+        self.early_stopping = early_stopping
+        self.n_splits = n_splits
+        self.gap = gap
+        self.validation_size = validation_size
+        self.budget_seconds = budget_seconds
+        self.workers = workers
+        self.max_bin = max_bin
+        self.seed = seed
+
+    @classmethod
+    def from_env(cls, base_params: Dict[str, Any]) -> 'HyperparameterSearch':
+        """Параметры поиска из TUNE_*."""
+        budget = os.getenv('TUNE_BUDGET_SECONDS')
+        workers = os.getenv('TUNE_WORKERS')
+        return cls(
+            base_params,
+            method=os.getenv('TUNE_METHOD', 'halving'),
+            n_trials=int(os.getenv('TUNE_TRIALS', '27')),
+            max_rounds=int(os.getenv('TUNE_MAX_ROUNDS', '500')),
+            early_stopping=int(os.getenv('TUNE_EARLY_STOPPING', '30')),
+            n_splits=int(os.getenv('TUNE_SPLITS', '3')),
+            validation_size=float(os.getenv('TUNE_VALIDATION_SIZE', '0.2')),
+            budget_seconds=float(budget) if budget else None,
+            workers=int(workers) if workers else None,
+            seed=int(base_params.get('random_state', 42))
+        )
+
+    def _booster_params(self, params: Dict[str, Any], threads: int) -> Dict[str, Any]:
+        """Параметры xgb.train для пробы."""
+        return {
+            'objective': self.base_params.get('objective', 'binary:logistic'),
+            'eval_metric': 'logloss',
+            'tree_method': 'hist',
+            'max_bin': self.max_bin,
+            'seed': int(self.base_params.get('random_state', 42)),
+            'nthread': threads,
+            **params,
+        }
+
+    def run(self, X: pd.DataFrame, y: pd.Series) -> Dict[str, Any]:
+        """
+        Запуск поиска.
+
+        Args:
+            X: Признаки в хронологическом порядке
+            y: Целевая переменная
+
+        Returns:
+            Словарь с лучшими параметрами (best_params, включая n_estimators),
+            лучшим logloss, результатами проб и границами фолдов
+        """
+        splits = walk_forward_splits(len(X), self.n_splits, gap=self.gap)
+        if not splits:
+            raise ValueError("Недостаточно данных ни для одного фолда")
+
+        cores = available_cores()
+        workers = max(1, min(self.workers or cores, self.n_trials))
+        threads = max(1, cores // workers)
+        rng = np.random.default_rng(self.seed)
+        trials = [{'trial': i, 'params': sample_params(rng), 'rounds': 0, 'score': None}
+                  for i in range(self.n_trials)]
+        schedule = [self.max_rounds] if self.method == 'random' else \
+            halving_schedule(self.max_rounds, self.min_rounds, self.eta)
+
+        X_values = np.ascontiguousarray(X.to_numpy(dtype='float32'))
+        y_values = y.to_numpy(dtype='int32')
+        initargs = (X_values, y_values, splits, self.max_bin, self.validation_size, self.gap)
+
+        logger.info(
+            f"Поиск гиперпараметров ({self.method}): {self.n_trials} проб, ступени {schedule}, "
+            f"{len(splits)} фолдов, {workers} процессов × {threads} потоков"
+        )
+        started = time.perf_counter()
+        deadline = started + self.budget_seconds if self.budget_seconds else None
+        exhausted = False
+
+        if workers == 1:
+            _init_worker(*initargs)
+            pool = None
+        else:
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['tune'])
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                       initializer=_init_worker, initargs=initargs)
+
+        try:
+            active = trials
+            for rung, rounds in enumerate(schedule):
+                completed = self._run_rung(pool, active, rounds, threads, deadline)
+                if len(completed) < len(active):
+                    exhausted = True
+                    break
+                if rung < len(schedule) - 1:
+                    # На следующую ступень переходит лучшая 1/eta часть проб
+                    completed.sort(key=lambda trial: trial['score'])
+                    active = completed[:max(1, len(completed) // self.eta)]
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+        elapsed = time.perf_counter() - started
+        scored = [trial for trial in trials if trial['score'] is not None]
+        if not scored:
+            raise TimeoutError("Бюджет времени исчерпан до завершения первой пробы")
+
+        # Лучшая проба среди прошедших больше всего деревьев
+        top_rounds = max(trial['rounds'] for trial in scored)
+        best = min((trial for trial in scored if trial['rounds'] == top_rounds), key=lambda trial: trial['score'])
+        best_params = {**best['params'], 'n_estimators': best['n_estimators']}
+
+        logger.info(
+            f"Лучшая проба {best['trial']}: logloss {best['score']:.4f}, "
+            f"{best['n_estimators']} деревьев, {elapsed:.1f} с"
+        )
+        return {
+            'method': self.method,
+            'best_params': best_params,
+            'best_score': best['score'],
+            'metric': 'logloss',
+            'schedule': schedule,
+            'n_splits': len(splits),
+            'rows': len(X),
+            'folds': splits,
+            'trials': trials,
+            'completed_trials': len(scored),
+            'budget_exhausted': exhausted,
+            'workers': workers,
+            'threads_per_trial': threads,
+            'seconds': elapsed,
+        }
+
+    def _run_rung(self, pool: Optional[ProcessPoolExecutor], trials: List[Dict[str, Any]], rounds: int,
+                  threads: int, deadline: Optional[float]) -> List[Dict[str, Any]]:
+        """Оценка проб одной ступени; возвращает завершенные до исчерпания бюджета."""
+        completed = []
+
+        def record(trial: Dict[str, Any], result: Dict[str, Any]) -> None:
+            trial.update(rounds=rounds, score=result['score'], n_estimators=result['n_estimators'])
+            trial['seconds'] = trial.get('seconds', 0.0) + result['seconds']
+            completed.append(trial)
+
+        if pool is None:
+            for trial in trials:
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                record(trial, _run_trial(self._booster_params(trial['params'], threads), rounds, self.early_stopping))
+            return completed
+
+        futures = {
+            pool.submit(_run_trial, self._booster_params(trial['params'], threads), rounds, self.early_stopping): trial
+            for trial in trials
+        }
+        timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                record(futures[future], future.result())
+        except FutureTimeoutError:
+            for future in futures:
+                future.cancel()
+        return completed
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Вывод результатов поиска."""
+    print(f"\nПОИСК ГИПЕРПАРАМЕТРОВ ({report['method']}, ступени {report['schedule']})")
+    print(f"Проб завершено: {report['completed_trials']} из {len(report['trials'])}"
+          f"{' (бюджет времени исчерпан)' if report['budget_exhausted'] else ''}")
+    print(f"Лучший logloss: {report['best_score']:.4f}")
+    for name, value in report['best_params'].items():
+        print(f"  {name:18} {value:.4g}" if isinstance(value, float) else f"  {name:18} {value}")
+    print(f"Время: {report['seconds']:.1f} с ({report['workers']} процессов × {report['threads_per_trial']} потоков)")
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Walk-forward оценка модели: обучение на прошлом, проверка на следующем отрезке.
+
+Фолды идут по времени: тестовые отрезки следуют друг за другом в конце
+истории, обучающее окно растет (expanding) или сдвигается с постоянной длиной
+(sliding). Между обучением и тестом пропускается gap строк (embargo): цель
+строки - закрытие следующего дня, поэтому без зазора последняя обучающая
+строка "видит" первую тестовую.
+
+Фолды обучаются параллельно в пуле процессов. Процессы создаются через
+forkserver (XGBoost и sklearn импортируются один раз в сервере), данные
+передаются каждому процессу один раз при инициализации, а число потоков
+XGBoost в фолде ограничено так, чтобы workers × threads не превышало число
+доступных ядер.
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# ML libraries
+from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+import xgboost as xgb
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Загрузка переменных окружения
+load_dotenv()
+
+WINDOWS = ('expanding', 'sliding')
+
+# Минимальный размер обучающей выборки фолда
+MIN_TRAIN_ROWS = 50
+
+# Данные фолдов в процессе пула (задаются один раз в _init_worker)
+_X: Optional[np.ndarray] = None
+_y: Optional[np.ndarray] = None
+
+
+def available_cores() -> int:
+    """Число ядер, доступных процессу (с учетом affinity/cgroup)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def walk_forward_splits(n_rows: int, n_splits: int = 5, test_size: Optional[int] = None,
+                        gap: int = 1, window: str = 'expanding',
+                        train_size: Optional[int] = None,
+                        min_train: int = MIN_TRAIN_ROWS) -> List[Tuple[int, int, int, int]]:
+    """
+    Границы фолдов walk-forward.
+
+    Args:
+        n_rows: Число строк
+        n_splits: Число тестовых отрезков
+        test_size: Длина тестового отрезка (по умолчанию n_rows // (n_splits + 1))
+        gap: Пропуск строк между обучением и тестом (embargo)
+        window: 'expanding' - обучение с начала истории, 'sliding' - окно длиной train_size
+        train_size: Длина скользящего окна (по умолчанию - обучающая выборка первого фолда)
+        min_train: Фолды с меньшей обучающей выборкой пропускаются
+
+    Returns:
+        Список (train_start, train_end, test_start, test_end), концы не включаются
+    """
+    if window not in WINDOWS:
+        raise ValueError(f"Неизвестное окно: {window} (ожидается {', '.join(WINDOWS)})")
+    if n_splits < 1:
+        raise ValueError("n_splits должен быть положительным")
+
+    test_size = test_size or n_rows // (n_splits + 1)
+    if test_size < 1:
+        raise ValueError(f"Недостаточно строк ({n_rows}) для {n_splits} фолдов")
+
+    first_train_end = n_rows - n_splits * test_size - gap
+    if window == 'sliding' and train_size is None:
+        train_size = first_train_end
+
+    splits = []
+    for k in range(n_splits):
+        test_start = n_rows - (n_splits - k) * test_size
+        train_end = test_start - gap
+        train_start = 0 if window == 'expanding' else max(0, train_end - train_size)
+        if train_end - train_start < min_train:
+            continue
+        splits.append((train_start, train_end, test_start, test_start + test_size))
+    return splits
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray, threads: Optional[int] = None) -> None:
+    """Инициализация процесса пула: данные и ограничение потоков."""
+    global _X, _y
+    _X, _y = X, y
+    if threads is not None:
+        # Ограничение потоков BLAS/OpenMP на случай вызовов вне XGBoost
+        os.environ['OMP_NUM_THREADS'] = str(threads)
+
+
+def _fit_fold(bounds: Tuple[int, int, int, int], params: Dict[str, Any], threads: int) -> Dict[str, Any]:
+    """Обучение и оценка одного фолда на данных процесса."""
+    train_start, train_end, test_start, test_end = bounds
+    X_train, y_train = _X[train_start:train_end], _y[train_start:train_end]
+    X_test, y_test = _X[test_start:test_end], _y[test_start:test_end]
+
+    started = time.perf_counter()
+    model = xgb.XGBClassifier(**{**params, 'n_jobs': threads})
+    model.fit(X_train, y_train, verbose=False)
+    probabilities = model.predict_proba(X_test)[:, 1]
+    seconds = time.perf_counter() - started
+
+    predictions = (probabilities > 0.5).astype(int)
+    both_classes = len(np.unique(y_test)) > 1
+    return {
+        'train_rows': train_end - train_start,
+        'test_rows': test_end - test_start,
+        'accuracy': float(accuracy_score(y_test, predictions)),
+        'auc': float(roc_auc_score(y_test, probabilities)) if both_classes else None,
+        'logloss': float(log_loss(y_test, probabilities, labels=[0, 1])),
+        'seconds': seconds,
+    }
+
+
+def _aggregate(folds: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Среднее и стандартное отклонение метрик по фолдам."""
+    result: Dict[str, Any] = {'folds': len(folds)}
+    for metric in ('accuracy', 'auc', 'logloss'):
+        values = [fold[metric] for fold in folds if fold[metric] is not None]
+        result[f'{metric}_mean'] = float(np.mean(values)) if values else None
+        result[f'{metric}_std'] = float(np.std(values)) if values else None
+    result['fit_seconds'] = float(sum(fold['seconds'] for fold in folds))
+    return result
+
+
+def walk_forward_evaluate(X: pd.DataFrame, y: pd.Series, model_params: Dict[str, Any],
+                          n_splits: int = 5, test_size: Optional[int] = None, gap: int = 1,
+                          window: str = 'expanding', train_size: Optional[int] = None,
+                          workers: Optional[int] = None,
+                          threads_per_fold: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Walk-forward оценка параметров модели с параллельным обучением фолдов.
+
+    Args:
+        X: Признаки в хронологическом порядке
+        y: Целевая переменная
+        model_params: Параметры XGBClassifier (как BitcoinPredictor.model_params)
+        n_splits: Число фолдов
+        test_size: Длина тестового отрезка
+        gap: Пропуск строк между обучением и тестом
+        window: 'expanding' или 'sliding'
+        train_size: Длина скользящего окна
+        workers: Число процессов (по умолчанию min(фолды, ядра); 1 - без пула)
+        threads_per_fold: Потоки XGBoost в фолде (по умолчанию ядра // workers)
+
+    Returns:
+        Словарь с метриками по фолдам ('folds') и средними ('aggregate')
+    """
+    splits = walk_forward_splits(len(X), n_splits, test_size, gap, window, train_size)
+    if not splits:
+        raise ValueError("Недостаточно данных ни для одного фолда")
+
+    cores = available_cores()
+    workers = max(1, min(workers or cores, len(splits)))
+    threads = threads_per_fold or max(1, cores // workers)
+
+    X_values = np.ascontiguousarray(X.to_numpy(dtype='float32'))
+    y_values = y.to_numpy(dtype='int32')
+    params = {key: value for key, value in model_params.items() if key != 'n_jobs'}
+
+    logger.info(
+        f"Walk-forward: {len(splits)} фолдов ({window}, gap={gap}), "
+        f"{workers} процессов × {threads} потоков"
+    )
+    started = time.perf_counter()
+    if workers == 1:
+        _init_worker(X_values, y_values)
+        folds = [_fit_fold(bounds, params, threads) for bounds in splits]
+    else:
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['walk_forward'])
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(X_values, y_values, threads)) as pool:
+            folds = list(pool.map(_fit_fold, splits, [params] * len(splits), [threads] * len(splits)))
+    elapsed = time.perf_counter() - started
+
+    index = X.index
+    for fold, (train_start, train_end, test_start, test_end) in zip(folds, splits):
+        fold['train_start'] = str(index[train_start])
+        fold['test_start'] = str(index[test_start])
+        fold['test_end'] = str(index[test_end - 1])
+
+    aggregate = _aggregate(folds)
+    logger.info(
+        f"Walk-forward за {elapsed:.2f} с: accuracy {aggregate['accuracy_mean']:.4f} "
+        f"± {aggregate['accuracy_std']:.4f}"
+    )
+    return {
+        'config': {'n_splits': n_splits, 'window': window, 'gap': gap,
+                   'test_size': splits[0][3] - splits[0][2], 'train_size': train_size},
+        'workers': workers,
+        'threads_per_fold': threads,
+        'seconds': elapsed,
+        'folds': folds,
+        'aggregate': aggregate,
+    }
+
+
+def walk_forward_from_env() -> Dict[str, Any]:
+    """Параметры walk-forward из WALK_FORWARD_* (по умолчанию WALK_FORWARD_SPLITS=0 - оценка отключена)."""
+    train_size = os.getenv('WALK_FORWARD_TRAIN_SIZE')
+    workers = os.getenv('WALK_FORWARD_WORKERS')
+    return {
+        'n_splits': int(os.getenv('WALK_FORWARD_SPLITS', '0')),
+        'window': os.getenv('WALK_FORWARD_WINDOW', 'expanding'),
+        'gap': int(os.getenv('WALK_FORWARD_GAP', '1')),
+        'train_size': int(train_size) if train_size else None,
+        'workers': int(workers) if workers else None,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Вывод метрик по фолдам и средних."""
+    print(f"\nWALK-FORWARD ({report['config']['window']}, {len(report['folds'])} фолдов, "
+          f"{report['workers']} процессов × {report['threads_per_fold']} потоков)")
+    print(f"{'тест с':>22} {'обуч.':>6} {'тест':>5} {'accuracy':>9} {'auc':>7} {'logloss':>8}")
+    for fold in report['folds']:
+        auc = f"{fold['auc']:.4f}" if fold['auc'] is not None else '-'
+        print(f"{fold['test_start']:>22} {fold['train_rows']:6} {fold['test_rows']:5} "
+              f"{fold['accuracy']:9.4f} {auc:>7} {fold['logloss']:8.4f}")
+    aggregate = report['aggregate']
+    auc = f"{aggregate['auc_mean']:.4f} ± {aggregate['auc_std']:.4f}" if aggregate['auc_mean'] is not None else '-'
+    print(f"Среднее: accuracy {aggregate['accuracy_mean']:.4f} ± {aggregate['accuracy_std']:.4f}, AUC {auc}")
+    print(f"Время: {report['seconds']:.2f} с (сумма обучений фолдов {aggregate['fit_seconds']:.2f} с)")
+
+
+def main() -> int:
+    """Walk-forward оценка текущих параметров модели."""
+    defaults = walk_forward_from_env()
+    parser = argparse.ArgumentParser(description="Walk-forward оценка модели")
+    parser.add_argument('--splits', type=int, default=defaults['n_splits'] or 5)
+    parser.add_argument('--window', choices=WINDOWS, default=defaults['window'])
+    parser.add_argument('--gap', type=int, default=defaults['gap'])
+    parser.add_argument('--train-size', type=int, default=defaults['train_size'])
+    parser.add_argument('--workers', type=int, default=defaults['workers'])
+    parser.add_argument('--threads', type=int, default=None, help="Потоки XGBoost в фолде")
+    parser.add_argument('--synthetic', type=int, metavar='DAYS',
+                        help="Синтетические данные на DAYS дней вместо базы данных")
+    args = parser.parse_args()
+
+    # Local imports
+    from train import BitcoinPredictor
+
+    if args.synthetic:
+        from train_demo import create_synthetic_data
+        data = create_synthetic_data(args.synthetic)
+    else:
+        from db import load_training_data
+        data = load_training_data(symbol=os.getenv('BTC_SYMBOL', 'BTCUSDT'),
+                                  lookback_days=int(os.getenv('LOOKBACK_DAYS', '365')))
+    if data is None:
+        print("❌ Не удалось загрузить данные")
+        return 1
+
+    predictor = BitcoinPredictor()
+    X, y, _ = predictor.prepare_data(data)
+    report = walk_forward_evaluate(
+        X, y, predictor.model_params, n_splits=args.splits, gap=args.gap, window=args.window,
+        train_size=args.train_size, workers=args.workers, threads_per_fold=args.threads
+    )
+
+    print("=" * 50)
+    print_report(report)
+    print("=" * 50)
+    print("✅ Оценка завершена")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())